@@ -1,13 +1,41 @@
 import sys
 import os
-from PyQt5.QtCore import QUrl, Qt, QSize, QPoint, QByteArray
+import argparse
+import base64
+import collections
+import csv
+import glob
+import hashlib
+import heapq
+import html
+import inspect
+import ipaddress
+import json
+import math
+import pickle
+import re
+import sqlite3
+import statistics
+import string
+import threading
+import time
+import urllib.parse
+import zlib
+from PyQt5.QtCore import (QUrl, Qt, QSize, QPoint, QBuffer, QByteArray, QObject, QTimer, QEvent,
+                          QThread, QThreadPool, QMetaObject, QStringListModel, pyqtSignal, pyqtSlot)
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QToolBar, 
                             QAction, QLineEdit, QProgressBar, 
                             QStatusBar, QTabWidget, QWidget, QVBoxLayout,
                             QHBoxLayout, QLabel, QFrame, QSplitter, 
-                            QCompleter, QSpacerItem, QSizePolicy, QMenu, QDialog, QPushButton)
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineProfile
-from PyQt5.QtGui import QIcon, QFont, QPalette, QColor, QPixmap, QCursor, QStandardItemModel, QImage
+                            QCompleter, QSpacerItem, QSizePolicy, QMenu, QDialog, QPushButton,
+                            QListWidget, QListWidgetItem, QTableWidget, QTableWidgetItem,
+                            QHeaderView, QTabBar, QToolButton)
+from PyQt5.QtWebEngineWidgets import (QWebEngineView, QWebEnginePage, QWebEngineProfile,
+                                      QWebEngineDownloadItem)
+from PyQt5.QtWebEngineCore import (QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo,
+                                   QWebEngineUrlRequestJob, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler)
+from PyQt5.QtNetwork import QHostInfo, QLocalServer, QNetworkAccessManager, QNetworkRequest
+from PyQt5.QtGui import QIcon, QFont, QPalette, QColor, QPixmap, QCursor, QImage, QPainter
 
 # Browser name and version
 BROWSER_NAME = "NexaWave"
@@ -19,222 +47,4856 @@ BROWSER_ICON = None
 # Path to the logo file
 LOGO_PATH = "nexawave_logo.png"
 
+# Page opened by new tabs and the home button
+HOME_URL = "https://ilyas-doughmi.vercel.app/"
+
+# The browser's own pages are served under this scheme
+APP_SCHEME = b"nexawave"
+NEW_TAB_URL = "nexawave://newtab/"
+
+# Directory holding the user's settings and browser data
+DATA_DIR = os.path.join(os.path.expanduser("~"), ".nexawave")
+CONFIG_PATH = os.path.join(DATA_DIR, "config.json")
+SESSION_PATH = os.path.join(DATA_DIR, "session.json")
+HISTORY_PATH = os.path.join(DATA_DIR, "history.db")
+PAGE_INDEX_PATH = os.path.join(DATA_DIR, "pages.db")
+PREDICTOR_PATH = os.path.join(DATA_DIR, "predictor.json")
+SNAPSHOTS_DB_PATH = os.path.join(DATA_DIR, "snapshots.db")
+SNAPSHOTS_DIR = os.path.join(DATA_DIR, "snapshots")
+THUMBNAILS_DIR = os.path.join(DATA_DIR, "thumbnails")
+LOAD_METRICS_PATH = os.path.join(DATA_DIR, "load-metrics")
+MEMORY_METRICS_PATH = os.path.join(DATA_DIR, "memory-metrics.jsonl")
+DOWNLOADS_PATH = os.path.join(DATA_DIR, "downloads.json")
+FILTERS_DIR = os.path.join(DATA_DIR, "filters")
+FILTERS_CACHE_PATH = os.path.join(DATA_DIR, "filters.cache")
+# The Public Suffix List from publicsuffix.org; a copy in DATA_DIR is preferred to the system's
+PUBLIC_SUFFIX_PATHS = [os.path.join(DATA_DIR, "public_suffix_list.dat"),
+                       "/usr/share/publicsuffix/public_suffix_list.dat"]
+PUBLIC_SUFFIX_CACHE_PATH = os.path.join(DATA_DIR, "public_suffixes.cache")
+PROFILES_DIR = os.path.join(DATA_DIR, "profiles")
+ICONS_DIR = os.path.join(DATA_DIR, "icons")
+CONTROL_SOCKET_PATH = os.path.join(DATA_DIR, "control.sock")
+
+# Toolbar icons as base64 encoded SVG, rasterized once and cached as PNG under ICONS_DIR
+ICON_DATA = {
+    "back": (
+        b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMjAgMTFINy44M2w1LjU5LTUuNTlMMTIgNGwtOCA4IDggOCAxLjQxLTEuNDFMNy44MyAxM0gyMHYtMnoiLz48L3N2Zz4='),
+    "forward": (
+        b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMTIgNGwtMS40MSAxLjQxTDE2LjE3IDExSDR2MmgxMi4xN2wtNS41OCA1LjU5TDEyIDIwbDgtOHoiLz48L3N2Zz4='),
+    "reload": (
+        b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMTcuNjUgNi4zNUMxNi4yIDQuOSAxNC4yMSA0IDEyIDRjLTQuNDIgMC03Ljk5IDMuNTgtNy45OSA4czMuNTcgOCA3Ljk5IDhjMy43MyAwIDYuODQtMi41NSA3LjczLTZoLTIuMDhjLS44MiAyLjMzLTMuMDQgNC01LjY1IDQtMy4zMSAwLTYtMi42OS02LTZzMi42OS02IDYtNmMxLjY2IDAgMy4xNC42OSA0LjIyIDEuNzhMMTMgMTFoN1Y0bC0yLjM1IDIuMzV6Ii8+PC9zdmc+'),
+    "home": (
+        b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMTAgMjB2LTZoNHY2aDV2LThoM0wxMiAzIDIgMTJoM3Y4eiIvPjwvc3ZnPg=='),
+    "close": (
+        b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNjQ3NDhiIiBkPSJNMTkgNi40MUwxNy41OSA1IDEyIDEwLjU5IDYuNDEgNSA1IDYuNDEgMTAuNTkgMTIgNSAxNy41OSA2LjQxIDE5IDEyIDEzLjQxIDE3LjU5IDE5IDE5IDE3LjU5IDEzLjQxIDEyIDE5IDYuNDF6Ii8+PC9zdmc+'),
+    "loading": (
+        b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSJub25lIiBzdHJva2U9IiMzYjgyZjYiIHN0cm9rZS13aWR0aD0iMyIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBkPSJNMTIgM2E5IDkgMCAxIDAgOSA5Ii8+PC9zdmc+'),
+    "pin": (
+        b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNjQ3NDhiIiBkPSJNMTYgOVY0aDFjLjU1IDAgMS0uNDUgMS0xcy0uNDUtMS0xLTFIN2MtLjU1IDAtMSAuNDUtMSAxcy40NSAxIDEgMWgxdjVjMCAxLjY2LTEuMzQgMy0zIDN2Mmg1Ljk3djdsMSAxIDEtMXYtN0gxOXYtMmMtMS42NiAwLTMtMS4zNC0zLTN6Ii8+PC9zdmc+'),
+    "newtab": (
+        b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMTkgMTNoLTZ2NmgtMnYtNkg1di0yaDZWNWgydjZoNnYyeiIvPjwvc3ZnPg=='),
+}
+
+# Default settings, any of which can be overridden in config.json
+DEFAULT_CONFIG = {
+    "appearance": {
+        "theme": "light",           # "light" or "dark"; View > Dark Theme switches for the session
+    },
+    "hibernation": {
+        "enabled": True,
+        "idle_timeout": 30,         # Seconds out of sight before a tab is frozen
+        "discard_timeout": 1800,    # Seconds in the background before a tab is discarded
+        "max_live_tabs": 20,        # Tabs over this limit are discarded, least recently used first
+        "check_interval": 15,       # Seconds between idle checks
+    },
+    "memory": {
+        "enabled": True,            # Watch how much memory the browser and its renderers use
+        "threshold_mb": 2048,       # Background tabs are discarded, least recently used first, above this
+        "check_interval": 10,       # Seconds between samples
+        "log": True,                # Append every sample to memory-metrics.jsonl
+        "max_log_size_mb": 5,       # The log is rotated to a .1 file once it is larger
+    },
+    "processes": {
+        "model": "site-per-process",  # Or "process-per-site-instance", or "process-per-site" to share one renderer per site
+        "renderer_limit": 0,        # Renderers are shared between tabs beyond this; 0 leaves it to Chromium
+    },
+    "session": {
+        "restore": True,            # Reopen the tabs from the last session on startup
+        "flush_delay": 250,         # Milliseconds tab changes are batched before being written
+        "compact_every": 500,       # Journal records between snapshot rebuilds
+        "compact_interval": 300,    # Seconds between periodic snapshot rebuilds
+    },
+    "history": {
+        "suggestions": 8,           # Entries shown under the URL bar
+        "half_life_days": 30,       # How quickly old visits stop counting towards frecency
+    },
+    "search": {
+        "engine": "google",         # Engine used for searches typed in the URL bar
+        "engines": {                # Search URLs by name, with {} where the query goes
+            "google": "https://www.google.com/search?q={}",
+            "duckduckgo": "https://duckduckgo.com/?q={}",
+            "bing": "https://www.bing.com/search?q={}",
+            "startpage": "https://www.startpage.com/do/search?q={}",
+        },
+        "intranet_hosts": [],       # Host names, or .suffixes, that are always addresses
+        "public_suffix_list": "",   # Defaults to ~/.nexawave/public_suffix_list.dat, then the system's copy
+    },
+    "predictor": {
+        "enabled": True,            # Get a head start on the page the URL bar is likely to open
+        "min_chars": 2,             # Characters typed before anything is predicted
+        "preresolve_confidence": 0.5,  # Look up the likely page's host name at or above this confidence
+        "prerender": True,          # Also load the likely page out of sight
+        "prerender_confidence": 0.8,   # ...at or above this confidence
+        "max_entries": 2000,        # Typed text and page pairs remembered, least recently used dropped
+    },
+    "page_index": {
+        "enabled": True,            # Index the text of visited pages for history search
+        "max_size_mb": 200,         # Oldest pages are dropped once the indexed text is larger
+        "max_page_chars": 100000,   # Text kept per page
+    },
+    "snapshots": {
+        "enabled": True,            # Save pages as MHTML so they can be reopened offline
+        "max_size_mb": 500,         # Least recently opened snapshots are dropped past this size
+        "auto_after_visits": 5,     # Pages visited this often are saved too; 0 only saves marked tabs
+        "refresh_after": 3600,      # Seconds before a page is saved again
+        "serve_first": False,       # Show the snapshot at once and swap in the live page once loaded
+        "offline_fallback": True,   # Show the snapshot when the live page fails to load
+    },
+    "thumbnails": {
+        "enabled": True,            # Capture page thumbnails for the tab overview and the new tab page
+        "width": 240,               # Thumbnail size in pixels
+        "height": 150,
+        "quality": 80,              # JPEG quality of the thumbnails kept on disk
+        "memory_items": 300,        # Decoded thumbnails kept in memory, least recently used dropped first
+        "max_disk_mb": 100,         # Least recently used thumbnail files are deleted past this size
+        "capture_delay": 500,       # Milliseconds after a page loads or is selected before it is captured
+        "refresh_after": 600,       # Seconds before a page's thumbnail is captured again
+    },
+    "new_tab": {
+        "page": True,               # Open new tabs on the most visited sites instead of the home page
+        "sites": 8,                 # Sites shown on the new tab page
+    },
+    "load_metrics": {
+        "enabled": True,            # Time every page load and log it for the developer panel
+        "format": "jsonl",          # Log file format, "jsonl" or "csv"
+        "max_size_mb": 20,          # The log is rotated to a .1 file once it is larger
+        "keep": 500,                # Recent loads kept in memory for the developer panel
+    },
+    "downloads": {
+        "directory": "",            # Defaults to ~/Downloads
+        "segments": 4,              # Parallel Range requests per file, where the server supports them
+        "min_segment_mb": 8,        # Files are only split into parts at least this large
+        "max_connections": 8,       # Connections open at once across all downloads
+        "max_rate_kbps": 0,         # Combined download speed limit; 0 means no limit
+        "checksum_files": True,     # Check files against a <url>.sha256 file when the server has one
+    },
+    "content_blocker": {
+        "enabled": True,            # Block requests matched by the filter lists
+        "lists": [],                # EasyList-style files; empty means every .txt in ~/.nexawave/filters
+    },
+    "control": {
+        "enabled": False,           # Accept automation commands on a local socket; --control also turns it on
+        "socket": "",               # Defaults to ~/.nexawave/control.sock
+        "timeout": 30,              # Seconds a call waiting for a page load or a script may take
+    },
+    "profile": {
+        "name": "default",          # Named on-disk profile shared by every tab
+        "storage_path": "",         # Defaults to ~/.nexawave/profiles/<name>
+        "cache_type": "disk",       # "disk", "memory" or "none"
+        "cache_size_mb": 512,       # 0 leaves the size to Chromium
+        "cookies": "persistent",    # "persistent", "session" (cleared on exit) or "force"
+        "block_third_party_cookies": False,
+        "private_tabs": True,       # Offer private tabs backed by an off-the-record profile
+    },
+}
+
+def load_config(path=CONFIG_PATH):
+    """Load the config file, filling in defaults for anything it leaves out"""
+    config = {section: dict(values) for section, values in DEFAULT_CONFIG.items()}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            user_config = json.load(f)
+    except (OSError, ValueError):
+        return config
+    
+    for section, values in user_config.items():
+        if isinstance(values, dict) and isinstance(config.get(section), dict):
+            config[section].update(values)
+        else:
+            config[section] = values
+    return config
+
+# Chromium switches for each renderer process model. QtWebEngine 5.15 runs Chromium's
+# default, site-per-process, which keeps every site in renderers of its own.
+PROCESS_MODELS = {
+    "site-per-process": [],
+    "process-per-site-instance": ["--process-per-site-instance"],
+    "process-per-site": ["--process-per-site"],
+}
+
+def chromium_arguments(settings):
+    """Command line switches for the configured process model, read by QtWebEngine at startup"""
+    arguments = list(PROCESS_MODELS.get(settings["model"], []))
+    if settings["renderer_limit"] > 0:
+        arguments.append(f"--renderer-process-limit={settings['renderer_limit']}")
+    return arguments
+
+_icon_cache = {}
+
+def load_icon(name, color=None):
+    """Return the named toolbar icon, decoding its SVG only the first time it is ever used.
+    
+    A colour repaints the icon's shape in it, for themes that need lighter icons.
+    """
+    icon = _icon_cache.get((name, color))
+    if icon is not None:
+        return icon
+    
+    # Rasterizing SVG loads the SVG plugin and costs far more than reading back a PNG
+    data = ICON_DATA[name]
+    path = os.path.join(ICONS_DIR, f"{name}-{zlib.crc32(data):08x}.png")
+    pixmap = QPixmap(path)
+    if pixmap.isNull():
+        pixmap = QPixmap.fromImage(QImage.fromData(QByteArray.fromBase64(data)))
+        try:
+            os.makedirs(ICONS_DIR, exist_ok=True)
+            pixmap.save(path, "PNG")
+        except OSError:
+            pass
+    if color is not None:
+        painter = QPainter(pixmap)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+        painter.fillRect(pixmap.rect(), QColor(color))
+        painter.end()
+    
+    icon = _icon_cache[name, color] = QIcon(pixmap)
+    return icon
+
+# Colours of each theme, filled into APP_STYLESHEET and the application palette
+THEMES = {
+    "light": {
+        "window": "#ffffff",          # Pages, menus and the focused URL bar
+        "chrome": "#f8f9fa",          # Toolbar, tab strip, menu bar and status bar
+        "hover": "#f1f5f9",
+        "pressed": "#e2e8f0",
+        "border": "#e2e8f0",
+        "scrollbar": "#cbd5e1",
+        "scrollbar_hover": "#94a3b8",
+        "text": "#1e293b",
+        "muted": "#64748b",
+        "icon": "#505050",
+        "accent": "#3b82f6",
+        "selection": "#2563eb",
+        "highlighted_text": "#ffffff",
+    },
+    "dark": {
+        "window": "#0f172a",
+        "chrome": "#1e293b",
+        "hover": "#273449",
+        "pressed": "#334155",
+        "border": "#334155",
+        "scrollbar": "#475569",
+        "scrollbar_hover": "#64748b",
+        "text": "#e2e8f0",
+        "muted": "#94a3b8",
+        "icon": "#cbd5e1",
+        "accent": "#3b82f6",
+        "selection": "#2563eb",
+        "highlighted_text": "#ffffff",
+    },
+}
+
+# The whole application's style, with $names for the theme's colours. Rules are
+# keyed by widget class, so widgets never carry style sheets of their own.
+APP_STYLESHEET = string.Template("""
+    Browser {
+        background-color: $window;
+    }
+    QStatusBar {
+        background-color: $chrome;
+        color: $muted;
+        border-top: 1px solid $border;
+        font-size: 12px;
+    }
+    QLabel[muted="true"] {
+        color: $muted;
+    }
+    QScrollBar:vertical {
+        border: none;
+        background: $hover;
+        width: 10px;
+        margin: 0px;
+        border-radius: 5px;
+    }
+    QScrollBar::handle:vertical {
+        background: $scrollbar;
+        min-height: 20px;
+        border-radius: 5px;
+    }
+    QScrollBar::handle:vertical:hover {
+        background: $scrollbar_hover;
+    }
+    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    QScrollBar:horizontal {
+        border: none;
+        background: $hover;
+        height: 10px;
+        margin: 0px;
+        border-radius: 5px;
+    }
+    QScrollBar::handle:horizontal {
+        background: $scrollbar;
+        min-width: 20px;
+        border-radius: 5px;
+    }
+    QScrollBar::handle:horizontal:hover {
+        background: $scrollbar_hover;
+    }
+    QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
+        width: 0px;
+    }
+    QMenuBar {
+        background-color: $chrome;
+        color: $text;
+        border-bottom: 1px solid $border;
+    }
+    QMenuBar::item {
+        background: transparent;
+        padding: 8px 12px;
+    }
+    QMenuBar::item:selected {
+        background: $pressed;
+        border-radius: 4px;
+    }
+    QMenu {
+        background-color: $window;
+        color: $text;
+        border: 1px solid $border;
+        border-radius: 6px;
+        padding: 4px;
+    }
+    QMenu::item {
+        padding: 8px 30px 8px 15px;
+        border-radius: 4px;
+    }
+    QMenu::item:selected {
+        background-color: $hover;
+        color: $text;
+    }
+    QMenu::separator {
+        height: 1px;
+        background-color: $border;
+        margin: 6px 10px;
+    }
+    
+    NavigationToolBar {
+        background-color: $chrome;
+        border-bottom: 1px solid $border;
+        spacing: 10px;
+        padding: 8px 12px;
+    }
+    NavigationToolBar QToolButton {
+        background-color: transparent;
+        border: 1px solid transparent;
+        border-radius: 6px;
+        padding: 8px;
+    }
+    NavigationToolBar QToolButton:hover {
+        background-color: $hover;
+        border: 1px solid $border;
+    }
+    NavigationToolBar QToolButton:pressed {
+        background-color: $pressed;
+    }
+    
+    UrlBar {
+        background-color: $chrome;
+        border: 1px solid $border;
+        border-radius: 24px;
+        padding: 10px 18px;
+        selection-background-color: $selection;
+        font-size: 14px;
+        color: $text;
+        min-height: 26px;
+        margin: 4px 0px;
+    }
+    UrlBar:focus {
+        border: 1.5px solid $accent;
+        background-color: $window;
+    }
+    
+    ModernProgressBar {
+        border: none;
+        background-color: transparent;
+    }
+    ModernProgressBar::chunk {
+        background-color: $accent;
+        border-radius: 1.5px;
+    }
+    
+    TabBar::pane {
+        border-top: 1px solid $border;
+        background: $window;
+    }
+    TabBar::tab-bar {
+        alignment: left;
+    }
+    TabBar QTabBar::tab {
+        background: $chrome;
+        border: 1px solid $border;
+        border-bottom: none;
+        border-top-left-radius: 6px;
+        border-top-right-radius: 6px;
+        padding: 10px 16px;
+        margin-right: 3px;
+        color: $muted;
+        font-size: 13px;
+        width: 180px;
+    }
+    TabBar QTabBar::tab:selected {
+        background: $window;
+        border-bottom: none;
+        border-top: 2.5px solid $accent;
+        padding-right: 36px;
+        width: 160px;
+        color: $text;
+        font-weight: 600;
+    }
+    TabBar QTabBar::tab:hover:!selected {
+        background: $hover;
+    }
+    QToolButton#closeTabButton {
+        border: none;
+        padding: 0px;
+    }
+    QToolButton#closeTabButton:hover {
+        background: $pressed;
+        border-radius: 8px;
+    }
+""")
+
+class ThemeEngine(QObject):
+    """Styles the whole application with one style sheet built from a theme's colours.
+    
+    Widgets carry no style sheets of their own; their rules are keyed by
+    class in APP_STYLESHEET, so a theme is only a set of colours and
+    switching it is one palette and one style sheet change. The windows'
+    updates are held back meanwhile, so they repaint once, in the new
+    colours. Restyling touches every widget that has been shown, and takes
+    longer the more tabs are open; --bench-tabs reports it.
+    """
+    themeChanged = pyqtSignal(str)
+    
+    def __init__(self, app, name="light"):
+        super().__init__(app)
+        self.app = app
+        self.name = None
+        # Style sheets built so far, by theme
+        self._stylesheets = {}
+        self.apply(name)
+    
+    def colors(self, name=None):
+        return THEMES[name or self.name]
+    
+    def color(self, token):
+        return QColor(self.colors()[token])
+    
+    def icon(self, name):
+        return load_icon(name, self.colors()["icon"])
+    
+    def stylesheet(self, name):
+        if name not in self._stylesheets:
+            self._stylesheets[name] = APP_STYLESHEET.substitute(THEMES[name])
+        return self._stylesheets[name]
+    
+    def palette(self, name):
+        colors = THEMES[name]
+        # Shades for frames and lines are derived from the button and window colours
+        palette = QPalette(QColor(colors["chrome"]), QColor(colors["window"]))
+        for role, token in ((QPalette.Window, "window"), (QPalette.WindowText, "text"),
+                            (QPalette.Base, "window"), (QPalette.AlternateBase, "chrome"),
+                            (QPalette.Text, "text"), (QPalette.Button, "chrome"),
+                            (QPalette.ButtonText, "text"), (QPalette.ToolTipBase, "chrome"),
+                            (QPalette.ToolTipText, "text"), (QPalette.PlaceholderText, "muted"),
+                            (QPalette.Link, "accent"), (QPalette.Highlight, "accent"),
+                            (QPalette.HighlightedText, "highlighted_text")):
+            palette.setColor(role, QColor(colors[token]))
+        return palette
+    
+    def apply(self, name):
+        if name not in THEMES:
+            name = "light"
+        if name == self.name:
+            return
+        windows = [window for window in self.app.topLevelWidgets() if window.isVisible()]
+        for window in windows:
+            window.setUpdatesEnabled(False)
+        self.app.setPalette(self.palette(name))
+        self.app.setStyleSheet(self.stylesheet(name))
+        for window in windows:
+            window.setUpdatesEnabled(True)
+        self.name = name
+        self.themeChanged.emit(name)
+
 class UrlBar(QLineEdit):
     """Custom URL bar with rounded corners and better styling"""
     def __init__(self, parent=None):
         super().__init__(parent)
-        # Apply styling
         self.setPlaceholderText("Search or enter website name")
-        self.setStyleSheet("""
-            QLineEdit {
-                background-color: #f8f9fa;
-                border: 1px solid #e2e8f0;
-                border-radius: 24px;
-                padding: 10px 18px;
-                selection-background-color: #2563eb;
-                font-size: 14px;
-                color: #1e293b;
-                min-height: 26px;
-                margin: 4px 0px;
-            }
-            QLineEdit:focus {
-                border: 1.5px solid #3b82f6;
-                background-color: white;
-            }
+
+class TabBar(QTabWidget):
+    """Custom tab widget with improved styling"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setDocumentMode(True)
+        self.setMovable(True)
+        self.setElideMode(Qt.ElideRight)
+        
+        # One close button floats over the current tab. Buttons placed in the tabs
+        # themselves make the tab bar lay out and restyle every tab whenever one
+        # changes, which gets slow with hundreds of tabs.
+        self._close_button = QToolButton(self.tabBar())
+        self._close_button.setObjectName("closeTabButton")
+        self._close_button.setIcon(load_icon("close"))
+        self._close_button.setIconSize(QSize(16, 16))
+        self._close_button.setToolTip("Close Tab")
+        self._close_button.clicked.connect(lambda: self.tabCloseRequested.emit(self.currentIndex()))
+        self._close_button.hide()
+        
+        # The button is kept in place whenever the tab bar repaints; any tab can
+        # also be closed with a middle click
+        self.tabBar().installEventFilter(self)
+    
+    def _place_close_button(self):
+        index = self.currentIndex()
+        if index < 0:
+            self._close_button.hide()
+            return
+        rect = self.tabBar().tabRect(index)
+        size = self._close_button.sizeHint()
+        position = QPoint(rect.right() - size.width() - 12, rect.center().y() - size.height() // 2)
+        if self._close_button.pos() != position:
+            self._close_button.move(position)
+        if self._close_button.isHidden():
+            self._close_button.show()
+    
+    def eventFilter(self, obj, event):
+        if obj is self.tabBar():
+            if event.type() == QEvent.Paint:
+                self._place_close_button()
+            elif event.type() == QEvent.MouseButtonRelease and event.button() == Qt.MiddleButton:
+                index = self.tabBar().tabAt(event.pos())
+                if index >= 0:
+                    self.tabCloseRequested.emit(index)
+                    return True
+        return super().eventFilter(obj, event)
+
+class NavigationToolBar(QToolBar):
+    """Custom navigation toolbar with better styling"""
+    def __init__(self, title, parent=None):
+        super().__init__(title, parent)
+        self.setIconSize(QSize(24, 24))
+        self.setMovable(False)
+        self.setContextMenuPolicy(Qt.NoContextMenu)
+        # QToolBar lays itself out with the style while it is still constructed as a
+        # plain QToolBar; polishing again applies the rules for this class
+        self.style().unpolish(self)
+        self.style().polish(self)
+
+class ModernProgressBar(QProgressBar):
+    """A more modern progress bar"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setTextVisible(False)
+        self.setMaximumHeight(3)
+
+class ActionButton(QAction):
+    """Custom action button with better styling"""
+    def __init__(self, text, parent=None):
+        super().__init__(text, parent)
+        font = QFont()
+        font.setPointSize(13)
+        self.setFont(font)
+
+class SessionState:
+    """Ordered list of open tabs, rebuilt by replaying session journal records"""
+    def __init__(self, tabs=None, current_id=None, seq=0):
+        self.tabs = tabs or []
+        self.current_id = current_id
+        self.seq = seq
+    
+    @classmethod
+    def from_dict(cls, data):
+        tabs = [tab for tab in data.get("tabs", []) if tab.get("url")]
+        # Sessions saved before tabs had ids are numbered in order
+        for tab_id, tab in enumerate(tabs):
+            tab.setdefault("id", tab_id)
+        current_id = data.get("current_id")
+        if current_id is None and tabs:
+            current = data.get("current", 0)
+            current_id = tabs[current]["id"] if 0 <= current < len(tabs) else None
+        return cls(tabs, current_id, data.get("seq", 0))
+    
+    def to_dict(self):
+        return {"tabs": self.tabs, "current_id": self.current_id, "seq": self.seq}
+    
+    def find(self, tab_id):
+        for index, tab in enumerate(self.tabs):
+            if tab["id"] == tab_id:
+                return index
+        return -1
+    
+    def position(self, record):
+        """Where an open or move record puts its tab: just after the tab it names, or first for None.
+        
+        Journals written before records named a neighbour give an index instead.
+        """
+        if "after" not in record:
+            return min(record["index"], len(self.tabs))
+        if record["after"] is None:
+            return 0
+        index = self.find(record["after"])
+        return index + 1 if index >= 0 else len(self.tabs)
+    
+    def apply(self, record):
+        op = record["op"]
+        index = self.find(record["id"])
+        if op == "open" and index < 0:
+            tab = {"id": record["id"], "url": record["url"], "title": record.get("title", "")}
+            self.tabs.insert(self.position(record), tab)
+        elif index < 0:
+            pass
+        elif op == "close":
+            del self.tabs[index]
+        elif op == "move":
+            tab = self.tabs.pop(index)
+            self.tabs.insert(self.position(record), tab)
+        elif op == "url":
+            self.tabs[index]["url"] = record["url"]
+        elif op == "title":
+            self.tabs[index]["title"] = record["title"]
+        elif op == "pin":
+            self.tabs[index]["pinned"] = record["pinned"]
+        elif op == "select":
+            self.current_id = record["id"]
+        self.seq = record["seq"]
+
+class SessionJournalWriter(QObject):
+    """Appends journal records and compacts them into a snapshot, on its own thread"""
+    def __init__(self, snapshot_path, journal_path, state, compact_every):
+        super().__init__()
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.state = state
+        self.compact_every = compact_every
+        self._since_compact = 0
+    
+    @pyqtSlot(list)
+    def append(self, records):
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        
+        for record in records:
+            self.state.apply(record)
+        self._since_compact += len(records)
+        if self._since_compact >= self.compact_every:
+            self.compact()
+    
+    @pyqtSlot()
+    def compact(self):
+        if self._since_compact == 0 and os.path.exists(self.snapshot_path):
+            return
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        
+        # Write to a temporary file first so a crash never leaves half a snapshot.
+        # The snapshot's seq lets a reload skip records it already contains.
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        
+        open(self.journal_path, "w").close()
+        self._since_compact = 0
+
+class SessionJournal(QObject):
+    """Records tab changes as small debounced journal entries written off the GUI thread"""
+    flushRequested = pyqtSignal(list)
+    compactRequested = pyqtSignal()
+    
+    def __init__(self, settings, parent=None, snapshot_path=SESSION_PATH):
+        super().__init__(parent)
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal"
+        self.state = self._replay()
+        self._seq = self.state.seq
+        self._pending = []
+        
+        # Records are batched for a short moment, which bounds what a crash can lose
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(settings["flush_delay"])
+        self._flush_timer.timeout.connect(self.flush)
+        
+        self._compact_timer = QTimer(self)
+        self._compact_timer.setInterval(settings["compact_interval"] * 1000)
+        self._compact_timer.timeout.connect(self.compactRequested)
+        self._compact_timer.start()
+        
+        # The writer gets its own copy of the state to keep up to date
+        self._writer = SessionJournalWriter(self.snapshot_path, self.journal_path,
+                                            SessionState.from_dict(self.state.to_dict()),
+                                            settings["compact_every"])
+        self._thread = QThread(self)
+        self._writer.moveToThread(self._thread)
+        self.flushRequested.connect(self._writer.append)
+        self.compactRequested.connect(self._writer.compact)
+        self._thread.start()
+    
+    def _replay(self):
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                state = SessionState.from_dict(json.load(f))
+        except (OSError, ValueError):
+            state = SessionState()
+        
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash can leave the last line half written
+                        continue
+                    if record.get("seq", 0) > state.seq:
+                        state.apply(record)
+        except OSError:
+            pass
+        return state
+    
+    def load(self):
+        """Return the saved session as a dict with "tabs" and "current", or None"""
+        if not self.state.tabs:
+            return None
+        current = max(self.state.find(self.state.current_id), 0)
+        return {"tabs": self.state.tabs, "current": current}
+    
+    def record(self, op, tab_id, **fields):
+        # Only the latest URL, title or selection within a batch is worth writing
+        if op in ("url", "title", "select"):
+            self._pending = [r for r in self._pending
+                             if not (r["op"] == op and (op == "select" or r["id"] == tab_id))]
+        
+        self._seq += 1
+        self._pending.append(dict(fields, op=op, id=tab_id, seq=self._seq))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+    
+    def flush(self):
+        self._flush_timer.stop()
+        if self._pending:
+            self.flushRequested.emit(self._pending)
+            self._pending = []
+    
+    def close(self):
+        """Write out everything still pending and compact before shutting down"""
+        if not self._thread.isRunning():
+            return
+        self.flush()
+        self._compact_timer.stop()
+        QMetaObject.invokeMethod(self._writer, "compact", Qt.BlockingQueuedConnection)
+        self._thread.quit()
+        self._thread.wait()
+
+def strip_url(url):
+    """Reduce a URL to the form people type it in, without scheme or "www." prefix"""
+    url = re.sub(r"^[a-zA-Z][a-zA-Z0-9+.-]*://", "", url.strip()).lower()
+    if url.startswith("www."):
+        url = url[4:]
+    return url
+
+class HistoryDatabase:
+    """SQLite history of visited pages, indexed for URL bar suggestions"""
+    # Candidate rows looked at per substring query; keeps lookups fast on very large histories
+    SCAN_LIMIT = 200
+    # The most frecent rows are kept in memory and tried first, as short
+    # prefixes nearly always mean one of them
+    TOP_SITES = 2000
+    
+    def __init__(self, path=HISTORY_PATH, half_life_days=30):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.decay = math.log(2) / (half_life_days * 86400)
+        
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                stripped TEXT NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                visit_count INTEGER NOT NULL DEFAULT 0,
+                last_visit REAL NOT NULL,
+                frecency REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS history_stripped_frecency ON history(stripped, frecency);
+            DROP INDEX IF EXISTS history_stripped;
+            CREATE INDEX IF NOT EXISTS history_frecency ON history(frecency);
+        """)
+        
+        # Substring matches use an FTS5 trigram index where SQLite supports it
+        try:
+            cursor.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_trigrams USING fts5(
+                    stripped, title, content='history', content_rowid='id', tokenize='trigram');
+                CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+                    INSERT INTO history_trigrams(rowid, stripped, title)
+                    VALUES (new.id, new.stripped, new.title);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+                    INSERT INTO history_trigrams(history_trigrams, rowid, stripped, title)
+                    VALUES ('delete', old.id, old.stripped, old.title);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_au AFTER UPDATE OF title ON history BEGIN
+                    INSERT INTO history_trigrams(history_trigrams, rowid, stripped, title)
+                    VALUES ('delete', old.id, old.stripped, old.title);
+                    INSERT INTO history_trigrams(rowid, stripped, title)
+                    VALUES (new.id, new.stripped, new.title);
+                END;
+            """)
+            self.has_trigrams = True
+        except sqlite3.OperationalError:
+            self.has_trigrams = False
+        self.connection.commit()
+        
+        self._top_sites = None
+    
+    def frecency(self, previous, now, weight=1.0):
+        """Add a visit to a frecency score.
+        
+        Scores are kept as log(decayed visit weight) + decay * time, so they can be
+        compared and indexed without ever being recomputed as time passes.
+        """
+        base = self.decay * now
+        if previous is None:
+            return base + math.log(weight)
+        return base + math.log(weight + math.exp(previous - base))
+    
+    def add_visit(self, url, title="", now=None):
+        now = now or time.time()
+        cursor = self.connection.cursor()
+        row = cursor.execute("SELECT frecency FROM history WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            cursor.execute(
+                "INSERT INTO history (url, stripped, title, visit_count, last_visit, frecency) "
+                "VALUES (?, ?, ?, 1, ?, ?)",
+                (url, strip_url(url), title, now, self.frecency(None, now)))
+        else:
+            cursor.execute(
+                "UPDATE history SET visit_count = visit_count + 1, last_visit = ?, frecency = ? "
+                "WHERE url = ?", (now, self.frecency(row[0], now), url))
+            if title:
+                self.set_title(url, title)
+        self.connection.commit()
+        self._update_top_sites(url)
+    
+    def top_sites(self):
+        """Return the most frecent pages as (stripped, url, title, frecency), best first"""
+        if self._top_sites is None:
+            self._top_sites = self.connection.execute(
+                "SELECT stripped, url, title, frecency FROM history "
+                "ORDER BY frecency DESC LIMIT ?", (self.TOP_SITES,)).fetchall()
+        return self._top_sites
+    
+    def _update_top_sites(self, url):
+        if self._top_sites is None:
+            return
+        entry = self.connection.execute(
+            "SELECT stripped, url, title, frecency FROM history WHERE url = ?", (url,)).fetchone()
+        
+        top_sites = [site for site in self._top_sites if site[1] != url]
+        if len(top_sites) < self.TOP_SITES or entry[3] > top_sites[-1][3]:
+            top_sites.append(entry)
+            top_sites.sort(key=lambda site: site[3], reverse=True)
+        self._top_sites = top_sites[:self.TOP_SITES]
+    
+    def set_title(self, url, title):
+        self.connection.execute(
+            "UPDATE history SET title = ? WHERE url = ? AND title != ?", (title, url, title))
+        self.connection.commit()
+        self._update_top_sites(url)
+    
+    def most_visited(self, limit=8):
+        """Return the limit most frecent web pages as (url, title), for the new tab page"""
+        return [(url, title) for _, url, title, _ in self.top_sites()
+                if url.startswith(("http://", "https://"))][:limit]
+    
+    def suggest(self, text, limit=8):
+        """Return up to limit (url, title) pairs for typed text, best matches first"""
+        prefix = strip_url(text)
+        if not prefix:
+            return []
+        # Every string starting with prefix sorts between prefix and this upper bound
+        upper = prefix + "\U0010ffff"
+        cursor = self.connection.cursor()
+        
+        results = [(url, title) for stripped, url, title, _ in self.top_sites()
+                   if stripped.startswith(prefix)][:limit]
+        
+        # Prefixes that get this far are rare, so ranking all their matches from
+        # the index alone is cheap
+        if len(results) < limit:
+            results += cursor.execute("""
+                SELECT url, title FROM history WHERE id IN (
+                    SELECT id FROM history WHERE stripped >= ? AND stripped < ?
+                    ORDER BY frecency DESC LIMIT ?)
+                ORDER BY frecency DESC
+            """, (prefix, upper, limit)).fetchall()
+            results = list(dict.fromkeys(results))
+        
+        # Fill any space left with pages that contain the text anywhere
+        if len(results) < limit and self.has_trigrams and len(prefix) >= 3:
+            query = '"' + prefix.replace('"', '""') + '"'
+            results += cursor.execute("""
+                SELECT url, title FROM (
+                    SELECT history.url, history.title, history.frecency
+                    FROM history_trigrams JOIN history ON history.id = history_trigrams.rowid
+                    WHERE history_trigrams MATCH ? LIMIT ?)
+                ORDER BY frecency DESC LIMIT ?
+            """, (query, self.SCAN_LIMIT, limit)).fetchall()
+            results = list(dict.fromkeys(results))
+        
+        return results[:limit]
+    
+    def close(self):
+        self.connection.close()
+
+class HistoryWorker(QObject):
+    """Runs the history database on its own thread"""
+    suggestionsReady = pyqtSignal(str, list)
+    mostVisitedReady = pyqtSignal(list)
+    
+    def __init__(self, path, half_life_days):
+        super().__init__()
+        self.path = path
+        self.half_life_days = half_life_days
+        self._db = None
+    
+    def db(self):
+        # Opened on first use so it is created on the worker thread
+        if self._db is None:
+            self._db = HistoryDatabase(self.path, self.half_life_days)
+        return self._db
+    
+    @pyqtSlot(str, str)
+    def add_visit(self, url, title):
+        self.db().add_visit(url, title)
+    
+    @pyqtSlot(str, int)
+    def suggest(self, text, limit):
+        self.suggestionsReady.emit(text, self.db().suggest(text, limit))
+    
+    @pyqtSlot(int)
+    def most_visited(self, limit):
+        self.mostVisitedReady.emit(self.db().most_visited(limit))
+    
+    @pyqtSlot()
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class HistoryStore(QObject):
+    """Persistent browsing history, queried asynchronously as the user types"""
+    suggestionsReady = pyqtSignal(str, list)
+    mostVisitedReady = pyqtSignal(list)
+    visitRequested = pyqtSignal(str, str)
+    suggestRequested = pyqtSignal(str, int)
+    mostVisitedRequested = pyqtSignal(int)
+    
+    def __init__(self, settings, parent=None, path=HISTORY_PATH):
+        super().__init__(parent)
+        self.limit = settings["suggestions"]
+        self._in_flight = False
+        self._queued_text = None
+        
+        self._worker = HistoryWorker(path, settings["half_life_days"])
+        self._thread = QThread(self)
+        self._worker.moveToThread(self._thread)
+        self.visitRequested.connect(self._worker.add_visit)
+        self.suggestRequested.connect(self._worker.suggest)
+        self.mostVisitedRequested.connect(self._worker.most_visited)
+        self._worker.suggestionsReady.connect(self._suggestions_ready)
+        self._worker.mostVisitedReady.connect(self.mostVisitedReady)
+        self._thread.start()
+    
+    def add_visit(self, url, title=""):
+        self.visitRequested.emit(url, title)
+    
+    def suggest(self, text):
+        # Only one query runs at a time; keystrokes typed meanwhile collapse into the latest
+        if self._in_flight:
+            self._queued_text = text
+            return
+        self._in_flight = True
+        self.suggestRequested.emit(text, self.limit)
+    
+    def most_visited(self, limit):
+        """Ask for the most visited pages; the answer arrives through mostVisitedReady"""
+        self.mostVisitedRequested.emit(limit)
+    
+    def _suggestions_ready(self, text, results):
+        self._in_flight = False
+        if self._queued_text is not None:
+            queued, self._queued_text = self._queued_text, None
+            self.suggest(queued)
+            if queued != text:
+                return
+        self.suggestionsReady.emit(text, results)
+    
+    def close(self):
+        if not self._thread.isRunning():
+            return
+        QMetaObject.invokeMethod(self._worker, "close", Qt.BlockingQueuedConnection)
+        self._thread.quit()
+        self._thread.wait()
+
+class NavigationPredictor(QObject):
+    """Gets a head start on the page the URL bar is about to open.
+    
+    For each text typed, the predictor remembers how often each suggested
+    page was then opened (a hit) or passed over (a miss), and rates a
+    suggestion (hits + 1) / (hits + misses + 2), so a page never seen for the
+    text starts at 0.5. At preresolve_confidence, the page's host name is
+    looked up, which leaves it in the system resolver's cache for Chromium.
+    QtWebEngine has no way to open a connection ahead of time: it ignores
+    <link rel="preconnect">, and its pages do not share idle sockets. At
+    prerender_confidence, the page itself is loaded out of sight and swapped
+    into the tab when that is where the user goes.
+    """
+    statsChanged = pyqtSignal()
+    # Seconds a looked up host name is taken to stay cached; most records live at least this long
+    PRERESOLVE_LIFETIME = 60
+    # Seconds an unused prerendered page is kept before its renderer is released
+    PRERENDER_LIFETIME = 30
+    
+    def __init__(self, browser, settings, path=PREDICTOR_PATH):
+        super().__init__(browser)
+        self.browser = browser
+        self.enabled = settings["enabled"]
+        self.min_chars = settings["min_chars"]
+        self.preresolve_confidence = settings["preresolve_confidence"]
+        self.prerender_enabled = settings["prerender"]
+        self.prerender_confidence = settings["prerender_confidence"]
+        self.max_entries = settings["max_entries"]
+        self.path = path
+        # Hits, misses and last use by (typed text, URL), read on first use
+        self._entries = None
+        self._stats = {"navigations": 0, "preresolves": 0, "preresolve_hits": 0,
+                      "prerenders": 0, "prerender_hits": 0, "saved_ms": 0.0}
+        # Texts typed since the last navigation, with the pages suggested for each
+        self._typed = {}
+        # Host names looked up ahead, with when and how long the lookup took in ms
+        self._resolved = {}
+        # The prerendered page with its URL and when it started and finished loading
+        self._prerender = None
+        
+        self._prerender_timer = QTimer(self)
+        self._prerender_timer.setSingleShot(True)
+        self._prerender_timer.setInterval(self.PRERENDER_LIFETIME * 1000)
+        self._prerender_timer.timeout.connect(self.cancel_prerender)
+        browser.tabs.currentChanged.connect(self.reset)
+    
+    def entries(self):
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._stats.update(data["stats"])
+                for text, url, hits, misses, used in data["entries"]:
+                    self._entries[text, url] = [hits, misses, used]
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        return self._entries
+    
+    def confidence(self, text, url):
+        hits, misses, _ = self.entries().get((text, url), (0, 0, 0))
+        return (hits + 1) / (hits + misses + 2)
+    
+    def suggested(self, text, results):
+        """Act on the history suggestions for what the user is typing"""
+        text = text.strip().lower()
+        if (not self.enabled or not results or len(text) < self.min_chars
+                or text != self.browser.url_bar.text().strip().lower()):
+            return
+        state = self.browser.current_state()
+        if state is None or state.private or self.browser.profiles is None:
+            return
+        urls = [url for url, _ in results]
+        self._typed[text] = urls
+        
+        # The first of the most confident suggestions, which are ranked by frecency
+        url, confidence = max(((url, self.confidence(text, url)) for url in urls),
+                              key=lambda candidate: candidate[1])
+        if self.prerender_enabled and confidence >= self.prerender_confidence:
+            self.prerender(url)
+        elif confidence >= self.preresolve_confidence:
+            self.preresolve(url)
+    
+    def preresolve(self, url):
+        host = QUrl(url).host()
+        now = time.monotonic()
+        if not host or now - self._resolved.get(host, (-self.PRERESOLVE_LIFETIME,))[0] < self.PRERESOLVE_LIFETIME:
+            return
+        self._resolved = {other: lookup for other, lookup in self._resolved.items()
+                          if now - lookup[0] < self.PRERESOLVE_LIFETIME}
+        self._resolved[host] = (now, 0.0)
+        QHostInfo.lookupHost(host, lambda _, host=host, start=time.perf_counter(): self._resolved_host(host, start))
+        self._stats["preresolves"] += 1
+        self.statsChanged.emit()
+    
+    def _resolved_host(self, host, start):
+        if host in self._resolved:
+            self._resolved[host] = (self._resolved[host][0], (time.perf_counter() - start) * 1000)
+    
+    def prerender(self, url):
+        self._prerender_timer.start()
+        if self._prerender is not None and self._prerender["url"] == url:
+            return
+        self.cancel_prerender()
+        page = QWebEnginePage(self.browser.profiles.profile, self.browser)
+        page.setAudioMuted(True)
+        prerender = {"page": page, "url": url, "started": time.perf_counter(), "finished": None}
+        page.loadFinished.connect(lambda ok: prerender.update(finished=time.perf_counter() if ok else None))
+        page.setUrl(QUrl(url))
+        self._prerender = prerender
+        self._stats["prerenders"] += 1
+        self.statsChanged.emit()
+    
+    def cancel_prerender(self):
+        self._prerender_timer.stop()
+        if self._prerender is not None:
+            self._prerender["page"].deleteLater()
+            self._prerender = None
+    
+    def reset(self):
+        self._typed = {}
+    
+    def navigated(self, url):
+        """Learn from a URL bar navigation; returns the prerendered page for it, and whether it has loaded"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        entries = self.entries()
+        for text, urls in self._typed.items():
+            for suggested in set(urls) | {url}:
+                entry = entries.setdefault((text, suggested), [0, 0, now])
+                entry[0 if suggested == url else 1] += 1
+                entry[2] = now
+        self._typed = {}
+        self._stats["navigations"] += 1
+        
+        prerender = self._prerender
+        hit = prerender is not None and prerender["url"] == url
+        resolved = self._resolved.pop(QUrl(url).host(), None)
+        if resolved is not None and time.monotonic() - resolved[0] < self.PRERESOLVE_LIFETIME:
+            self._stats["preresolve_hits"] += 1
+            # A prerendered page's time saved already covers its lookup
+            if not hit:
+                self._stats["saved_ms"] += resolved[1]
+        if not hit:
+            self.cancel_prerender()
+            self.statsChanged.emit()
+            return None
+        self._prerender = None
+        self._prerender_timer.stop()
+        # The time the page had already spent loading is what the user no longer waits for
+        finished = prerender["finished"]
+        self._stats["prerender_hits"] += 1
+        self._stats["saved_ms"] += ((finished or time.perf_counter()) - prerender["started"]) * 1000
+        prerender["page"].setAudioMuted(False)
+        self.statsChanged.emit()
+        return prerender["page"], finished is not None
+    
+    def stats(self):
+        """The hit and saved time counters, including those of earlier sessions"""
+        self.entries()
+        return dict(self._stats)
+    
+    def close(self):
+        self.cancel_prerender()
+        if self._entries is None:
+            return
+        # Only the most recently used pairs are kept
+        entries = heapq.nlargest(self.max_entries, self._entries.items(), key=lambda item: item[1][2])
+        data = {"stats": self._stats,
+                "entries": [[text, url, hits, misses, used] for (text, url), (hits, misses, used) in entries]}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            pass
+
+class PageIndexDatabase:
+    """SQLite FTS5 index of the text of visited pages, bounded in size"""
+    # Matches ranked per query, newest first
+    CANDIDATE_LIMIT = 5000
+    
+    def __init__(self, path=PAGE_INDEX_PATH, max_size=200 * 1024 * 1024):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.max_size = max_size
+        
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                visited REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_visited ON pages(visited);
+            CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(
+                title, body, tokenize='porter unicode61 remove_diacritics 2');
+        """)
+        self.connection.commit()
+        self.total_size = cursor.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+    
+    def add_page(self, url, title, text, now=None):
+        now = now or time.time()
+        size = len(title.encode("utf-8")) + len(text.encode("utf-8"))
+        cursor = self.connection.cursor()
+        
+        # A revisited page replaces what was indexed for it before
+        row = cursor.execute("SELECT id, size FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            cursor.execute("DELETE FROM page_text WHERE rowid = ?", (row[0],))
+            cursor.execute("DELETE FROM pages WHERE id = ?", (row[0],))
+            self.total_size -= row[1]
+        
+        cursor.execute("INSERT INTO pages (url, title, visited, size) VALUES (?, ?, ?, ?)",
+                       (url, title, now, size))
+        cursor.execute("INSERT INTO page_text (rowid, title, body) VALUES (?, ?, ?)",
+                       (cursor.lastrowid, title, text))
+        self.total_size += size
+        self.evict()
+        self.connection.commit()
+    
+    def evict(self):
+        """Drop the least recently visited pages until the index fits its size limit"""
+        cursor = self.connection.cursor()
+        while self.total_size > self.max_size:
+            rows = cursor.execute(
+                "SELECT id, size FROM pages ORDER BY visited LIMIT 100").fetchall()
+            if not rows:
+                self.total_size = 0
+                break
+            for page_id, size in rows:
+                cursor.execute("DELETE FROM page_text WHERE rowid = ?", (page_id,))
+                cursor.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+                self.total_size -= size
+                if self.total_size <= self.max_size:
+                    break
+    
+    def search(self, text, limit=50):
+        """Return (url, title, snippet) for pages matching every word, best match first"""
+        words = re.findall(r"\w+", text)
+        if not words:
+            return []
+        # Quote each word so FTS5 syntax in the input is taken literally, and
+        # let the last word match as a prefix while it is still being typed
+        query = " ".join('"%s"' % word for word in words) + "*"
+        
+        # Ranking every match of a common word is slow on a large index, so only
+        # the most recently indexed candidates are ranked
+        cursor = self.connection.cursor()
+        rows = cursor.execute("""
+            SELECT rowid FROM (
+                SELECT rowid, rank FROM page_text WHERE page_text MATCH ?
+                ORDER BY rowid DESC LIMIT ?)
+            ORDER BY rank LIMIT ?
+        """, (query, self.CANDIDATE_LIMIT, limit)).fetchall()
+        
+        results = []
+        for (page_id,) in rows:
+            url, title, body = cursor.execute(
+                "SELECT pages.url, pages.title, page_text.body FROM pages "
+                "JOIN page_text ON page_text.rowid = pages.id WHERE pages.id = ?",
+                (page_id,)).fetchone()
+            results.append((url, title, self.snippet(body, words)))
+        return results
+    
+    def snippet(self, body, words, before=60, after=140):
+        """Cut the text around the first place any of the words appear"""
+        pattern = r"\b(?:%s)" % "|".join(re.escape(word) for word in words)
+        match = re.search(pattern, body, re.IGNORECASE)
+        start = max(match.start() - before, 0) if match else 0
+        text = re.sub(r"\s+", " ", body[start:start + before + after]).strip()
+        if start > 0:
+            text = "..." + text
+        if start + before + after < len(body):
+            text += "..."
+        return text
+    
+    def close(self):
+        self.connection.close()
+
+class PageIndexWorker(QObject):
+    """Runs the page text index on its own thread"""
+    resultsReady = pyqtSignal(str, list)
+    
+    def __init__(self, path, max_size):
+        super().__init__()
+        self.path = path
+        self.max_size = max_size
+        self._db = None
+    
+    def db(self):
+        # Opened on first use so it is created on the worker thread
+        if self._db is None:
+            self._db = PageIndexDatabase(self.path, self.max_size)
+        return self._db
+    
+    @pyqtSlot(str, str, str)
+    def add_page(self, url, title, text):
+        self.db().add_page(url, title, text)
+    
+    @pyqtSlot(str)
+    def search(self, text):
+        self.resultsReady.emit(text, [list(row) for row in self.db().search(text)])
+    
+    @pyqtSlot()
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class PageIndex(QObject):
+    """Full-text index of visited pages, searched without blocking the GUI"""
+    resultsReady = pyqtSignal(str, list)
+    addRequested = pyqtSignal(str, str, str)
+    searchRequested = pyqtSignal(str)
+    
+    def __init__(self, settings, parent=None, path=PAGE_INDEX_PATH):
+        super().__init__(parent)
+        self.enabled = settings["enabled"]
+        self.max_page_chars = settings["max_page_chars"]
+        self._in_flight = False
+        self._queued_text = None
+        
+        self._worker = PageIndexWorker(path, settings["max_size_mb"] * 1024 * 1024)
+        self._thread = QThread(self)
+        self._worker.moveToThread(self._thread)
+        self.addRequested.connect(self._worker.add_page)
+        self.searchRequested.connect(self._worker.search)
+        self._worker.resultsReady.connect(self._results_ready)
+        self._thread.start()
+    
+    def index_page(self, browser):
+        """Pull the visible text out of a loaded page and hand it to the worker"""
+        url = browser.url().toString()
+        title = browser.title()
+        browser.page().runJavaScript(
+            f"document.body ? document.body.innerText.slice(0, {self.max_page_chars}) : ''",
+            lambda text: self.addRequested.emit(url, title, text) if text else None)
+    
+    def search(self, text):
+        # Only one query runs at a time; keystrokes typed meanwhile collapse into the latest
+        if self._in_flight:
+            self._queued_text = text
+            return
+        self._in_flight = True
+        self.searchRequested.emit(text)
+    
+    def _results_ready(self, text, results):
+        self._in_flight = False
+        if self._queued_text is not None:
+            queued, self._queued_text = self._queued_text, None
+            self.search(queued)
+            if queued != text:
+                return
+        self.resultsReady.emit(text, results)
+    
+    def close(self):
+        if not self._thread.isRunning():
+            return
+        QMetaObject.invokeMethod(self._worker, "close", Qt.BlockingQueuedConnection)
+        self._thread.quit()
+        self._thread.wait()
+
+class PageSearchDialog(QDialog):
+    """Searches the text of previously visited pages"""
+    def __init__(self, browser):
+        super().__init__(browser)
+        self.browser = browser
+        self.setWindowTitle("Search Visited Pages")
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        if BROWSER_ICON:
+            self.setWindowIcon(BROWSER_ICON)
+        self.resize(640, 480)
+        
+        layout = QVBoxLayout()
+        self.search_bar = UrlBar()
+        self.search_bar.setPlaceholderText("Search the text of pages you have visited")
+        self.search_bar.textChanged.connect(browser.page_index.search)
+        layout.addWidget(self.search_bar)
+        
+        self.results = QListWidget()
+        self.results.setWordWrap(True)
+        self.results.itemActivated.connect(self.open_result)
+        layout.addWidget(self.results)
+        self.setLayout(layout)
+        
+        browser.page_index.resultsReady.connect(self.show_results)
+    
+    def show_results(self, text, results):
+        # Drop answers for text the user has already typed past
+        if text != self.search_bar.text():
+            return
+        self.results.clear()
+        for url, title, snippet in results:
+            item = QListWidgetItem(f"{title or url}\n{url}\n{snippet}")
+            item.setData(Qt.UserRole, url)
+            self.results.addItem(item)
+    
+    def open_result(self, item):
+        self.browser.add_new_tab(item.data(Qt.UserRole))
+        self.close()
+
+class SnapshotDatabase:
+    """Index of saved MHTML snapshots by URL, with the visit counts that decide what gets saved"""
+    
+    def __init__(self, path=SNAPSHOTS_DB_PATH, directory=SNAPSHOTS_DIR, max_size=500 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.connection = sqlite3.connect(path)
+        self.max_size = max_size
+        
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                url TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                size INTEGER NOT NULL,
+                saved REAL NOT NULL,
+                accessed REAL NOT NULL,
+                marked INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_accessed ON snapshots(marked, accessed);
+            CREATE TABLE IF NOT EXISTS visits (
+                url TEXT PRIMARY KEY,
+                count INTEGER NOT NULL
+            );
         """)
+        self.connection.commit()
+        self.total_size = cursor.execute("SELECT COALESCE(SUM(size), 0) FROM snapshots").fetchone()[0]
+        
+        # Snapshots that were still being written when the browser last exited
+        for path in glob.glob(os.path.join(directory, "saving-*.mhtml")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def entries(self):
+        rows = self.connection.execute(
+            "SELECT url, path, title, size, saved, accessed, marked FROM snapshots").fetchall()
+        return [self.entry(row) for row in rows]
+    
+    @staticmethod
+    def entry(row):
+        url, path, title, size, saved, accessed, marked = row
+        return {"url": url, "path": path, "title": title, "size": size, "saved": saved,
+                "accessed": accessed, "marked": bool(marked)}
+    
+    def visits(self):
+        return dict(self.connection.execute("SELECT url, count FROM visits"))
+    
+    def add(self, url, title, saved_path, now=None):
+        """Move a freshly saved snapshot into place, then evict; returns the entry and evicted URLs"""
+        now = now or time.time()
+        path = os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".mhtml")
+        size = os.path.getsize(saved_path)
+        os.replace(saved_path, path)
+        
+        cursor = self.connection.cursor()
+        row = cursor.execute("SELECT size, marked FROM snapshots WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            self.total_size -= row[0]
+        cursor.execute("INSERT OR REPLACE INTO snapshots (url, path, title, size, saved, accessed, marked) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (url, path, title, size, now, now, row[1] if row is not None else 0))
+        self.total_size += size
+        evicted = self.evict(keep=url)
+        self.connection.commit()
+        row = cursor.execute("SELECT url, path, title, size, saved, accessed, marked FROM snapshots "
+                             "WHERE url = ?", (url,)).fetchone()
+        return (self.entry(row) if row is not None else None), evicted
+    
+    def evict(self, keep=None):
+        """Drop the least recently opened snapshots, unmarked ones first, until the store fits"""
+        cursor = self.connection.cursor()
+        evicted = []
+        while self.total_size > self.max_size:
+            rows = cursor.execute("SELECT url, path, size FROM snapshots WHERE url != ? "
+                                  "ORDER BY marked, accessed LIMIT 100", (keep or "",)).fetchall()
+            if not rows:
+                # A single snapshot larger than the whole store is not kept either
+                rows = cursor.execute("SELECT url, path, size FROM snapshots").fetchall()
+                if not rows:
+                    self.total_size = 0
+                    break
+            for url, path, size in rows:
+                cursor.execute("DELETE FROM snapshots WHERE url = ?", (url,))
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                self.total_size -= size
+                evicted.append(url)
+                if self.total_size <= self.max_size:
+                    break
+        return evicted
+    
+    def touch(self, url, now=None):
+        self.connection.execute("UPDATE snapshots SET accessed = ? WHERE url = ?", (now or time.time(), url))
+        self.connection.commit()
+    
+    def record_visit(self, url):
+        self.connection.execute("INSERT INTO visits (url, count) VALUES (?, 1) "
+                                "ON CONFLICT(url) DO UPDATE SET count = count + 1", (url,))
+        self.connection.commit()
+    
+    def mark(self, url, marked):
+        self.connection.execute("UPDATE snapshots SET marked = ? WHERE url = ?", (int(marked), url))
+        self.connection.commit()
+    
+    def remove(self, url):
+        cursor = self.connection.cursor()
+        row = cursor.execute("SELECT path, size FROM snapshots WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return
+        cursor.execute("DELETE FROM snapshots WHERE url = ?", (url,))
+        self.connection.commit()
+        self.total_size -= row[1]
+        try:
+            os.remove(row[0])
+        except OSError:
+            pass
+    
+    def close(self):
+        self.connection.close()
+
+class SnapshotWorker(QObject):
+    """Runs the snapshot index and its file moves and deletions on their own thread"""
+    loaded = pyqtSignal(list, dict)
+    added = pyqtSignal(dict)
+    evicted = pyqtSignal(list)
+    
+    def __init__(self, path, directory, max_size):
+        super().__init__()
+        self.path = path
+        self.directory = directory
+        self.max_size = max_size
+        self._db = None
+    
+    def db(self):
+        # Opened on first use so it is created on the worker thread
+        if self._db is None:
+            self._db = SnapshotDatabase(self.path, self.directory, self.max_size)
+        return self._db
+    
+    @pyqtSlot()
+    def load(self):
+        self.loaded.emit(self.db().entries(), self.db().visits())
+    
+    @pyqtSlot(str, str, str)
+    def add(self, url, title, saved_path):
+        try:
+            entry, evicted = self.db().add(url, title, saved_path)
+        except OSError:
+            return
+        if evicted:
+            self.evicted.emit(evicted)
+        if entry is not None:
+            self.added.emit(entry)
+    
+    @pyqtSlot(str)
+    def touch(self, url):
+        self.db().touch(url)
+    
+    @pyqtSlot(str)
+    def record_visit(self, url):
+        self.db().record_visit(url)
+    
+    @pyqtSlot(str, bool)
+    def mark(self, url, marked):
+        self.db().mark(url, marked)
+    
+    @pyqtSlot(str)
+    def remove(self, url):
+        self.db().remove(url)
+    
+    @pyqtSlot()
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class SnapshotStore(QObject):
+    """Saves pages as MHTML so they can be reopened at once, or while offline.
+    
+    Pages the user marks are saved on every load, and any page once it has
+    been visited auto_after_visits times. Chromium writes each snapshot to a
+    temporary file itself; the worker thread then moves it into place,
+    indexes it and evicts the least recently opened snapshots past the size
+    limit. The index is read on the worker too and copied here once loaded,
+    so lookups never touch the disk.
+    """
+    loadRequested = pyqtSignal()
+    addRequested = pyqtSignal(str, str, str)
+    touchRequested = pyqtSignal(str)
+    visitRequested = pyqtSignal(str)
+    markRequested = pyqtSignal(str, bool)
+    removeRequested = pyqtSignal(str)
+    changed = pyqtSignal(str)
+    
+    def __init__(self, settings, parent=None, path=SNAPSHOTS_DB_PATH, directory=SNAPSHOTS_DIR):
+        super().__init__(parent)
+        self.enabled = settings["enabled"]
+        self.serve_first = settings["serve_first"]
+        self.offline_fallback = settings["offline_fallback"]
+        self.auto_after_visits = settings["auto_after_visits"]
+        self.refresh_after = settings["refresh_after"]
+        self.directory = directory
+        self._entries = {}
+        self._paths = {}
+        self._visits = {}
+        # Snapshots Chromium is still writing, by temporary path
+        self._pending = {}
+        self._saving = set()
+        self._next_save = 0
+        
+        self._worker = SnapshotWorker(path, directory, settings["max_size_mb"] * 1024 * 1024)
+        self._thread = QThread(self)
+        self._worker.moveToThread(self._thread)
+        self.loadRequested.connect(self._worker.load)
+        self.addRequested.connect(self._worker.add)
+        self.touchRequested.connect(self._worker.touch)
+        self.visitRequested.connect(self._worker.record_visit)
+        self.markRequested.connect(self._worker.mark)
+        self.removeRequested.connect(self._worker.remove)
+        self._worker.loaded.connect(self._loaded)
+        self._worker.added.connect(self._added)
+        self._worker.evicted.connect(self._evicted)
+        if self.enabled:
+            self._thread.start()
+            self.loadRequested.emit()
+    
+    def lookup(self, url):
+        return self._entries.get(url)
+    
+    def original_url(self, qurl):
+        """The page URL a snapshot file was saved from, or None for any other URL"""
+        if not qurl.isLocalFile():
+            return None
+        entry = self._paths.get(os.path.normpath(qurl.toLocalFile()))
+        return entry["url"] if entry is not None else None
+    
+    def open(self, url):
+        """The file URL to show for a page, noting the snapshot was used"""
+        entry = self._entries[url]
+        entry["accessed"] = time.time()
+        self.touchRequested.emit(url)
+        return QUrl.fromLocalFile(entry["path"])
+    
+    def is_marked(self, url):
+        entry = self._entries.get(url)
+        return entry is not None and entry["marked"] or url in self._saving
+    
+    def mark(self, view, marked):
+        url = view.url().toString()
+        entry = self._entries.get(url)
+        if marked:
+            # A page without a snapshot yet is marked once its first one is in
+            if entry is not None:
+                entry["marked"] = True
+                self.markRequested.emit(url, True)
+            else:
+                self._saving.add(url)
+            self.save(view)
+        else:
+            self._saving.discard(url)
+            if entry is not None:
+                entry["marked"] = False
+                self.markRequested.emit(url, False)
+    
+    def remove(self, url):
+        self._saving.discard(url)
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self._paths.pop(os.path.normpath(entry["path"]), None)
+            self.removeRequested.emit(url)
+            self.changed.emit(url)
+    
+    def page_loaded(self, view):
+        """Count the visit, and save the page if it is marked or visited often enough"""
+        url = view.url().toString()
+        self._visits[url] = self._visits.get(url, 0) + 1
+        self.visitRequested.emit(url)
+        entry = self._entries.get(url)
+        if entry is not None and time.time() - entry["saved"] < self.refresh_after:
+            return
+        if self.is_marked(url) or 0 < self.auto_after_visits <= self._visits[url]:
+            self.save(view)
+    
+    def save(self, view):
+        url = view.url().toString()
+        if url in self._pending.values() or not url.startswith(("http://", "https://")):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._next_save += 1
+        path = os.path.join(self.directory, f"saving-{os.getpid()}-{self._next_save}.mhtml")
+        self._pending[path] = url
+        view.page().save(path, QWebEngineDownloadItem.MimeHtmlSaveFormat)
+    
+    def download_requested(self, item):
+        if not item.isSavePageDownload():
+            return
+        path = os.path.join(item.downloadDirectory(), item.downloadFileName())
+        if path not in self._pending:
+            return
+        title = item.page().title() if item.page() is not None else ""
+        item.finished.connect(lambda item=item, path=path, title=title: self._saved(item, path, title))
+    
+    def _saved(self, item, path, title):
+        url = self._pending.pop(path)
+        if item.state() == QWebEngineDownloadItem.DownloadCompleted:
+            self.addRequested.emit(url, title, path)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _loaded(self, entries, visits):
+        self._visits = visits
+        for entry in entries:
+            self._entries[entry["url"]] = entry
+            self._paths[os.path.normpath(entry["path"])] = entry
+    
+    def _added(self, entry):
+        url = entry["url"]
+        if url in self._saving:
+            self._saving.discard(url)
+            entry["marked"] = True
+            self.markRequested.emit(url, True)
+        self._entries[url] = entry
+        self._paths[os.path.normpath(entry["path"])] = entry
+        self.changed.emit(url)
+    
+    def _evicted(self, urls):
+        for url in urls:
+            entry = self._entries.pop(url, None)
+            if entry is not None:
+                self._paths.pop(os.path.normpath(entry["path"]), None)
+                self.changed.emit(url)
+    
+    def close(self):
+        if not self._thread.isRunning():
+            return
+        QMetaObject.invokeMethod(self._worker, "close", Qt.BlockingQueuedConnection)
+        self._thread.quit()
+        self._thread.wait()
+
+class LoadMetrics(QObject):
+    """Times every page load and collects the page's own Navigation and Resource Timing.
+    
+    Loads are kept in memory for the developer panel and appended to a rolling
+    log in DATA_DIR. Private tabs are timed but never written to disk.
+    """
+    recorded = pyqtSignal(dict)
+    
+    # Summarizes the timing entries the page recorded for itself. Cross-origin
+    # resources without Timing-Allow-Origin report a transfer size of 0.
+    TIMING_SCRIPT = """(function () {
+        var nav = performance.getEntriesByType("navigation")[0];
+        var resources = performance.getEntriesByType("resource");
+        var bytes = nav ? nav.transferSize : 0;
+        for (var i = 0; i < resources.length; i++) {
+            bytes += resources[i].transferSize;
+        }
+        var slowest = resources.slice().sort(function (a, b) {
+            return b.duration - a.duration;
+        }).slice(0, 5).map(function (entry) {
+            return {url: entry.name, type: entry.initiatorType,
+                    duration: entry.duration, bytes: entry.transferSize};
+        });
+        return {navigation: nav ? nav.toJSON() : null, resources: resources.length,
+                bytes: bytes, slowest: slowest};
+    })()"""
+    CSV_FIELDS = ["time", "tab", "url", "ok", "load_ms", "ttfb_ms", "dom_content_loaded_ms",
+                  "load_event_ms", "resources", "bytes"]
+    
+    def __init__(self, browser, settings, path=LOAD_METRICS_PATH):
+        super().__init__(browser)
+        self.browser = browser
+        self.enabled = settings["enabled"]
+        self.format = "csv" if settings["format"] == "csv" else "jsonl"
+        self.path = f"{path}.{self.format}"
+        self.max_size = settings["max_size_mb"] * 1024 * 1024
+        self.records = collections.deque(maxlen=settings["keep"])
+        self._started = {}
+        self._file = None
+    
+    def track(self, view):
+        if not self.enabled:
+            return
+        # The view's first navigation may already be under way
+        self._started[view] = time.perf_counter()
+        view.loadStarted.connect(lambda view=view: self._load_started(view))
+        view.loadFinished.connect(lambda ok, view=view: self._load_finished(view, ok))
+    
+    def untrack(self, view):
+        self._started.pop(view, None)
+    
+    def _load_started(self, view):
+        self._started[view] = time.perf_counter()
+    
+    def _load_finished(self, view, ok):
+        start = self._started.pop(view, None)
+        if start is None:
+            return
+        record = {
+            "time": round(time.time(), 3),
+            "tab": self.browser.tab_id_of(view),
+            "url": view.url().toString(),
+            "ok": ok,
+            "load_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        private = self.browser.is_private(view)
+        view.page().runJavaScript(self.TIMING_SCRIPT,
+                                  lambda timing: self._timing_ready(record, timing, private))
+    
+    def _timing_ready(self, record, timing, private):
+        nav = (timing or {}).get("navigation") or {}
+        
+        def since_start(name):
+            value = nav.get(name)
+            return round(value - nav.get("startTime", 0), 1) if value else None
+        
+        record.update({
+            "ttfb_ms": since_start("responseStart"),
+            "dom_content_loaded_ms": since_start("domContentLoadedEventEnd"),
+            "load_event_ms": since_start("loadEventEnd"),
+            "resources": (timing or {}).get("resources", 0),
+            "bytes": (timing or {}).get("bytes", 0),
+            "navigation": nav,
+            "slowest": (timing or {}).get("slowest", []),
+        })
+        self.records.append(record)
+        if not private:
+            self._write(record)
+        self.recorded.emit(record)
+    
+    def _write(self, record):
+        try:
+            if self._file is None or self._file.tell() >= self.max_size:
+                self._open_log()
+            if self.format == "csv":
+                self._csv.writerow(record)
+            else:
+                self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+        except OSError:
+            pass
+    
+    def _open_log(self):
+        if self._file is not None:
+            self._file.close()
+            os.replace(self.path, self.path + ".1")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8", newline="")
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, self.CSV_FIELDS, extrasaction="ignore")
+            if self._file.tell() == 0:
+                self._csv.writeheader()
+    
+    def site_summary(self):
+        """Per-host load counts and median load time, with the latest load's change from it"""
+        loads = {}
+        for record in self.records:
+            if record["ok"]:
+                loads.setdefault(url_host(record["url"]), []).append(record["load_ms"])
+        summary = []
+        for host, times in loads.items():
+            median = statistics.median(times)
+            summary.append((host, len(times), median, times[-1],
+                            (times[-1] - median) / median * 100 if median else 0))
+        summary.sort(key=lambda row: row[2], reverse=True)
+        return summary
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def create_table(columns, stretch_column):
+    """A read-only table of whole rows with these column headers; stretch_column takes the spare width"""
+    table = QTableWidget(0, len(columns))
+    table.setHorizontalHeaderLabels(columns)
+    table.setEditTriggers(QTableWidget.NoEditTriggers)
+    table.setSelectionBehavior(QTableWidget.SelectRows)
+    table.verticalHeader().hide()
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+    table.horizontalHeader().setSectionResizeMode(stretch_column, QHeaderView.Stretch)
+    return table
+
+class PredictionStatsView(QWidget):
+    """How often the URL bar predictor's head starts were used, to tune its thresholds"""
+    COLUMNS = ["Head start", "Made", "Used", "Hit rate"]
+    
+    def __init__(self, predictor, parent=None):
+        super().__init__(parent)
+        self.predictor = predictor
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.table = create_table(self.COLUMNS, 0)
+        self.table.setRowCount(2)
+        self.label = QLabel()
+        self.label.setProperty("muted", True)
+        layout.addWidget(self.table)
+        layout.addWidget(self.label)
+        self.setLayout(layout)
+        
+        self.table.setVisible(predictor.enabled)
+        if not predictor.enabled:
+            self.label.setText("URL bar predictions are turned off in the settings")
+            return
+        self.refresh()
+        predictor.statsChanged.connect(self.refresh)
+    
+    def refresh(self):
+        stats = self.predictor.stats()
+        rows = [("Host lookups", stats["preresolves"], stats["preresolve_hits"]),
+                ("Prerenders", stats["prerenders"], stats["prerender_hits"])]
+        for row, (name, made, used) in enumerate(rows):
+            values = [name, str(made), str(used), f"{used / made:.0%}" if made else ""]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.label.setText(f"Over {stats['navigations']} URL bar navigations, "
+                           f"head starts saved {stats['saved_ms'] / 1000:.1f} s")
+
+class LoadMetricsDialog(QDialog):
+    """Developer panel listing recent page loads and how each site's load time is trending"""
+    LOAD_COLUMNS = ["Tab", "URL", "Load (ms)", "TTFB (ms)", "DOM ready (ms)", "Resources", "KB"]
+    SITE_COLUMNS = ["Site", "Loads", "Median (ms)", "Last (ms)", "Change"]
+    
+    def __init__(self, browser):
+        super().__init__(browser)
+        self.metrics = browser.load_metrics
+        self.setWindowTitle("Load Performance")
+        if BROWSER_ICON:
+            self.setWindowIcon(BROWSER_ICON)
+        self.resize(860, 560)
+        
+        layout = QVBoxLayout()
+        splitter = QSplitter(Qt.Vertical)
+        self.loads = create_table(self.LOAD_COLUMNS, 1)
+        self.sites = create_table(self.SITE_COLUMNS, 0)
+        splitter.addWidget(self.loads)
+        splitter.addWidget(self.sites)
+        layout.addWidget(splitter)
+        
+        log_label = QLabel(f"Logged to {self.metrics.path}" if self.metrics.enabled
+                           else "Load metrics are turned off in the settings")
+        log_label.setProperty("muted", True)
+        layout.addWidget(log_label)
+        
+        splitter.addWidget(PredictionStatsView(browser.predictor))
+        self.setLayout(layout)
+        
+        for record in self.metrics.records:
+            self.add_load(record)
+        self.show_sites()
+        self.metrics.recorded.connect(self.load_recorded)
+    
+    def load_recorded(self, record):
+        self.add_load(record)
+        self.show_sites()
+    
+    def add_load(self, record):
+        # Newest loads first, trimmed to what the metrics keep in memory
+        def number(value, scale=1, digits=0):
+            return "" if value is None else f"{value / scale:.{digits}f}"
+        
+        self.loads.insertRow(0)
+        values = [str(record["tab"] if record["tab"] is not None else ""), record["url"],
+                  number(record["load_ms"]), number(record["ttfb_ms"]),
+                  number(record["dom_content_loaded_ms"]), str(record["resources"]),
+                  number(record["bytes"], 1024, 1)]
+        for column, value in enumerate(values):
+            self.loads.setItem(0, column, QTableWidgetItem(value))
+        if self.loads.rowCount() > self.metrics.records.maxlen:
+            self.loads.removeRow(self.loads.rowCount() - 1)
+    
+    def show_sites(self):
+        summary = self.metrics.site_summary()
+        self.sites.setRowCount(len(summary))
+        for row, (host, count, median, last, change) in enumerate(summary):
+            values = [host, str(count), f"{median:.0f}", f"{last:.0f}", f"{change:+.0f}%"]
+            for column, value in enumerate(values):
+                self.sites.setItem(row, column, QTableWidgetItem(value))
+
+def url_host(url):
+    """Return the lowercase host of a URL without parsing the rest of it"""
+    start = url.find("://")
+    start = start + 3 if start >= 0 else 0
+    end = len(url)
+    for separator in "/?#":
+        index = url.find(separator, start)
+        if 0 <= index < end:
+            end = index
+    host = url[start:end]
+    host = host[host.rfind("@") + 1:]
+    if host.startswith("["):
+        return host[:host.find("]") + 1].lower()
+    return host.split(":", 1)[0].lower()
+
+def registrable_domain(host, suffixes=None):
+    """The registrable domain of a host (eTLD+1): its public suffix and the label in front of it.
+    
+    suffixes is a compiled PublicSuffixList; without one, Qt's built-in copy
+    is asked. An IP address, or a host that is itself a public suffix, is
+    its own registrable domain.
+    """
+    if not host or host.startswith("[") or host.replace(".", "").isdigit():
+        return host
+    labels = host.count(".") + 1
+    if suffixes is not None:
+        # A top-level domain missing from the list is still a suffix of one label
+        length = max(1, suffixes.suffix_length(host))
+    else:
+        suffix = QUrl("http://" + host).topLevelDomain()
+        length = suffix.count(".") if suffix else 1
+    if length >= labels:
+        return host
+    return host.split(".", labels - length - 1)[-1]
+
+class FilterRule:
+    """One network filter from an EasyList-style list"""
+    __slots__ = ("text", "needle", "source", "regex", "third_party", "types",
+                 "domains", "excluded_domains")
+    
+    # Types a rule applies to when it names none itself
+    DEFAULT_TYPES = frozenset(["script", "image", "stylesheet", "object", "xmlhttprequest",
+                               "subdocument", "font", "media", "ping", "other"])
+    KNOWN_TYPES = DEFAULT_TYPES | {"document"}
+    
+    def __init__(self, text):
+        self.text = text
+        self.needle = None
+        self.source = None
+        self.regex = None
+        self.third_party = None
+        self.types = self.DEFAULT_TYPES
+        self.domains = None
+        self.excluded_domains = None
+    
+    def set_options(self, options):
+        """Apply the options after "$"; returns False for options that are not supported"""
+        included = set()
+        excluded = set()
+        for option in options.split(","):
+            option = option.strip().lower()
+            negated = option.startswith("~")
+            name = option.lstrip("~")
+            if name in ("third-party", "3p"):
+                self.third_party = not negated
+            elif name in ("first-party", "1p"):
+                self.third_party = negated
+            elif name.startswith("domain="):
+                for domain in name[7:].split("|"):
+                    if domain.startswith("~"):
+                        self.excluded_domains = (self.excluded_domains or set()) | {domain[1:]}
+                    elif domain:
+                        self.domains = (self.domains or set()) | {domain}
+            elif name in ("match-case", "important"):
+                pass
+            elif name in self.KNOWN_TYPES or name in ("xhr", "frame", "css"):
+                name = {"xhr": "xmlhttprequest", "frame": "subdocument", "css": "stylesheet"}.get(name, name)
+                (excluded if negated else included).add(name)
+            else:
+                # Cosmetic, redirect, csp and similar options change more than
+                # whether a request loads, so those rules are left out
+                return False
+        
+        if included:
+            self.types = frozenset(included)
+        elif excluded:
+            self.types = frozenset(self.DEFAULT_TYPES - excluded)
+        return True
+    
+    def applies(self, third_party, resource_type, first_party_host):
+        if resource_type not in self.types:
+            return False
+        if self.third_party is not None and self.third_party != third_party:
+            return False
+        if self.domains is not None or self.excluded_domains is not None:
+            suffixes = list(host_suffixes(first_party_host))
+            if self.excluded_domains and any(s in self.excluded_domains for s in suffixes):
+                return False
+            if self.domains and not any(s in self.domains for s in suffixes):
+                return False
+        return True
+    
+    def matches_url(self, url):
+        if self.needle is not None:
+            return self.needle in url
+        # Patterns are compiled on first use, so loading a large list stays fast
+        if self.regex is None:
+            self.regex = re.compile(self.source)
+        return self.regex.search(url) is not None
+
+def host_suffixes(host):
+    """Yield the host and each parent domain, e.g. a.b.com, b.com, com"""
+    while host:
+        yield host
+        dot = host.find(".")
+        if dot < 0:
+            break
+        host = host[dot + 1:]
+
+class FilterSet:
+    """Block or exception rules indexed by domain, URL token and URL substring"""
+    TOKEN_RE = re.compile(r"[a-z0-9%]{2,}")
+    GRAM_SIZE = 4
+    
+    def __init__(self):
+        # Hosts blocked outright by "||host^" rules
+        self.domains = set()
+        # Rules that only apply under a host, but carry options
+        self.domain_rules = {}
+        # Rules keyed by one whole token that any URL they match must contain
+        self.token_rules = {}
+        # Rules keyed by a short substring, for patterns without a whole token
+        self.gram_rules = {}
+        # Rules with neither, checked against every URL
+        self.generic_rules = []
+        # Index keys as sets, so a URL's keys can be intersected with them in one step
+        self.token_keys = set()
+        self.gram_keys = set()
+    
+    def add(self, rule, key, is_token):
+        if key is None:
+            self.generic_rules.append(rule)
+        elif is_token:
+            self.token_rules.setdefault(key, []).append(rule)
+            self.token_keys.add(key)
+        else:
+            self.gram_rules.setdefault(key, []).append(rule)
+            self.gram_keys.add(key)
+    
+    def match(self, url, host, tokens, grams, third_party, resource_type, first_party_host):
+        for suffix in host_suffixes(host):
+            if suffix in self.domains and resource_type != "document":
+                return True
+            for rule in self.domain_rules.get(suffix, ()):
+                if rule.applies(third_party, resource_type, first_party_host):
+                    return True
+        
+        for key in tokens & self.token_keys:
+            for rule in self.token_rules[key]:
+                if rule.matches_url(url) and rule.applies(third_party, resource_type, first_party_host):
+                    return True
+        
+        if self.gram_keys:
+            for key in grams() & self.gram_keys:
+                for rule in self.gram_rules[key]:
+                    if rule.matches_url(url) and rule.applies(third_party, resource_type, first_party_host):
+                        return True
+        
+        for rule in self.generic_rules:
+            if rule.matches_url(url) and rule.applies(third_party, resource_type, first_party_host):
+                return True
+        return False
+
+class FilterMatcher:
+    """Compiled EasyList-style network filters, checked for each request"""
+    HOST_RULE_RE = re.compile(r"^\|\|([a-z0-9.-]+)\^?$")
+    DOMAIN_CACHE_SIZE = 4096
+    
+    def __init__(self):
+        self.blocking = FilterSet()
+        self.exceptions = FilterSet()
+        self.rule_count = 0
+        self.set_public_suffixes(None)
+    
+    def __getstate__(self):
+        # The suffix list and the domains looked up with it are not cached with the rules
+        state = self.__dict__.copy()
+        del state["suffixes"], state["_domains"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.set_public_suffixes(None)
+    
+    def set_public_suffixes(self, suffixes):
+        """Tell first from third parties with this PublicSuffixList instead of Qt's copy"""
+        self.suffixes = suffixes
+        # Registrable domain of each host seen, so the suffix list is walked once per host
+        self._domains = {}
+    
+    def registrable_domain(self, host):
+        domain = self._domains.get(host)
+        if domain is None:
+            if len(self._domains) >= self.DOMAIN_CACHE_SIZE:
+                self._domains.clear()
+            domain = self._domains[host] = registrable_domain(host, self.suffixes)
+        return domain
+    
+    @classmethod
+    def compile(cls, paths):
+        matcher = cls()
+        rules = []
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        rule = matcher.parse(line.strip())
+                        if rule is not None:
+                            rules.append(rule)
+            except OSError:
+                continue
+        
+        # Index each rule under its least common token, or failing that its least
+        # common substring, so that few rules are tried against any one URL
+        counts = {}
+        for _, _, tokens, grams in rules:
+            for key in tokens or grams:
+                counts[key] = counts.get(key, 0) + 1
+        for rule, exception, tokens, grams in rules:
+            keys = tokens or grams
+            key = min(keys, key=lambda key: (counts[key], -len(key))) if keys else None
+            (matcher.exceptions if exception else matcher.blocking).add(rule, key, bool(tokens))
+        matcher.rule_count += len(rules)
+        return matcher
+    
+    def parse(self, line):
+        """Parse a filter line, returning (rule, is_exception, tokens, grams) or None"""
+        if not line or line.startswith(("!", "[")) or "##" in line or "#@#" in line or "#?#" in line:
+            return None
+        
+        exception = line.startswith("@@")
+        pattern = line[2:] if exception else line
+        rule = FilterRule(line)
+        
+        options = ""
+        if "$" in pattern and not (pattern.startswith("/") and pattern.endswith("/")):
+            pattern, options = pattern.rsplit("$", 1)
+            if not rule.set_options(options):
+                return None
+        pattern = pattern.lower()
+        if not pattern or pattern in ("*", "|", "||"):
+            return None
+        
+        filters = self.exceptions if exception else self.blocking
+        
+        # "||example.com^" rules go into hash lookups by host
+        host_match = self.HOST_RULE_RE.match(pattern)
+        if host_match:
+            host = host_match.group(1)
+            if not options:
+                filters.domains.add(host)
+            else:
+                filters.domain_rules.setdefault(host, []).append(rule)
+            self.rule_count += 1
+            return None
+        
+        if pattern.startswith("/") and pattern.endswith("/") and len(pattern) > 2:
+            try:
+                re.compile(pattern[1:-1])
+            except re.error:
+                return None
+            rule.source = pattern[1:-1]
+            return rule, exception, [], []
+        
+        if not any(c in pattern for c in "*^|"):
+            rule.needle = pattern
+        else:
+            rule.source = self.pattern_to_regex(pattern)
+        return rule, exception, self.pattern_tokens(pattern), self.pattern_grams(pattern)
+    
+    @staticmethod
+    def pattern_to_regex(pattern):
+        regex = ""
+        if pattern.startswith("||"):
+            regex = r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?"
+            pattern = pattern[2:]
+        elif pattern.startswith("|"):
+            regex = "^"
+            pattern = pattern[1:]
+        end = ""
+        if pattern.endswith("|"):
+            end = "$"
+            pattern = pattern[:-1]
+        
+        for char in pattern:
+            if char == "*":
+                regex += ".*"
+            elif char == "^":
+                regex += r"(?:[^a-z0-9_.%-]|$)"
+            else:
+                regex += re.escape(char)
+        return regex + end
+    
+    @staticmethod
+    def pattern_tokens(pattern):
+        """Tokens that must appear whole in any URL the pattern matches"""
+        anchored_start = pattern.startswith("|")
+        anchored_end = pattern.endswith("|") and not pattern.endswith("||")
+        body = pattern.strip("|")
+        tokens = []
+        for match in FilterSet.TOKEN_RE.finditer(body):
+            start, end = match.span()
+            # A token running into a wildcard or the open end of the pattern
+            # may only be part of a longer token in the URL
+            before = body[start - 1] if start > 0 else ("|" if anchored_start else "*")
+            after = body[end] if end < len(body) else ("|" if anchored_end else "*")
+            if before != "*" and after != "*":
+                tokens.append(match.group())
+        return tokens
+    
+    @staticmethod
+    def pattern_grams(pattern):
+        """Substrings that must appear in any URL the pattern matches"""
+        size = FilterSet.GRAM_SIZE
+        grams = set()
+        for literal in re.split(r"[*^|]", pattern):
+            grams.update(literal[i:i + size] for i in range(len(literal) - size + 1))
+        return list(grams)
+    
+    def should_block(self, url, first_party_url="", resource_type="other"):
+        url = url.lower()
+        host = url_host(url)
+        first_party_host = url_host(first_party_url.lower()) if first_party_url else host
+        third_party = self.registrable_domain(host) != self.registrable_domain(first_party_host)
+        tokens = set(FilterSet.TOKEN_RE.findall(url))
+        
+        # Substrings are only cut out of the URL if a gram-indexed rule needs them
+        grams_cache = []
+        def grams():
+            if not grams_cache:
+                size = FilterSet.GRAM_SIZE
+                grams_cache.append({url[i:i + size] for i in range(len(url) - size + 1)})
+            return grams_cache[0]
+        
+        if not self.blocking.match(url, host, tokens, grams, third_party, resource_type,
+                                   first_party_host):
+            return False
+        return not self.exceptions.match(url, host, tokens, grams, third_party, resource_type,
+                                         first_party_host)
+
+def filter_list_paths(settings):
+    return settings["lists"] or sorted(glob.glob(os.path.join(FILTERS_DIR, "*.txt")))
+
+def load_filter_matcher(paths, cache_path=FILTERS_CACHE_PATH):
+    """Load the compiled filters from the cache, compiling and caching them if stale"""
+    return load_compiled(paths, cache_path, FilterMatcher.compile)
+
+def load_compiled(paths, cache_path, compile):
+    """Load what compile(paths) built from the cache, rebuilding and caching it if the files changed"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            pass
+    
+    try:
+        with open(cache_path, "rb") as f:
+            cached_signature, compiled = pickle.load(f)
+        if cached_signature == signature:
+            return compiled
+    except (OSError, pickle.PickleError, EOFError, ValueError, AttributeError):
+        pass
+    
+    compiled = compile(paths)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump((signature, compiled), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+    return compiled
+
+class FilterLoader(QObject):
+    """Loads or compiles the filter lists on a background thread"""
+    loaded = pyqtSignal(object)
+    
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+    
+    @pyqtSlot()
+    def load(self):
+        self.loaded.emit(load_filter_matcher(self.paths))
+
+class ContentBlocker(QWebEngineUrlRequestInterceptor):
+    """Blocks ad and tracker requests matched by the filter lists"""
+    # EasyList names for the resource types Qt reports
+    RESOURCE_TYPES = {
+        QWebEngineUrlRequestInfo.ResourceTypeMainFrame: "document",
+        QWebEngineUrlRequestInfo.ResourceTypeSubFrame: "subdocument",
+        QWebEngineUrlRequestInfo.ResourceTypeStylesheet: "stylesheet",
+        QWebEngineUrlRequestInfo.ResourceTypeScript: "script",
+        QWebEngineUrlRequestInfo.ResourceTypeImage: "image",
+        QWebEngineUrlRequestInfo.ResourceTypeFavicon: "image",
+        QWebEngineUrlRequestInfo.ResourceTypeFontResource: "font",
+        QWebEngineUrlRequestInfo.ResourceTypeObject: "object",
+        QWebEngineUrlRequestInfo.ResourceTypePluginResource: "object",
+        QWebEngineUrlRequestInfo.ResourceTypeMedia: "media",
+        QWebEngineUrlRequestInfo.ResourceTypeXhr: "xmlhttprequest",
+        QWebEngineUrlRequestInfo.ResourceTypePing: "ping",
+        QWebEngineUrlRequestInfo.ResourceTypeCspReport: "ping",
+    }
+    
+    filtersLoaded = pyqtSignal()
+    
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.enabled = settings["enabled"]
+        self.matcher = None
+        self.blocked_count = 0
+        self.suffixes = None
+        if not self.enabled:
+            return
+        
+        # Requests go through unfiltered until the lists have loaded
+        self._loader = FilterLoader(filter_list_paths(settings))
+        self._thread = QThread(self)
+        self._loader.moveToThread(self._thread)
+        self._thread.started.connect(self._loader.load)
+        self._loader.loaded.connect(self._filters_loaded)
+        self._thread.start()
+    
+    def _filters_loaded(self, matcher):
+        matcher.set_public_suffixes(self.suffixes)
+        self.matcher = matcher
+        self._thread.quit()
+        self.filtersLoaded.emit()
+    
+    def interceptRequest(self, info):
+        matcher = self.matcher
+        if matcher is None:
+            return
+        resource_type = self.RESOURCE_TYPES.get(info.resourceType(), "other")
+        if matcher.should_block(info.requestUrl().toString(), info.firstPartyUrl().toString(),
+                                resource_type):
+            info.block(True)
+            self.blocked_count += 1
+    
+    def set_public_suffixes(self, suffixes):
+        self.suffixes = suffixes
+        if self.matcher is not None:
+            self.matcher.set_public_suffixes(suffixes)
+    
+    def close(self):
+        if self.enabled:
+            self._thread.quit()
+            self._thread.wait()
+
+class PublicSuffixList:
+    """The ICANN section of the Public Suffix List, compiled into a trie of host labels, last label first.
+    
+    The private section is left out: names like github.io are suffixes for
+    cookies, but typed on their own they are still websites.
+    """
+    # Keys marking a rule, and an exception rule, ending at a node; no label can be either
+    RULE = ""
+    EXCEPTION = "!"
+    
+    def __init__(self):
+        self.root = {}
+        self.rule_count = 0
+    
+    @classmethod
+    def compile(cls, paths):
+        suffixes = cls()
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.startswith("// ===BEGIN PRIVATE DOMAINS==="):
+                            break
+                        fields = line.split()
+                        if fields and not fields[0].startswith("//"):
+                            suffixes.add(fields[0])
+            except OSError:
+                pass
+        return suffixes
+    
+    def add(self, rule):
+        exception = rule.startswith("!")
+        node = self.root
+        for label in reversed(rule.lstrip("!").lower().split(".")):
+            # Internationalized rules are matched in their ASCII form, as hosts are
+            if not label.isascii():
+                label = bytes(QUrl.toAce(label)).decode("ascii")
+            node = node.setdefault(label, {})
+        node[self.EXCEPTION if exception else self.RULE] = True
+        self.rule_count += 1
+    
+    def suffix_length(self, host):
+        """Labels in the host's public suffix, or 0 when its top-level domain is not listed"""
+        node = self.root
+        length = 0
+        for depth, label in enumerate(reversed(host.split("."))):
+            child = node.get(label)
+            wildcard = node.get("*")
+            # An exception rule makes the suffix end just above it
+            if child is not None and self.EXCEPTION in child:
+                return depth
+            if child is None and wildcard is None:
+                break
+            if (child is not None and self.RULE in child) or (wildcard is not None and self.RULE in wildcard):
+                length = depth + 1
+            node = child if child is not None else wildcard
+        return length
+
+def public_suffix_paths(settings):
+    return [settings["public_suffix_list"]] if settings["public_suffix_list"] else PUBLIC_SUFFIX_PATHS
+
+def load_public_suffixes(paths, cache_path=PUBLIC_SUFFIX_CACHE_PATH):
+    """Load the compiled suffix list, or None when none of the files exist"""
+    paths = [path for path in paths if os.path.exists(path)][:1]
+    return load_compiled(paths, cache_path, PublicSuffixList.compile) if paths else None
+
+class SuffixListLoader(QObject):
+    """Loads or compiles the public suffix list on a background thread"""
+    loaded = pyqtSignal(object)
+    
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+    
+    @pyqtSlot()
+    def load(self):
+        self.loaded.emit(load_public_suffixes(self.paths))
+
+class UrlClassifier(QObject):
+    """Decides whether text typed in the URL bar is an address or a search.
+    
+    Text is an address when it has a scheme, an IP address, a port,
+    localhost, a configured intranet or reserved host name, a host the user
+    has been to before, or a host under a listed public suffix with a name
+    of its own in front of it. Anything else, including any text with
+    spaces, is searched for. Hosts that are not on the public internet, and
+    addresses with a port, are opened over HTTP, the rest over HTTPS.
+    
+    The public suffix list is compiled into a trie and cached on a
+    background thread; until it is ready, or when there is no list, Qt's
+    built-in copy is asked instead.
+    """
+    suffixesLoaded = pyqtSignal(object)
+    
+    # Schemes that make text an address even without a "//"
+    SCHEMES = {"http", "https", "file", "ftp", "about", "data", "mailto", "view-source", "nexawave"}
+    # Names reserved for private use (RFC 2606, 6761, 6762 and 8375) and common home router ones
+    RESERVED_SUFFIXES = ("localhost", "local", "test", "example", "invalid", "internal", "intranet",
+                         "lan", "home", "localdomain", "home.arpa")
+    SCHEME_PATTERN = re.compile(r"([a-zA-Z][a-zA-Z0-9+.-]*):(.*)", re.DOTALL)
+    HOST_PATTERN = re.compile(r"(?!-)[a-z0-9-]{1,63}(?<!-)(\.(?!-)[a-z0-9-]{1,63}(?<!-))*")
+    
+    def __init__(self, settings, parent=None, load=True):
+        super().__init__(parent)
+        self.engines = settings["engines"]
+        self.engine = settings["engine"] if settings["engine"] in self.engines else next(iter(self.engines))
+        self.intranet_hosts = [host.lower() for host in settings["intranet_hosts"]]
+        self.suffixes = None
+        self._thread = None
+        if not load:
+            return
+        
+        self._loader = SuffixListLoader(public_suffix_paths(settings))
+        self._thread = QThread(self)
+        self._loader.moveToThread(self._thread)
+        self._thread.started.connect(self._loader.load)
+        self._loader.loaded.connect(self._suffixes_loaded)
+        self._thread.start()
+    
+    def _suffixes_loaded(self, suffixes):
+        self.suffixes = suffixes
+        self._thread.quit()
+        self.suffixesLoaded.emit(suffixes)
+    
+    def search_url(self, query, engine=None):
+        template = self.engines[engine or self.engine]
+        return template.replace("{}", urllib.parse.quote_plus(query))
+    
+    def classify(self, text, history_urls=()):
+        """Return the URL to open for typed text, and whether it is a search.
+        
+        history_urls are pages from history suggested for the text; a host
+        among them is taken as an address, opened with the same scheme.
+        """
+        text = text.strip()
+        if text.startswith("?"):
+            return self.search_url(text[1:].strip()), True
+        
+        match = self.SCHEME_PATTERN.fullmatch(text)
+        if match and (match.group(1).lower() in self.SCHEMES or match.group(2).startswith("//")):
+            return text, False
+        if any(character.isspace() for character in text):
+            # Typing an engine's name first searches with that engine
+            engine, _, query = text.partition(" ")
+            if engine.lower() in self.engines and query.strip():
+                return self.search_url(query.strip(), engine.lower()), True
+            return self.search_url(text), True
+        
+        # Split the host and port off the path, query and fragment
+        end = len(text)
+        for separator in "/?#":
+            index = text.find(separator)
+            if 0 <= index < end:
+                end = index
+        authority, rest = text[:end], text[end:]
+        host, port = authority, None
+        if authority.startswith("["):
+            host, _, port = authority[1:].partition("]")
+            if port and not port.startswith(":"):
+                return self.search_url(text), True
+            port = port[1:] if port else None
+        elif authority.count(":") == 1:
+            host, port = authority.split(":")
+        elif ":" in authority:
+            # A bare IPv6 address, which needs brackets in a URL
+            try:
+                return f"http://[{ipaddress.IPv6Address(authority)}]{rest}", False
+            except ValueError:
+                return self.search_url(text), True
+        if port is not None and not (port.isdigit() and 0 < int(port) < 65536):
+            return self.search_url(text), True
+        if "@" in host or not host:
+            # Most likely an email address
+            return self.search_url(text), True
+        
+        host = host.lower().rstrip(".")
+        try:
+            ipaddress.ip_address(host)
+            return "http://" + text, False
+        except ValueError:
+            if authority.startswith("["):
+                return self.search_url(text), True
+        host = bytes(QUrl.toAce(host)).decode("ascii") if not host.isascii() else host
+        labels = host.split(".")
+        if not self.HOST_PATTERN.fullmatch(host) or all(label.isdigit() for label in labels):
+            return self.search_url(text), True
+        
+        # Hosts visited before open the way they did then
+        for url in history_urls:
+            visited = QUrl(url)
+            if visited.host() == host and (port is None or visited.port() == int(port)):
+                return f"{visited.scheme()}://{text}", False
+        
+        # A port is mostly typed for a development or intranet server, which seldom has TLS
+        if port is not None or self.is_local(host):
+            return "http://" + text, False
+        if self.is_public_domain(host):
+            return "https://" + text, False
+        # A path after a single name shows an address the suffix list cannot vouch for
+        if rest.startswith("/") and len(labels) == 1:
+            return "http://" + text, False
+        return self.search_url(text), True
+    
+    def is_local(self, host):
+        for name in self.RESERVED_SUFFIXES:
+            if host == name or host.endswith("." + name):
+                return True
+        for name in self.intranet_hosts:
+            if host == name or (name.startswith(".") and (host.endswith(name) or host == name[1:])):
+                return True
+        return False
+    
+    def is_public_domain(self, host):
+        """Whether the host is a name registered under a listed public suffix, or below one"""
+        labels = host.count(".") + 1
+        if self.suffixes is not None:
+            return 0 < self.suffixes.suffix_length(host) < labels
+        suffix = QUrl("http://" + host).topLevelDomain()
+        return bool(suffix) and suffix.count(".") < labels
+    
+    def close(self):
+        if self._thread is not None:
+            self._thread.quit()
+            self._thread.wait()
+
+class InterceptorChain(QWebEngineUrlRequestInterceptor):
+    """Passes each request to several interceptors in turn, as a profile only takes one"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.interceptors = []
+    
+    def interceptRequest(self, info):
+        for interceptor in self.interceptors:
+            interceptor.interceptRequest(info)
+
+class ProfileManager(QObject):
+    """Creates the persistent profile shared by all tabs, plus an optional private one"""
+    CACHE_TYPES = {
+        "disk": QWebEngineProfile.DiskHttpCache,
+        "memory": QWebEngineProfile.MemoryHttpCache,
+        "none": QWebEngineProfile.NoCache,
+    }
+    COOKIE_POLICIES = {
+        "persistent": QWebEngineProfile.AllowPersistentCookies,
+        "session": QWebEngineProfile.NoPersistentCookies,
+        "force": QWebEngineProfile.ForcePersistentCookies,
+    }
+    
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self._interceptors = InterceptorChain(self)
+        self._download_handler = None
+        self._profile_watcher = None
+        self._scheme_handlers = {}
+        self._private_profile = None
+        
+        # A named profile keeps its cache, cookies and storage on disk between runs
+        name = settings["name"]
+        storage_path = settings["storage_path"] or os.path.join(PROFILES_DIR, name)
+        self.profile = QWebEngineProfile(name, self)
+        self.profile.setPersistentStoragePath(storage_path)
+        self.profile.setCachePath(os.path.join(storage_path, "cache"))
+        self.profile.setHttpCacheType(self.CACHE_TYPES.get(settings["cache_type"],
+                                                           QWebEngineProfile.DiskHttpCache))
+        self.profile.setHttpCacheMaximumSize(settings["cache_size_mb"] * 1024 * 1024)
+        self.profile.setPersistentCookiesPolicy(self.COOKIE_POLICIES.get(
+            settings["cookies"], QWebEngineProfile.AllowPersistentCookies))
+        self._apply_cookie_filter(self.profile)
+    
+    def private_profile(self):
+        """Return the off-the-record profile, creating it on first use"""
+        if self._private_profile is None:
+            self._private_profile = QWebEngineProfile(self)
+            self._private_profile.setHttpCacheType(QWebEngineProfile.MemoryHttpCache)
+            self._apply_cookie_filter(self._private_profile)
+            if self._interceptors.interceptors:
+                self._private_profile.setUrlRequestInterceptor(self._interceptors)
+            if self._download_handler is not None:
+                self._private_profile.downloadRequested.connect(self._download_handler)
+            if self._profile_watcher is not None:
+                self._profile_watcher(self._private_profile)
+            for scheme, handler in self._scheme_handlers.items():
+                self._private_profile.installUrlSchemeHandler(scheme, handler)
+        return self._private_profile
+    
+    def profiles(self):
+        return [profile for profile in (self.profile, self._private_profile) if profile is not None]
+    
+    def add_url_request_interceptor(self, interceptor):
+        """Have interceptor see every request, after the interceptors added before it"""
+        self._interceptors.interceptors.append(interceptor)
+        for profile in self.profiles():
+            profile.setUrlRequestInterceptor(self._interceptors)
+    
+    def set_download_handler(self, handler):
+        self._download_handler = handler
+        for profile in self.profiles():
+            profile.downloadRequested.connect(handler)
+    
+    def set_profile_watcher(self, watcher):
+        """Call watcher with each profile, now and as profiles are created"""
+        self._profile_watcher = watcher
+        for profile in self.profiles():
+            watcher(profile)
+    
+    def install_url_scheme_handler(self, scheme, handler):
+        self._scheme_handlers[scheme] = handler
+        for profile in self.profiles():
+            profile.installUrlSchemeHandler(scheme, handler)
+    
+    def _apply_cookie_filter(self, profile):
+        if self.settings["block_third_party_cookies"]:
+            profile.cookieStore().setCookieFilter(lambda request: not request.thirdParty)
+
+def process_cpu_time(pid):
+    """CPU seconds a process has used so far, or None where /proc is not available"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    # utime and stime are the 14th and 15th fields, counted from after the command name
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def process_rss(pid):
+    """Resident memory of a process in bytes, or None where /proc is not available"""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return None
+
+def child_processes(pid):
+    """Every process descended from pid, which for the browser includes its QtWebEngineProcess helpers"""
+    children = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    
+    descendants = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            descendants.append(child)
+            pending.append(child)
+    return descendants
+
+class TabHibernator(QObject):
+    """Freezes and then discards idle background tabs, restoring them when selected.
+    
+    A tab is frozen once it has been out of sight for idle_timeout seconds,
+    unless it is pinned, playing audio or still loading. The CPU time saved
+    is estimated from how busy each tab's renderer was while hidden but not
+    yet frozen, less what it used while frozen. Tabs that share a renderer
+    process are each charged the whole process, so the estimate runs high then.
+    """
+    discarded = pyqtSignal(object)
+    statsChanged = pyqtSignal()
+    
+    def __init__(self, browser, settings):
+        super().__init__(browser)
+        self.browser = browser
+        self.enabled = settings["enabled"]
+        self.idle_timeout = settings["idle_timeout"]
+        self.discard_timeout = settings["discard_timeout"]
+        self.max_live_tabs = settings["max_live_tabs"]
+        
+        # When each web view was last the selected tab
+        self._last_active = {}
+        # URL and scroll position of discarded views, restored on reload
+        self._saved_state = {}
+        # Views that are part way through a navigation
+        self._loading = set()
+        self._current = None
+        
+        # When each hidden view is due to be frozen, with a heap of the same
+        # deadlines; entries that no longer match the dict are skipped
+        self._freeze_due = {}
+        self._freeze_queue = []
+        self._freeze_seq = 0
+        self._freeze_timer = QTimer(self)
+        self._freeze_timer.setSingleShot(True)
+        self._freeze_timer.timeout.connect(self.freeze_due_tabs)
+        
+        # Renderer CPU samples: when each view was hidden, and when it was frozen
+        # together with how busy it had been in the background
+        self._hidden_sample = {}
+        self._frozen = {}
+        self.cpu_saved = 0.0
+        
+        browser.tabs.currentChanged.connect(self.tab_selected)
+        
+        self._timer = QTimer(self)
+        self._timer.setInterval(settings["check_interval"] * 1000)
+        self._timer.timeout.connect(self.check_idle_tabs)
+        if self.enabled:
+            self._timer.start()
+    
+    def track(self, view):
+        self._last_active[view] = time.monotonic()
+        # New views are tracked right after their first navigation starts
+        self._loading.add(view)
+        view.loadStarted.connect(lambda view=view: self._loading.add(view))
+        view.loadFinished.connect(lambda _, view=view: self._load_finished(view))
+        if view is not self._current:
+            self.schedule_freeze(view)
+        if self.enabled:
+            self.enforce_tab_limit()
+    
+    def untrack(self, view):
+        self._thaw(view)
+        self._last_active.pop(view, None)
+        self._saved_state.pop(view, None)
+        self._loading.discard(view)
+        self._freeze_due.pop(view, None)
+        self._hidden_sample.pop(view, None)
+        if self._current is view:
+            self._current = None
+    
+    def tab_selected(self, index):
+        now = time.monotonic()
+        
+        # The tab being left starts its idle time now
+        if self._current in self._last_active:
+            self._last_active[self._current] = now
+            self.schedule_freeze(self._current)
+        
+        view = self.browser.browser_at(index)
+        self._current = view
+        if view is None:
+            return
+        self._last_active[view] = now
+        self._freeze_due.pop(view, None)
+        self._hidden_sample.pop(view, None)
+        self._thaw(view)
+        
+        # Wake the page up; a discarded page reloads its last URL. Qt usually
+        # does this itself as soon as the view is shown.
+        page = view.page()
+        if page.lifecycleState() != QWebEnginePage.LifecycleState.Active:
+            page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        
+        # A page discarded mid-navigation has nothing to reload, so start it again
+        state = self._saved_state.get(view)
+        if state is not None and state["interrupted"]:
+            state["interrupted"] = False
+            page.setUrl(state["url"])
+    
+    def schedule_freeze(self, view, delay=None):
+        if not self.enabled:
+            return
+        due = time.monotonic() + (self.idle_timeout if delay is None else delay)
+        self._freeze_due[view] = due
+        self._freeze_seq += 1
+        heapq.heappush(self._freeze_queue, (due, self._freeze_seq, view))
+        self._hidden_sample.setdefault(view, (time.monotonic(), self._cpu_time(view)))
+        if not self._freeze_timer.isActive() or due <= self._freeze_queue[0][0]:
+            self._start_freeze_timer()
+    
+    def _start_freeze_timer(self):
+        # Drop entries for views that were selected, rescheduled or closed since
+        queue = self._freeze_queue
+        while queue and self._freeze_due.get(queue[0][2]) != queue[0][0]:
+            heapq.heappop(queue)
+        if queue:
+            self._freeze_timer.start(max(0, int((queue[0][0] - time.monotonic()) * 1000)))
+    
+    def freeze_due_tabs(self):
+        now = time.monotonic()
+        queue = self._freeze_queue
+        while queue and queue[0][0] <= now:
+            due, _, view = heapq.heappop(queue)
+            if self._freeze_due.get(view) != due:
+                continue
+            del self._freeze_due[view]
+            if view is self._current or view.page().lifecycleState() != QWebEnginePage.LifecycleState.Active:
+                continue
+            # Audible and loading tabs are checked again later; pinned ones wait to be unpinned
+            if self.browser.is_pinned(view):
+                continue
+            if view.page().recentlyAudible() or view in self._loading:
+                self.schedule_freeze(view)
+                continue
+            self.freeze(view)
+        self._start_freeze_timer()
+    
+    def freeze(self, view):
+        now = time.monotonic()
+        cpu = self._cpu_time(view)
+        hidden_at, hidden_cpu = self._hidden_sample.pop(view, (now, None))
+        rate = 0.0
+        if cpu is not None and hidden_cpu is not None and now > hidden_at:
+            rate = max(0.0, cpu - hidden_cpu) / (now - hidden_at)
+        self._frozen[view] = (now, cpu, rate)
+        view.page().setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+        self.statsChanged.emit()
+    
+    def wake(self, view):
+        """Let a frozen background tab run again, freezing it later if it stays out of sight"""
+        if view.page().lifecycleState() != QWebEnginePage.LifecycleState.Frozen:
+            return
+        self._thaw(view)
+        view.page().setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        if view is not self._current:
+            self.schedule_freeze(view)
+    
+    def _thaw(self, view):
+        frozen = self._frozen.pop(view, None)
+        if frozen is None:
+            return
+        self.cpu_saved += self._estimated_saving(view, frozen)
+        self.statsChanged.emit()
+    
+    def _estimated_saving(self, view, frozen):
+        frozen_at, frozen_cpu, rate = frozen
+        saving = rate * (time.monotonic() - frozen_at)
+        cpu = self._cpu_time(view)
+        if cpu is not None and frozen_cpu is not None and cpu >= frozen_cpu:
+            saving -= cpu - frozen_cpu
+        return max(0.0, saving)
+    
+    def frozen_count(self):
+        return len(self._frozen)
+    
+    def total_cpu_saved(self):
+        """CPU seconds saved so far, counting tabs that are still frozen"""
+        return self.cpu_saved + sum(self._estimated_saving(view, frozen)
+                                    for view, frozen in self._frozen.items())
+    
+    def _cpu_time(self, view):
+        pid = view.page().renderProcessPid()
+        return process_cpu_time(pid) if pid > 0 else None
+    
+    def check_idle_tabs(self):
+        now = time.monotonic()
+        for view, last_active in list(self._last_active.items()):
+            if view is self._current or self.is_exempt(view):
+                continue
+            if now - last_active >= self.discard_timeout and not self.is_discarded(view):
+                self.discard(view)
+        
+        self.enforce_tab_limit()
+        self.statsChanged.emit()
+    
+    def enforce_tab_limit(self):
+        live = [view for view in self._last_active
+                if view.page().lifecycleState() != QWebEnginePage.LifecycleState.Discarded]
+        excess = len(live) - self.max_live_tabs
+        if excess <= 0:
+            return
+        
+        for view in self.discard_candidates(live)[:excess]:
+            self.discard(view)
+    
+    def discard_candidates(self, views=None):
+        """Live background tabs that may be discarded, least recently used first"""
+        if views is None:
+            views = [view for view in self._last_active if not self.is_discarded(view)]
+        return sorted((view for view in views
+                       if view is not self._current and not self.is_exempt(view)
+                       and not view.page().url().isEmpty()),
+                      key=lambda view: self._last_active[view])
+    
+    def is_exempt(self, view):
+        return self.browser.is_pinned(view) or view.page().recentlyAudible()
+    
+    def discard(self, view):
+        page = view.page()
+        if view is self._current or page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded:
+            return
+        # A page that has not committed its first URL yet could not be reloaded
+        if page.url().isEmpty():
+            return
+        
+        # Remember where the user was so the tab comes back as they left it
+        scroll = page.scrollPosition()
+        self._saved_state[view] = {
+            "url": page.url(),
+            "scroll": (scroll.x(), scroll.y()),
+            "interrupted": view in self._loading,
+        }
+        self._loading.discard(view)
+        self._thaw(view)
+        self._freeze_due.pop(view, None)
+        self._hidden_sample.pop(view, None)
+        page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+        self.discarded.emit(view)
+    
+    def is_discarded(self, view):
+        return view.page().lifecycleState() == QWebEnginePage.LifecycleState.Discarded
+    
+    def _load_finished(self, view):
+        self._loading.discard(view)
+        self._restore_scroll(view)
+    
+    def _restore_scroll(self, view):
+        state = self._saved_state.get(view)
+        if state is None or self.is_discarded(view):
+            return
+        
+        # Only restore once the reloaded page is back at the saved URL
+        del self._saved_state[view]
+        if view.page().url() == state["url"]:
+            x, y = state["scroll"]
+            view.page().runJavaScript(f"window.scrollTo({x}, {y});")
+
+class MemoryMonitor(QObject):
+    """Samples the resident memory of the browser and its renderer processes.
+    
+    Each renderer's memory is split evenly between the tabs it hosts; the
+    browser process, the GPU process and other helpers are not charged to any
+    tab. Above threshold_mb, background tabs are discarded least recently used
+    first until their estimated share brings usage back under it. Renderers
+    exit some time after their tabs are discarded, so the next sample shows
+    what that actually freed.
+    """
+    sampled = pyqtSignal(dict)
+    
+    def __init__(self, browser, settings, path=MEMORY_METRICS_PATH):
+        super().__init__(browser)
+        self.browser = browser
+        self.enabled = settings["enabled"]
+        self.threshold = settings["threshold_mb"] * 1024 * 1024
+        self.log = settings["log"]
+        self.path = path
+        self.max_log_size = settings["max_log_size_mb"] * 1024 * 1024
+        self.last_sample = None
+        # Memory charged to each web view in the last sample, with its renderer's pid
+        self.tab_memory = {}
+        self._file = None
+        
+        self._timer = QTimer(self)
+        self._timer.setInterval(settings["check_interval"] * 1000)
+        self._timer.timeout.connect(self.check)
+        if self.enabled:
+            self._timer.start()
+    
+    def sample(self):
+        pid = os.getpid()
+        browser_rss = process_rss(pid)
+        if browser_rss is None:
+            return None
+        helpers = {child: process_rss(child) or 0 for child in child_processes(pid)}
+        
+        # Group the live views by the renderer they run in
+        renderers = {}
+        for state in self.browser.states():
+            if state.view is None:
+                continue
+            renderer = state.view.page().renderProcessPid()
+            if renderer in helpers and not self.browser.hibernator.is_discarded(state.view):
+                renderers.setdefault(renderer, []).append(state.view)
+        self.tab_memory = {}
+        for renderer, views in renderers.items():
+            for view in views:
+                self.tab_memory[view] = (renderer, helpers[renderer] / len(views))
+        
+        renderer_rss = sum(helpers[renderer] for renderer in renderers)
+        total = browser_rss + sum(helpers.values())
+        live = sum(len(views) for views in renderers.values())
+        self.last_sample = {
+            "time": round(time.time(), 3),
+            "tabs": len(self.browser.states()),
+            "live_tabs": live,
+            "renderers": len(renderers),
+            "browser_mb": round(browser_rss / 1048576, 1),
+            "renderers_mb": round(renderer_rss / 1048576, 1),
+            "other_mb": round((total - browser_rss - renderer_rss) / 1048576, 1),
+            "total_mb": round(total / 1048576, 1),
+            "per_live_tab_mb": round(renderer_rss / live / 1048576, 1) if live else None,
+            "discarded": 0,
+        }
+        return self.last_sample
+    
+    def check(self):
+        sample = self.sample()
+        if sample is None:
+            return
+        
+        # Discard until the memory charged to the discarded tabs covers the excess
+        excess = sample["total_mb"] * 1048576 - self.threshold
+        if excess > 0:
+            for view in self.browser.hibernator.discard_candidates():
+                if excess <= 0:
+                    break
+                _, rss = self.tab_memory.pop(view, (None, 0))
+                self.browser.hibernator.discard(view)
+                sample["discarded"] += 1
+                excess -= rss
+        
+        if self.log:
+            self._write(sample)
+        self.sampled.emit(sample)
+    
+    def _write(self, sample):
+        try:
+            if self._file is None or self._file.tell() >= self.max_log_size:
+                if self._file is not None:
+                    self._file.close()
+                    os.replace(self.path, self.path + ".1")
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(sample) + "\n")
+            self._file.flush()
+        except OSError:
+            pass
+    
+    def close(self):
+        self._timer.stop()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class ProcessDialog(QDialog):
+    """Developer panel mapping each tab to its renderer process, with the memory charged to both"""
+    TAB_COLUMNS = ["Tab", "Title", "Process", "Memory (MB)", "State"]
+    PROCESS_COLUMNS = ["Process", "Tabs", "Sites", "Memory (MB)"]
+    
+    def __init__(self, browser):
+        super().__init__(browser)
+        self.browser = browser
+        self.monitor = browser.memory_monitor
+        self.setWindowTitle("Processes and Memory")
+        if BROWSER_ICON:
+            self.setWindowIcon(BROWSER_ICON)
+        self.resize(760, 560)
+        
+        layout = QVBoxLayout()
+        self.summary = QLabel()
+        layout.addWidget(self.summary)
+        splitter = QSplitter(Qt.Vertical)
+        self.tabs = create_table(self.TAB_COLUMNS, 1)
+        self.processes = create_table(self.PROCESS_COLUMNS, 2)
+        splitter.addWidget(self.tabs)
+        splitter.addWidget(self.processes)
+        layout.addWidget(splitter)
+        
+        model = browser.config["processes"]
+        limit = model["renderer_limit"]
+        # An unknown model leaves Chromium on its default
+        name = model["model"] if model["model"] in PROCESS_MODELS else "site-per-process"
+        model_label = QLabel(f"Process model: {name}, "
+                             + (f"at most {limit} renderers" if limit > 0 else "no renderer limit"))
+        model_label.setProperty("muted", True)
+        buttons = QHBoxLayout()
+        buttons.addWidget(model_label)
+        buttons.addStretch()
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        buttons.addWidget(refresh_button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        
+        self.monitor.sampled.connect(self.show_sample)
+        self.refresh()
+    
+    def refresh(self):
+        self.show_sample(self.monitor.sample())
+    
+    def show_sample(self, sample):
+        if sample is None:
+            self.summary.setText("Memory use is only available where /proc is")
+        else:
+            threshold = self.monitor.threshold / 1048576
+            self.summary.setText(
+                f"{sample['total_mb']:.0f} MB in total: browser {sample['browser_mb']:.0f} MB, "
+                f"renderers {sample['renderers_mb']:.0f} MB ({sample['live_tabs']} of {sample['tabs']} "
+                f"tabs live), other processes {sample['other_mb']:.0f} MB"
+                + (f" · tabs are discarded above {threshold:.0f} MB" if self.monitor.enabled else ""))
+        
+        # Renderer pids come from the pages themselves, so they show without /proc too
+        processes = {}
+        states = sorted(self.browser.states(), key=self.browser.index_of)
+        self.tabs.setRowCount(len(states))
+        for row, state in enumerate(states):
+            pid = None
+            rss = self.monitor.tab_memory.get(state.view, (None, None))[1]
+            if state.view is None:
+                status = "Not loaded"
+            elif self.browser.hibernator.is_discarded(state.view):
+                status = "Discarded"
+            else:
+                frozen = state.view.page().lifecycleState() == QWebEnginePage.LifecycleState.Frozen
+                status = "Frozen" if frozen else "Active"
+                pid = state.view.page().renderProcessPid() or None
+            if pid is not None:
+                tabs, sites, memory = processes.setdefault(pid, ([], set(), [0]))
+                tabs.append(state)
+                sites.add(url_host(state.url))
+                memory[0] += rss or 0
+            values = [str(state.id if state.id is not None else ""), state.title or state.url,
+                      str(pid or ""), "" if rss is None else f"{rss / 1048576:.1f}", status]
+            for column, value in enumerate(values):
+                self.tabs.setItem(row, column, QTableWidgetItem(value))
+        
+        self.processes.setRowCount(len(processes))
+        for row, (pid, (tabs, sites, memory)) in enumerate(sorted(processes.items())):
+            values = [str(pid), str(len(tabs)), ", ".join(sorted(sites)),
+                      f"{memory[0] / 1048576:.1f}" if sample is not None else ""]
+            for column, value in enumerate(values):
+                self.processes.setItem(row, column, QTableWidgetItem(value))
+
+def thumbnail_key(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+class ThumbnailWorker(QObject):
+    """Scales, compresses and stores page thumbnails on their own thread"""
+    ready = pyqtSignal(str, QImage)
+    
+    def __init__(self, directory, width, height, quality, max_size):
+        super().__init__()
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.max_size = max_size
+        # Bytes of thumbnails on disk, counted on first use
+        self._disk_size = None
+    
+    def path(self, url):
+        return os.path.join(self.directory, thumbnail_key(url) + ".jpg")
+    
+    @pyqtSlot(str, QImage)
+    def store(self, url, image):
+        # Scale the page down to cover the thumbnail, keeping its top left corner
+        image = image.scaled(self.width, self.height, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+        image = image.copy(0, 0, self.width, self.height)
+        
+        os.makedirs(self.directory, exist_ok=True)
+        if self._disk_size is None:
+            self._disk_size = sum(entry.stat().st_size for entry in os.scandir(self.directory))
+        path = self.path(url)
+        # Written aside and moved into place, so the new tab page never reads half a file
+        if not image.save(path + ".tmp", "JPEG", self.quality):
+            return
+        try:
+            self._disk_size -= os.path.getsize(path)
+        except OSError:
+            pass
+        self._disk_size += os.path.getsize(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self.ready.emit(url, image)
+        if self._disk_size > self.max_size:
+            self.evict()
+    
+    @pyqtSlot(str)
+    def load(self, url):
+        path = self.path(url)
+        image = QImage(path)
+        if not image.isNull():
+            # The file's modification time orders eviction, so reading it counts as a use
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        self.ready.emit(url, image)
+    
+    def evict(self):
+        """Delete the least recently used thumbnails until the cache is back to 90% of its size"""
+        entries = sorted(os.scandir(self.directory), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._disk_size <= self.max_size * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._disk_size -= size
+
+class ThumbnailCache(QObject):
+    """Thumbnails of visited pages for the tab overview and the new tab page.
+    
+    Only the current tab is captured, a moment after it finishes loading or
+    is selected, as hidden web views have nothing to grab. The grab itself
+    has to happen on the GUI thread; scaling, JPEG compression and the disk
+    cache are handled by a worker thread. Decoded thumbnails are kept in a
+    bounded LRU cache. A miss is read from disk in the background, so asking
+    for a thumbnail never blocks, and thumbnailReady says when it arrives.
+    """
+    storeRequested = pyqtSignal(str, QImage)
+    loadRequested = pyqtSignal(str)
+    thumbnailReady = pyqtSignal(str)
+    
+    def __init__(self, browser, settings, directory=THUMBNAILS_DIR):
+        super().__init__(browser)
+        self.browser = browser
+        self.enabled = settings["enabled"]
+        self.size = QSize(settings["width"], settings["height"])
+        self.memory_items = settings["memory_items"]
+        self.refresh_after = settings["refresh_after"]
+        self.directory = directory
+        self._pixmaps = collections.OrderedDict()
+        # URLs being read from disk, and those found to have no thumbnail there
+        self._loading = set()
+        self._missing = set()
+        # When each URL was last captured in this session
+        self._captured = {}
+        
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(settings["capture_delay"])
+        self._timer.timeout.connect(self.capture)
+        
+        self._worker = ThumbnailWorker(directory, settings["width"], settings["height"],
+                                       settings["quality"], settings["max_disk_mb"] * 1024 * 1024)
+        self._thread = QThread(self)
+        self._worker.moveToThread(self._thread)
+        self.storeRequested.connect(self._worker.store)
+        self.loadRequested.connect(self._worker.load)
+        self._worker.ready.connect(self._ready)
+        if self.enabled:
+            self._thread.start()
+    
+    def thumbnail(self, url):
+        """The cached thumbnail of a page, or None while it is loaded or if there is none"""
+        pixmap = self._pixmaps.get(url)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(url)
+            return pixmap
+        if self.enabled and url not in self._loading and url not in self._missing:
+            self._loading.add(url)
+            self.loadRequested.emit(url)
+        return None
+    
+    def path(self, key):
+        return os.path.join(self.directory, key + ".jpg")
+    
+    def needs_capture(self, url):
+        captured = self._captured.get(url)
+        return captured is None or time.monotonic() - captured > self.refresh_after
+    
+    def schedule_capture(self):
+        """Capture the current tab once it has had time to paint"""
+        if self.enabled:
+            self._timer.start()
+    
+    def capture(self):
+        state = self.browser.current_state()
+        if (state is None or state.view is None or state.private or state.loading
+                or not state.view.isVisible() or not state.url.startswith(("http://", "https://"))):
+            return
+        pixmap = state.view.grab()
+        if pixmap.isNull():
+            return
+        self._captured[state.url] = time.monotonic()
+        self.storeRequested.emit(state.url, pixmap.toImage())
+    
+    def _ready(self, url, image):
+        self._loading.discard(url)
+        if image.isNull():
+            self._missing.add(url)
+            return
+        self._missing.discard(url)
+        self._pixmaps[url] = QPixmap.fromImage(image)
+        self._pixmaps.move_to_end(url)
+        while len(self._pixmaps) > self.memory_items:
+            self._pixmaps.popitem(last=False)
+        self.thumbnailReady.emit(url)
+    
+    def close(self):
+        self._timer.stop()
+        self._thread.quit()
+        self._thread.wait()
+
+class TabOverviewDialog(QDialog):
+    """Every open tab as a grid of thumbnails; activating one switches to it.
+    
+    Tiles are built from what the browser already tracks for each tab and
+    from cached thumbnails, so no web view is touched and hibernated or not
+    yet loaded tabs stay asleep. Thumbnails still on disk fill in as they
+    arrive.
+    """
+    def __init__(self, browser):
+        super().__init__(browser)
+        self.browser = browser
+        self.setWindowTitle("Tab Overview")
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        if BROWSER_ICON:
+            self.setWindowIcon(BROWSER_ICON)
+        self.resize(960, 640)
+        
+        thumbnails = browser.thumbnails
+        size = thumbnails.size
+        placeholder = QPixmap(size)
+        placeholder.fill(browser.theme.color("hover"))
+        self.placeholder = QIcon(placeholder)
+        
+        layout = QVBoxLayout()
+        self.tiles = QListWidget()
+        self.tiles.setViewMode(QListWidget.IconMode)
+        self.tiles.setMovement(QListWidget.Static)
+        self.tiles.setResizeMode(QListWidget.Adjust)
+        self.tiles.setUniformItemSizes(True)
+        self.tiles.setIconSize(size)
+        self.tiles.setGridSize(QSize(size.width() + 24, size.height() + 40))
+        self.tiles.setSpacing(8)
+        self.tiles.itemActivated.connect(self.open_tab)
+        layout.addWidget(self.tiles)
+        self.setLayout(layout)
+        
+        # Tiles waiting for their thumbnail, by URL
+        self._waiting = {}
+        for index in range(browser.tabs.count()):
+            state = browser.state_at(index)
+            pixmap = thumbnails.thumbnail(state.url) if not state.private else None
+            item = QListWidgetItem(QIcon(pixmap) if pixmap is not None else self.placeholder,
+                                   state.title or state.url)
+            item.setToolTip(state.url)
+            item.setData(Qt.UserRole, state)
+            self.tiles.addItem(item)
+            if pixmap is None and not state.private:
+                self._waiting.setdefault(state.url, []).append(item)
+        self.tiles.setCurrentRow(browser.tabs.currentIndex())
+        
+        thumbnails.thumbnailReady.connect(self.update_thumbnail)
+    
+    def update_thumbnail(self, url):
+        pixmap = self.browser.thumbnails.thumbnail(url)
+        for item in self._waiting.pop(url, []):
+            item.setIcon(QIcon(pixmap))
+    
+    def open_tab(self, item):
+        state = item.data(Qt.UserRole)
+        # The tab may have been closed while the overview was open
+        if self.browser.is_open(state):
+            self.browser.tabs.setCurrentIndex(self.browser.index_of(state))
+        self.close()
+
+class NewTabPage(QWebEngineUrlSchemeHandler):
+    """Serves nexawave://newtab, the most visited pages with their thumbnails.
+    
+    The page is answered once the history thread has looked the pages up, so
+    the GUI thread never waits on the database. Thumbnails are served from
+    the thumbnail cache's files as nexawave://thumbnail/<key>.
+    """
+    def __init__(self, browser, settings):
+        super().__init__(browser)
+        self.browser = browser
+        self.sites = settings["sites"]
+        # Requests for the page waiting on the history thread
+        self._jobs = []
+        browser.history.mostVisitedReady.connect(self._most_visited_ready)
+    
+    def requestStarted(self, job):
+        url = job.requestUrl()
+        if url.host() == "newtab":
+            if not self._jobs:
+                self.browser.history.most_visited(self.sites)
+            self._jobs.append(job)
+            job.destroyed.connect(lambda _=None, job=job: self._jobs.remove(job) if job in self._jobs else None)
+        elif url.host() == "thumbnail" and re.fullmatch(r"/[0-9a-f]{40}", url.path()):
+            try:
+                with open(self.browser.thumbnails.path(url.path()[1:]), "rb") as f:
+                    self._reply(job, b"image/jpeg", f.read())
+            except OSError:
+                job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+        else:
+            job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+    
+    def _reply(self, job, content_type, data):
+        # The buffer belongs to the job, so it lives until the page has read it
+        buffer = QBuffer(job)
+        buffer.setData(data)
+        job.reply(content_type, buffer)
+    
+    def _most_visited_ready(self, sites):
+        jobs, self._jobs = self._jobs, []
+        body = self.render(sites).encode("utf-8")
+        for job in jobs:
+            self._reply(job, b"text/html", body)
+    
+    def render(self, sites):
+        colors = self.browser.theme.colors()
+        tiles = []
+        for url, title in sites:
+            tiles.append(
+                f'<a class="tile" href="{html.escape(url)}" title="{html.escape(url)}">'
+                f'<img src="nexawave://thumbnail/{thumbnail_key(url)}" onerror="this.remove()">'
+                f'<span>{html.escape(title or url_host(url))}</span></a>')
+        return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>New Tab</title><style>
+    body {{ margin: 0; padding: 64px 32px; background: {colors['chrome']}; color: {colors['text']};
+            font-family: system-ui, sans-serif; }}
+    main {{ display: grid; grid-template-columns: repeat(auto-fill, 240px); gap: 20px;
+            justify-content: center; max-width: 1100px; margin: 0 auto; }}
+    .tile {{ display: flex; flex-direction: column; height: 190px; overflow: hidden;
+             border: 1px solid {colors['border']}; border-radius: 8px; background: {colors['border']};
+             color: inherit; text-decoration: none; }}
+    .tile:hover {{ border-color: {colors['accent']}; }}
+    .tile img {{ width: 240px; height: 150px; object-fit: cover; background: {colors['window']}; }}
+    .tile span {{ margin-top: auto; padding: 10px 12px; background: {colors['window']}; font-size: 13px;
+                  white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+    p {{ text-align: center; color: {colors['muted']}; }}
+</style></head><body>
+<main>{"".join(tiles)}</main>
+{"" if tiles else "<p>Pages you visit often will show up here.</p>"}
+</body></html>"""
+
+def register_url_schemes():
+    """Declare the browser's own URL scheme, which QtWebEngine needs before the application starts"""
+    scheme = QWebEngineUrlScheme(APP_SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    # Local so that web pages cannot load or link to the browser's own pages, which
+    # may still load each other's resources
+    scheme.setFlags(QWebEngineUrlScheme.SecureScheme | QWebEngineUrlScheme.LocalScheme
+                    | QWebEngineUrlScheme.LocalAccessAllowed)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+class BatchLoader(QObject):
+    """Loads a list of URLs through a fixed pool of reused pages, without a window.
+    
+    Pages run on an off-the-record profile with the content blocker installed.
+    QtWebEngine does not expose the HTTP status of a navigation, so a GET for
+    each URL runs alongside the page load and is aborted once its headers arrive.
+    """
+    resultReady = pyqtSignal(dict)
+    finished = pyqtSignal()
+    
+    def __init__(self, urls, config, pool_size=4, timeout=30, parent=None):
+        super().__init__(parent)
+        self._queue = list(enumerate(urls))
+        self._queue.reverse()
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._pages = []
+        self._idle = []
+        self._jobs = {}
+        self._done = False
+        
+        self.profile = QWebEngineProfile(self)
+        self.profile.setHttpCacheType(QWebEngineProfile.MemoryHttpCache)
+        self.content_blocker = ContentBlocker(config["content_blocker"], self)
+        self.profile.setUrlRequestInterceptor(self.content_blocker)
+        self.network = QNetworkAccessManager(self)
+        self.network.setRedirectPolicy(QNetworkRequest.NoLessSafeRedirectPolicy)
+    
+    def start(self):
+        # Wait for the filter lists so every page is blocked the same way
+        if self.content_blocker.enabled and self.content_blocker.matcher is None:
+            self.content_blocker.filtersLoaded.connect(self.start)
+            return
+        self._next()
+    
+    def close(self):
+        # Pages must be gone before their profile is destroyed
+        for page in self._pages:
+            page.deleteLater()
+        self._pages = []
+        self._idle = []
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        self.content_blocker.close()
+    
+    def _next(self):
+        while self._queue:
+            if self._idle:
+                page = self._idle.pop()
+            elif len(self._pages) < self.pool_size:
+                page = self._create_page()
+            else:
+                return
+            self._load(page, *self._queue.pop())
+        if not self._jobs and not self._done:
+            self._done = True
+            self.finished.emit()
+    
+    def _create_page(self):
+        page = QWebEnginePage(self.profile, self)
+        page.loadFinished.connect(lambda ok, page=page: self._load_finished(page, ok))
+        self._pages.append(page)
+        return page
+    
+    def _load(self, page, index, url):
+        qurl = QUrl.fromUserInput(url)
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda page=page: self._timed_out(page))
+        reply = self.network.get(QNetworkRequest(qurl))
+        reply.metaDataChanged.connect(lambda page=page: self._status_received(page))
+        reply.finished.connect(lambda page=page: self._status_received(page))
+        self._jobs[page] = {
+            "result": {"index": index, "url": url},
+            "start": time.perf_counter(),
+            "timer": timer,
+            "reply": reply,
+            "status": None,
+            "loaded": False,
+        }
+        timer.start(int(self.timeout * 1000))
+        page.setUrl(qurl)
+    
+    def _status_received(self, page):
+        job = self._jobs.get(page)
+        if job is None or job["reply"] is None:
+            return
+        reply = job["reply"]
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        # Redirects are followed, so only the final response counts
+        if status is not None and 300 <= status < 400 and reply.hasRawHeader(b"Location") \
+                and not reply.isFinished():
+            return
+        job["status"] = status
+        job["reply"] = None
+        if not reply.isFinished():
+            reply.abort()
+        reply.deleteLater()
+        if job["loaded"]:
+            self._finish(page)
+    
+    def _load_finished(self, page, ok):
+        # Later loads of the same page, like script redirects, are not timed
+        job = self._jobs.get(page)
+        if job is None or job["loaded"]:
+            return
+        job["loaded"] = True
+        job["result"].update({
+            "ok": ok,
+            "final_url": page.url().toString(),
+            "title": page.title(),
+            "load_ms": round((time.perf_counter() - job["start"]) * 1000, 1),
+        })
+        if job["reply"] is None:
+            self._finish(page)
+    
+    def _timed_out(self, page):
+        job = self._jobs.get(page)
+        if job is None:
+            return
+        # Aborting emits finished straight away, so the reply is let go of first
+        reply, job["reply"] = job["reply"], None
+        if reply is not None:
+            reply.abort()
+            reply.deleteLater()
+        if job["loaded"]:
+            self._finish(page)
+            return
+        
+        # A stopped load still reports loadFinished, so the page is replaced instead of reused
+        job["result"].update({"ok": False, "final_url": page.url().toString(),
+                              "title": "", "load_ms": None, "error": "timeout"})
+        self._pages.remove(page)
+        page.loadFinished.disconnect()
+        page.triggerAction(QWebEnginePage.Stop)
+        page.deleteLater()
+        self._finish(page, reuse=False)
+    
+    def _finish(self, page, reuse=True):
+        job = self._jobs.pop(page)
+        job["timer"].stop()
+        job["timer"].deleteLater()
+        job["result"]["status"] = job["status"]
+        self.resultReady.emit(job["result"])
+        if reuse:
+            self._idle.append(page)
+        # Start the next load from the event loop rather than inside this page's signal
+        QTimer.singleShot(0, self._next)
+
+class DownloadError(Exception):
+    """A download that cannot be resumed and has to start over"""
+
+class BandwidthLimiter:
+    """Token bucket shared by every download thread; a rate of 0 means no limit"""
+    
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._allowance = rate
+        self._last = time.monotonic()
+    
+    def consume(self, size):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            # The bucket may go into debt; whoever takes it there waits it off
+            self._allowance -= size
+            delay = -self._allowance / self.rate if self._allowance < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+def parse_digest(headers, partial=False):
+    """The (algorithm, hex digest) a response declares for the whole file, if any"""
+    algorithms = {"sha-256": "sha256", "sha-512": "sha512", "md5": "md5"}
+    for name in ("Repr-Digest", "Digest"):
+        for entry in headers.get(name, "").split(","):
+            algorithm, _, value = entry.strip().partition("=")
+            algorithm = algorithms.get(algorithm.lower())
+            if algorithm and value:
+                try:
+                    return algorithm, base64.b64decode(value.strip(":")).hex()
+                except ValueError:
+                    continue
+    # Content-MD5 only covers the bytes in this response
+    if headers.get("Content-MD5") and not partial:
+        try:
+            return "md5", base64.b64decode(headers["Content-MD5"]).hex()
+        except ValueError:
+            pass
+    return None
+
+class Download:
+    """One file being fetched in byte range segments, each [start, next byte, end).
+    
+    A segment of a file whose size the server did not send has an end of -1
+    until its stream ends.
+    """
+    __slots__ = ("id", "url", "path", "private", "referrer", "item", "size", "etag", "ranged", "segments",
+                 "status", "error", "expected", "digest", "received", "speed", "running", "_sample")
+    
+    def __init__(self, download_id, url, path, private=False, referrer=None):
+        self.id = download_id
+        self.url = url
+        self.path = path
+        self.private = private
+        # Page the download was started from, sent as the Referer
+        self.referrer = referrer
+        # Chromium's own download, for requests it has to make itself
+        self.item = None
+        # Total size, or -1 until the server has said
+        self.size = -1
+        self.etag = None
+        self.ranged = False
+        # An empty list means the file has not been probed yet
+        self.segments = []
+        self.status = "queued"
+        self.error = ""
+        # Checksum announced by the server, and the SHA-256 of what was received
+        self.expected = None
+        self.digest = None
+        self.received = 0
+        self.speed = 0.0
+        # Segment threads still working on the download
+        self.running = 0
+        self._sample = (time.monotonic(), 0)
+    
+    @property
+    def part_path(self):
+        return self.path + ".part"
+    
+    def part_intact(self):
+        """Whether the .part file still holds every byte the segments say was received"""
+        try:
+            size = os.path.getsize(self.part_path)
+        except OSError:
+            return False
+        return size >= max(self.size, max(segment[1] for segment in self.segments))
+    
+    @classmethod
+    def from_dict(cls, data):
+        download = cls(data["id"], data["url"], data["path"], referrer=data.get("referrer"))
+        download.size = data["size"]
+        download.etag = data["etag"]
+        download.ranged = data["ranged"]
+        download.segments = [list(segment) for segment in data["segments"]]
+        download.expected = tuple(data["expected"]) if data["expected"] else None
+        download.digest = data["digest"]
+        download.error = data["error"]
+        download.received = sum(segment[1] - segment[0] for segment in download.segments)
+        # Downloads cut off by the last exit are picked up again with Resume
+        download.status = ("paused" if data["status"] in ("queued", "downloading", "verifying")
+                           else data["status"])
+        return download
+    
+    def to_dict(self):
+        return {"id": self.id, "url": self.url, "path": self.path, "referrer": self.referrer, "size": self.size,
+                "etag": self.etag, "ranged": self.ranged, "segments": self.segments,
+                "status": self.status, "error": self.error, "expected": self.expected,
+                "digest": self.digest}
+
+class PostTracker(QWebEngineUrlRequestInterceptor):
+    """Remembers the recent page loads sent with another method than GET, whose responses cannot be fetched again"""
+    FRAME_TYPES = (QWebEngineUrlRequestInfo.ResourceTypeMainFrame, QWebEngineUrlRequestInfo.ResourceTypeSubFrame)
+    LIMIT = 64
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._posted = collections.OrderedDict()
+    
+    def interceptRequest(self, info):
+        if bytes(info.requestMethod()) != b"GET" and info.resourceType() in self.FRAME_TYPES:
+            url = info.requestUrl().toString()
+            self._posted[url] = True
+            self._posted.move_to_end(url)
+            if len(self._posted) > self.LIMIT:
+                self._posted.popitem(last=False)
+    
+    def was_posted(self, url):
+        return url.toString() in self._posted
+
+class DownloadManager(QObject):
+    """Downloads files over pooled HTTP connections, in parallel Range segments where the server allows.
+    
+    Every segment runs on a shared thread pool whose size is the global
+    connection limit, and all of them draw from one bandwidth limiter.
+    Progress is kept in downloads.json, so interrupted downloads resume from
+    the bytes already on disk, guarded by If-Range against the file changing.
+    A download is checked against any digest the server sends before it is
+    moved into place. Requests carry the cookies and user agent of the
+    profile the download was started from. Chromium keeps the downloads
+    that cannot be repeated as a plain GET, such as the response to a form
+    post.
+    """
+    changed = pyqtSignal()
+    added = pyqtSignal(object)
+    
+    CHUNK_SIZE = 64 * 1024
+    MAX_RETRIES = 5
+    
+    def __init__(self, settings, parent=None, path=DOWNLOADS_PATH):
+        super().__init__(parent)
+        self.directory = settings["directory"] or os.path.join(os.path.expanduser("~"), "Downloads")
+        self.segment_count = max(1, settings["segments"])
+        self.min_segment_size = settings["min_segment_mb"] * 1024 * 1024
+        self.checksum_files = settings["checksum_files"]
+        self.limiter = BandwidthLimiter(settings["max_rate_kbps"] * 1024)
+        self.path = path
+        self.downloads = []
+        self._lock = threading.Lock()
+        self._session = None
+        self._next_id = 0
+        self._saved = (0.0, None)
+        # Cookies and user agent of the persistent (False) and private (True) profiles
+        self._cookies = {}
+        self._user_agents = {}
+        # Sees the profiles' requests, to tell which downloads answer a form post
+        self.post_tracker = PostTracker(self)
+        
+        # Caps the connections open at once across all downloads
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, settings["max_connections"]))
+        
+        # Segment threads only touch the shared state; the GUI catches up on a timer
+        self._timer = QTimer(self)
+        self._timer.setInterval(250)
+        self._timer.timeout.connect(self._poll)
+        self._load()
+    
+    def session(self):
+        # requests is imported on first use, keeping it off the startup path
+        import requests
+        import requests.adapters
+        
+        # Segment threads starting together must not each make a session
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=self._pool.maxThreadCount())
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+            return self._session
+    
+    def watch_profile(self, profile):
+        """Keep a copy of a profile's cookies and user agent for the downloads started from it"""
+        private = profile.isOffTheRecord()
+        cookies = self._cookies[private] = {}
+        self._user_agents[private] = profile.httpUserAgent()
+        store = profile.cookieStore()
+        store.cookieAdded.connect(lambda cookie: self._cookie_changed(cookies, cookie, True))
+        store.cookieRemoved.connect(lambda cookie: self._cookie_changed(cookies, cookie, False))
+        # Cookies already stored are reported through cookieAdded too
+        store.loadAllCookies()
+    
+    def _cookie_changed(self, cookies, cookie, added):
+        key = (bytes(cookie.name()).decode("latin-1"), cookie.domain().lower(), cookie.path() or "/")
+        with self._lock:
+            if not added:
+                cookies.pop(key, None)
+                return
+            expires = None if cookie.isSessionCookie() else cookie.expirationDate().toSecsSinceEpoch()
+            cookies[key] = (bytes(cookie.value()).decode("latin-1"), cookie.isSecure(), expires)
+    
+    def cookie_header(self, url, private=False):
+        """The Cookie header the profile would send with a request for url"""
+        parts = urllib.parse.urlsplit(url)
+        host = (parts.hostname or "").lower()
+        path = parts.path or "/"
+        now = time.time()
+        pairs = []
+        with self._lock:
+            for (name, domain, cookie_path), (value, secure, expires) in self._cookies.get(private, {}).items():
+                # A domain cookie also goes to subdomains; a host-only one only to its host
+                if not (host == domain.lstrip(".") or domain.startswith(".") and host.endswith(domain)):
+                    continue
+                if not (path == cookie_path or path.startswith(cookie_path.rstrip("/") + "/")):
+                    continue
+                if (secure and parts.scheme != "https") or (expires is not None and expires <= now):
+                    continue
+                pairs.append((len(cookie_path), f"{name}={value}"))
+        # Longer paths first, as browsers send them
+        pairs.sort(key=lambda pair: pair[0], reverse=True)
+        return "; ".join(pair for _, pair in pairs)
+    
+    def _headers(self, download, headers=None):
+        headers = dict(headers or {})
+        if self._user_agents.get(download.private):
+            headers["User-Agent"] = self._user_agents[download.private]
+        if download.referrer:
+            headers["Referer"] = download.referrer
+        cookies = self.cookie_header(download.url, download.private)
+        if cookies:
+            headers["Cookie"] = cookies
+        return headers
+    
+    def download_requested(self, item):
+        """Take over a download from Chromium, unless it has to be fetched the way the page asked for it"""
+        # Pages being saved are the snapshot store's business
+        if item.isSavePageDownload():
+            return
+        url = item.url()
+        private = item.page() is not None and item.page().profile().isOffTheRecord()
+        referrer = item.page().url().toString() if item.page() is not None else None
+        # blob: and data: downloads only exist inside the page, and a form post cannot be sent again
+        if url.scheme() not in ("http", "https") or self.post_tracker.was_posted(url):
+            self.add_item(item, private)
+            return
+        item.cancel()
+        self.add(url.toString(), item.downloadFileName(), private, referrer)
+    
+    def add(self, url, filename=None, private=False, referrer=None):
+        if not filename:
+            filename = QUrl(url).fileName() or "download"
+        download = Download(self._next_id, url, self.unique_path(filename), private, referrer)
+        self._next_id += 1
+        self.downloads.append(download)
+        self.added.emit(download)
+        self.start(download)
+        return download
+    
+    def add_item(self, item, private=False):
+        """List a download Chromium runs itself, saved into the same directory"""
+        download = Download(self._next_id, item.url().toString(), self.unique_path(item.downloadFileName()),
+                            private)
+        self._next_id += 1
+        download.item = item
+        download.status = "downloading"
+        item.setDownloadDirectory(os.path.dirname(download.path))
+        item.setDownloadFileName(os.path.basename(download.path))
+        item.downloadProgress.connect(lambda received, total: self._item_progress(download, received, total))
+        item.finished.connect(lambda: self._item_finished(download))
+        item.accept()
+        self.downloads.append(download)
+        self.added.emit(download)
+        if not self._timer.isActive():
+            self._timer.start()
+        self.changed.emit()
+        return download
+    
+    def _item_progress(self, download, received, total):
+        download.received = received
+        download.size = total
+    
+    def _item_finished(self, download):
+        item = download.item
+        if item.state() == QWebEngineDownloadItem.DownloadCompleted:
+            download.status = "completed"
+        elif item.state() == QWebEngineDownloadItem.DownloadCancelled:
+            download.status = "cancelled"
+        else:
+            download.status = "failed"
+            download.error = item.interruptReasonString()
+        self.changed.emit()
+    
+    def unique_path(self, filename):
+        taken = {download.path for download in self.downloads}
+        filename = os.path.basename(filename)
+        stem, extension = os.path.splitext(filename)
+        path = os.path.join(self.directory, filename)
+        number = 1
+        while path in taken or os.path.exists(path) or os.path.exists(path + ".part"):
+            path = os.path.join(self.directory, f"{stem} ({number}){extension}")
+            number += 1
+        return path
+    
+    def start(self, download):
+        if download.item is not None:
+            # Chromium picks up a paused or interrupted download where it stopped
+            if download.status in ("paused", "failed"):
+                download.item.resume()
+                download.status = "downloading"
+                download.error = ""
+                self.changed.emit()
+            return
+        with self._lock:
+            if download.status in ("downloading", "verifying"):
+                return
+            if download.running:
+                # Threads stopped by a pause are still winding down; the last one to exit starts it again
+                download.status = "queued"
+            else:
+                self._begin(download)
+        if not self._timer.isActive():
+            self._timer.start()
+        self.changed.emit()
+    
+    def pause(self, download):
+        with self._lock:
+            if download.status in ("queued", "downloading"):
+                download.status = "paused"
+                if download.item is not None:
+                    download.item.pause()
+        self.changed.emit()
+    
+    def cancel(self, download):
+        if download.item is not None:
+            if download.status != "completed":
+                download.item.cancel()
+            return
+        with self._lock:
+            if download.status == "completed":
+                return
+            download.status = "cancelled"
+            running = download.running
+        # Segment threads still writing clean up after themselves
+        if not running:
+            self._remove_part(download)
+        self.changed.emit()
+    
+    def retry(self, download):
+        """Start a download again from the beginning"""
+        with self._lock:
+            if download.running or download.item is not None:
+                return
+            download.segments = []
+            download.received = 0
+            download.digest = None
+        self._remove_part(download)
+        self.start(download)
+    
+    def clear_finished(self):
+        self.downloads = [download for download in self.downloads
+                          if download.status not in ("completed", "cancelled")]
+        self._save()
+        self.changed.emit()
+    
+    def is_active(self):
+        return any(download.status in ("downloading", "verifying") or download.running
+                   for download in self.downloads)
+    
+    def _begin(self, download):
+        # Called with the lock held, while no thread is working on the download
+        download.status = "downloading"
+        download.error = ""
+        download._sample = (time.monotonic(), download.received)
+        if download.segments and not download.part_intact():
+            # The partial file was deleted or cut short since, so start over
+            download.segments = []
+            download.received = 0
+        if not download.segments:
+            download.running = 1
+            self._pool.start(lambda: self._probe(download))
+        else:
+            self._start_segments(download)
+    
+    def _start_segments(self, download):
+        # Called with the lock held
+        for segment in download.segments:
+            if segment[2] < 0 or segment[1] < segment[2]:
+                download.running += 1
+                self._pool.start(lambda segment=segment: self._fetch_segment(download, segment))
+        if not download.running:
+            download.running = 1
+            self._pool.start(lambda: self._finish(download))
+    
+    def _probe(self, download):
+        """Find the size and range support of a new download, then split it into segments"""
+        try:
+            with self.session().get(download.url, headers=self._headers(download, {"Range": "bytes=0-0"}),
+                                    stream=True, timeout=(10, 30)) as response:
+                response.raise_for_status()
+                size = -1
+                ranged = response.status_code == 206
+                if ranged:
+                    size = int(response.headers.get("Content-Range", "*/-1").rsplit("/", 1)[1])
+                    ranged = size > 0
+                elif "Content-Length" in response.headers and "Content-Encoding" not in response.headers:
+                    size = int(response.headers["Content-Length"])
+                etag = response.headers.get("ETag") or response.headers.get("Last-Modified")
+                expected = parse_digest(response.headers, partial=ranged)
+            expected = expected or self._checksum_file(download)
+            os.makedirs(os.path.dirname(download.path) or ".", exist_ok=True)
+            with open(download.part_path, "wb") as f:
+                if size > 0:
+                    f.truncate(size)
+        except Exception as error:
+            self._fail(download, error)
+            return
+        
+        # Only files large enough to be worth it are split up
+        count = 1
+        if ranged:
+            count = max(1, min(self.segment_count, size // max(1, self.min_segment_size)))
+        bounds = [size * i // count for i in range(count + 1)] if size >= 0 else [0, -1]
+        with self._lock:
+            download.size = size
+            download.ranged = ranged
+            download.etag = etag
+            download.expected = expected
+            download.segments = [[bounds[i], bounds[i], bounds[i + 1]] for i in range(count)]
+            download.running -= 1
+            if download.status == "downloading":
+                self._start_segments(download)
+            elif download.status == "queued":
+                self._begin(download)
+            elif download.status == "cancelled" and not download.running:
+                self._remove_part(download)
+    
+    def _checksum_file(self, download):
+        # Artifact servers often publish a sha256sum-style file next to each file
+        if not self.checksum_files:
+            return None
+        try:
+            response = self.session().get(download.url + ".sha256", headers=self._headers(download),
+                                          timeout=(10, 30))
+            if response.ok:
+                value = response.text.split()[0].lower()
+                if re.fullmatch(r"[0-9a-f]{64}", value):
+                    return "sha256", value
+        except Exception:
+            pass
+        return None
+    
+    def _fetch_segment(self, download, segment):
+        import requests
+        
+        retries = 0
+        try:
+            with open(download.part_path, "r+b") as f:
+                while download.status == "downloading":
+                    start, position, end = segment
+                    if 0 <= end <= position:
+                        break
+                    headers = {}
+                    if download.ranged:
+                        headers["Range"] = f"bytes={position}-{end - 1}"
+                        if download.etag:
+                            headers["If-Range"] = download.etag
+                    elif position > 0:
+                        # Without range support an interrupted file starts over
+                        f.truncate(0)
+                        with self._lock:
+                            download.received -= position
+                            segment[1] = position = 0
+                    
+                    progressed = False
+                    try:
+                        with self.session().get(download.url, headers=self._headers(download, headers),
+                                                stream=True, timeout=(10, 30)) as response:
+                            response.raise_for_status()
+                            if download.ranged and response.status_code != 206:
+                                raise DownloadError("The file changed on the server")
+                            f.seek(position)
+                            for chunk in response.iter_content(self.CHUNK_SIZE):
+                                if download.status != "downloading":
+                                    break
+                                if end >= 0:
+                                    chunk = chunk[:end - position]
+                                self.limiter.consume(len(chunk))
+                                f.write(chunk)
+                                position += len(chunk)
+                                progressed = True
+                                with self._lock:
+                                    segment[1] = position
+                                    download.received += len(chunk)
+                                if 0 <= end <= position:
+                                    break
+                            else:
+                                if end < 0:
+                                    # A file of unknown size is done when the stream ends
+                                    with self._lock:
+                                        segment[2] = download.size = position
+                    except (requests.ConnectionError, requests.Timeout,
+                            requests.exceptions.ChunkedEncodingError):
+                        retries = 0 if progressed else retries + 1
+                        if retries > self.MAX_RETRIES:
+                            raise
+                        # Back off, but notice a pause while waiting
+                        deadline = time.monotonic() + min(2 ** retries, 30)
+                        while download.status == "downloading" and time.monotonic() < deadline:
+                            time.sleep(0.1)
+        except Exception as error:
+            self._fail(download, error)
+            return
+        self._finish(download)
+    
+    def _finish(self, download):
+        """Runs as each segment thread exits; the last one verifies and moves the file"""
+        with self._lock:
+            download.running -= 1
+            if download.running:
+                return
+            if download.status == "queued":
+                self._begin(download)
+                return
+            status = download.status
+            done = all(0 <= segment[2] <= segment[1] for segment in download.segments)
+            if status == "downloading" and done:
+                download.status = "verifying"
+        if status == "cancelled":
+            self._remove_part(download)
+        if status != "downloading" or not done:
+            return
+        
+        try:
+            algorithm, expected = download.expected or ("sha256", None)
+            digests = {"sha256": hashlib.sha256(), algorithm: hashlib.new(algorithm)}
+            with open(download.part_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    for digest in digests.values():
+                        digest.update(block)
+            download.digest = digests["sha256"].hexdigest()
+            if expected and digests[algorithm].hexdigest() != expected:
+                raise DownloadError(f"The {algorithm} checksum does not match")
+            os.replace(download.part_path, download.path)
+        except Exception as error:
+            with self._lock:
+                download.status = "failed"
+                download.error = str(error)
+                if isinstance(error, DownloadError):
+                    download.segments = []
+                    download.received = 0
+            return
+        with self._lock:
+            download.status = "completed"
+    
+    def _fail(self, download, error):
+        with self._lock:
+            if download.status == "downloading" or download.status == "verifying":
+                download.status = "failed"
+                download.error = str(error) or type(error).__name__
+            # Resuming anything else picks up from the bytes already received
+            if isinstance(error, DownloadError):
+                download.segments = []
+                download.received = 0
+            download.running -= 1
+            running = download.running
+            if download.status == "queued" and not running:
+                self._begin(download)
+            cancelled = download.status == "cancelled"
+        if cancelled and not running:
+            self._remove_part(download)
+    
+    def _remove_part(self, download):
+        try:
+            os.remove(download.part_path)
+        except OSError:
+            pass
+    
+    def _poll(self):
+        now = time.monotonic()
+        for download in self.downloads:
+            sampled_at, received = download._sample
+            if download.status == "downloading" and now - sampled_at >= 1:
+                download.speed = (download.received - received) / (now - sampled_at)
+                download._sample = (now, download.received)
+            elif download.status != "downloading":
+                download.speed = 0.0
+        if not self.is_active():
+            self._timer.stop()
+        # Progress is written every few seconds, and at once when a download changes state
+        statuses = [download.status for download in self.downloads]
+        if now - self._saved[0] >= 2 or statuses != self._saved[1]:
+            self._saved = (now, statuses)
+            self._save()
+        self.changed.emit()
+    
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.downloads = [Download.from_dict(data) for data in json.load(f)]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.downloads = []
+        self._next_id = max((download.id for download in self.downloads), default=-1) + 1
+    
+    def _save(self):
+        # Private downloads are never written down, nor Chromium's, which cannot be resumed after a restart
+        with self._lock:
+            data = [download.to_dict() for download in self.downloads
+                    if not download.private and download.item is None]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            pass
+    
+    def close(self):
+        # Running downloads stop where they are and resume next time
+        with self._lock:
+            for download in self.downloads:
+                if download.status == "downloading":
+                    download.status = "paused"
+        self._pool.waitForDone(3000)
+        self._timer.stop()
+        self._save()
+
+class DownloadsDialog(QDialog):
+    """Lists downloads with their progress, and pauses, resumes or cancels them"""
+    COLUMNS = ["File", "Size", "Progress", "Speed", "Status"]
+    
+    def __init__(self, browser):
+        super().__init__(browser)
+        self.manager = browser.downloads
+        self.setWindowTitle("Downloads")
+        if BROWSER_ICON:
+            self.setWindowIcon(BROWSER_ICON)
+        self.resize(760, 420)
+        
+        layout = QVBoxLayout()
+        self.table = create_table(self.COLUMNS, 0)
+        self.table.itemSelectionChanged.connect(self.update_buttons)
+        layout.addWidget(self.table)
+        
+        buttons = QHBoxLayout()
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(lambda: self.apply(self.manager.pause))
+        self.resume_button = QPushButton("Resume")
+        self.resume_button.clicked.connect(lambda: self.apply(self.resume))
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(lambda: self.apply(self.manager.cancel))
+        clear_button = QPushButton("Clear Finished")
+        clear_button.clicked.connect(self.manager.clear_finished)
+        for button in (self.pause_button, self.resume_button, self.cancel_button):
+            buttons.addWidget(button)
+        buttons.addStretch()
+        buttons.addWidget(clear_button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        
+        self.manager.changed.connect(self.show_downloads)
+        self.show_downloads()
+    
+    def selected(self):
+        rows = {index.row() for index in self.table.selectionModel().selectedRows()}
+        downloads = list(reversed(self.manager.downloads))
+        return [downloads[row] for row in sorted(rows) if row < len(downloads)]
+    
+    def apply(self, action):
+        for download in self.selected():
+            action(download)
+    
+    def resume(self, download):
+        if download.status == "cancelled":
+            self.manager.retry(download)
+        else:
+            self.manager.start(download)
+    
+    def show_downloads(self):
+        def megabytes(size):
+            return f"{size / 1048576:.1f} MB" if size >= 0 else "Unknown"
+        
+        # Newest downloads first
+        downloads = list(reversed(self.manager.downloads))
+        self.table.setRowCount(len(downloads))
+        for row, download in enumerate(downloads):
+            if download.status == "downloading":
+                segments = len(download.segments)
+                status = f"Downloading in {segments} parts" if segments > 1 else "Downloading"
+            elif download.status == "completed":
+                status = "Verified" if download.expected else "Completed"
+            elif download.status == "failed":
+                status = f"Failed: {download.error}"
+            else:
+                status = download.status.capitalize()
+            progress = (f"{download.received / download.size * 100:.0f}%" if download.size > 0
+                        else megabytes(download.received))
+            values = [os.path.basename(download.path), megabytes(download.size), progress,
+                      f"{download.speed / 1024:.0f} KB/s" if download.speed else "", status]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 0:
+                    item.setToolTip(f"{download.url}\n{download.path}"
+                                    + (f"\nSHA-256 {download.digest}" if download.digest else ""))
+                self.table.setItem(row, column, item)
+        self.update_buttons()
+    
+    def update_buttons(self):
+        selected = self.selected()
+        statuses = {download.status for download in selected}
+        self.pause_button.setEnabled("downloading" in statuses)
+        self.resume_button.setEnabled(any(download.status in ("paused", "failed") or download.status == "cancelled"
+                                          and download.item is None for download in selected))
+        self.cancel_button.setEnabled(bool(statuses - {"completed", "cancelled"}))
 
-class TabBar(QTabWidget):
-    """Custom tab widget with improved styling"""
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setDocumentMode(True)
-        self.setTabsClosable(True)
-        self.setMovable(True)
-        self.setElideMode(Qt.ElideRight)
-        self.setStyleSheet("""
-            QTabWidget::pane {
-                border-top: 1px solid #e2e8f0;
-                background: white;
-            }
-            QTabWidget::tab-bar {
-                alignment: left;
-            }
-            QTabBar::tab {
-                background: #f8f9fa;
-                border: 1px solid #e2e8f0;
-                border-bottom: none;
-                border-top-left-radius: 6px;
-                border-top-right-radius: 6px;
-                padding: 10px 16px;
-                margin-right: 3px;
-                color: #64748b;
-                font-size: 13px;
-                min-width: 140px;
-                max-width: 220px;
-            }
-            QTabBar::tab:selected {
-                background: white;
-                border-bottom: none;
-                border-top: 2.5px solid #3b82f6;
-                color: #1e293b;
-                font-weight: 600;
-            }
-            QTabBar::tab:hover:!selected {
-                background: #f1f5f9;
-            }
-            QTabBar::close-button {
-                image: url(data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNjQ3NDhiIiBkPSJNMTkgNi40MUwxNy41OSA1IDEyIDEwLjU5IDYuNDEgNSA1IDYuNDEgMTAuNTkgMTIgNSAxNy41OSA2LjQxIDE5IDEyIDEzLjQxIDE3LjU5IDE5IDE5IDE3LjU5IDEzLjQxIDEyIDE5IDYuNDF6Ii8+PC9zdmc+);
-                width: 16px;
-                height: 16px;
-                subcontrol-position: right;
-                margin-right: 4px;
-            }
-            QTabBar::close-button:hover {
-                background: #e2e8f0;
-                border-radius: 8px;
-            }
-        """)
+class ControlError(Exception):
+    """A control call that cannot be carried out, with its JSON-RPC error code"""
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
 
-class NavigationToolBar(QToolBar):
-    """Custom navigation toolbar with better styling"""
-    def __init__(self, title, parent=None):
-        super().__init__(title, parent)
-        self.setIconSize(QSize(24, 24))
-        self.setMovable(False)
-        self.setContextMenuPolicy(Qt.NoContextMenu)
-        self.setStyleSheet("""
-            QToolBar {
-                background-color: #f8f9fa;
-                border-bottom: 1px solid #e2e8f0;
-                spacing: 10px;
-                padding: 8px 12px;
-            }
-            QToolButton {
-                background-color: transparent;
-                border: 1px solid transparent;
-                border-radius: 6px;
-                padding: 8px;
-            }
-            QToolButton:hover {
-                background-color: #f1f5f9;
-                border: 1px solid #e2e8f0;
-            }
-            QToolButton:pressed {
-                background-color: #e2e8f0;
-            }
-        """)
+class ControlCall:
+    """One control request being answered, now or once its result is ready"""
+    __slots__ = ("client", "id", "notification", "done", "_respond")
+    
+    def __init__(self, client, request_id, notification, respond):
+        self.client = client
+        self.id = request_id
+        self.notification = notification
+        self.done = False
+        self._respond = respond
+    
+    def reply(self, result=None):
+        self._finish({"jsonrpc": "2.0", "id": self.id, "result": result})
+    
+    def fail(self, error):
+        self._finish({"jsonrpc": "2.0", "id": self.id, "error": {"code": error.code, "message": str(error)}})
+    
+    def _finish(self, response):
+        # Only the first answer counts, so a timeout firing after the result is harmless
+        if self.done:
+            return
+        self.done = True
+        self._respond(None if self.notification else response)
 
-class ModernProgressBar(QProgressBar):
-    """A more modern progress bar"""
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setTextVisible(False)
-        self.setMaximumHeight(3)
-        self.setStyleSheet("""
-            QProgressBar {
-                border: none;
-                background-color: transparent;
-            }
-            QProgressBar::chunk {
-                background-color: #3b82f6;
-                border-radius: 1.5px;
-            }
-        """)
+class ControlServer(QObject):
+    """Lets scripts drive the browser over a local socket, for automated and regression testing.
+    
+    Clients send JSON-RPC 2.0 requests, one per line, to a Unix socket in the
+    data directory that only the user can connect to. A line holding an
+    array is a batch and is answered with one line once every call in it has
+    finished, so hundreds of tabs can be opened in a single round trip.
+    Calls that wait for a page to load or a script to run answer when the
+    result is ready, without holding up the event loop. After subscribe,
+    tab events are sent to the client as "event" notifications.
+    """
+    PARSE_ERROR = -32700
+    INVALID_REQUEST = -32600
+    METHOD_NOT_FOUND = -32601
+    INVALID_PARAMS = -32602
+    INTERNAL_ERROR = -32603
+    TAB_ERROR = -32000
+    TIMEOUT = -32001
+    EVENTS = ("tabOpened", "tabClosed", "loadStarted", "loadFinished", "urlChanged", "titleChanged")
+    # Longest wait a call can ask for, which is about as long as a Qt timer can run
+    MAX_TIMEOUT = 2 ** 31 // 1000
+    # What each parameter of the methods may be; anything else is refused before the method runs
+    PARAMS = {
+        "url": ("a string", lambda value: value is None or isinstance(value, str) and value.strip()),
+        "text": ("a string", lambda value: isinstance(value, str)),
+        "script": ("a string", lambda value: isinstance(value, str)),
+        "tab": ("a tab id", lambda value: value is None or type(value) is int),
+        "private": ("true or false", lambda value: isinstance(value, bool)),
+        "wait": ("true or false", lambda value: isinstance(value, bool)),
+        "timeout": (f"a number of seconds up to {MAX_TIMEOUT}",
+                    lambda value: value is None or (type(value) in (int, float)
+                                                    and 0 <= value <= ControlServer.MAX_TIMEOUT)),
+        "events": ("a list of event names",
+                   lambda value: value is None or isinstance(value, list)
+                   and all(isinstance(event, str) for event in value)),
+    }
+    
+    def __init__(self, browser, settings, path=CONTROL_SOCKET_PATH):
+        super().__init__(browser)
+        self.browser = browser
+        self.path = settings["socket"] or path
+        self.timeout = settings["timeout"]
+        # Read buffer and subscribed events of each connected socket
+        self._clients = {}
+        # Tabs are numbered for clients here, as private tabs have no session id
+        self._ids = {}
+        self._states = {}
+        self._next_id = 1
+        # Calls waiting for a tab's page to finish loading
+        self._load_waiters = {}
+        self._methods = {
+            "add_new_tab": self.add_new_tab,
+            "navigate_to_url": self.navigate_to_url,
+            "close_tab": self.close_tab,
+            "select_tab": self.select_tab,
+            "list_tabs": self.list_tabs,
+            "evaluate": self.evaluate,
+            "subscribe": self.subscribe,
+            "unsubscribe": self.unsubscribe,
+        }
+        
+        browser.tabOpened.connect(lambda state: self._event("tabOpened", state))
+        browser.tabClosed.connect(self._tab_closed)
+        browser.tabLoadStarted.connect(lambda state: self._event("loadStarted", state))
+        browser.tabLoadFinished.connect(self._load_finished)
+        browser.tabUrlChanged.connect(lambda state: self._event("urlChanged", state))
+        browser.tabTitleChanged.connect(lambda state: self._event("titleChanged", state))
+        
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self._accept)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # A socket file left behind by a browser that crashed would block listening
+        QLocalServer.removeServer(self.path)
+        if not self.server.listen(self.path):
+            browser.status_bar.showMessage(
+                f"Control socket {self.path} is unavailable: {self.server.errorString()}", 10000)
+    
+    def _accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._clients[socket] = {"buffer": b"", "events": set()}
+            socket.readyRead.connect(lambda socket=socket: self._read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._disconnected(socket))
+    
+    def _disconnected(self, socket):
+        self._clients.pop(socket, None)
+        socket.deleteLater()
+    
+    def _read(self, socket):
+        client = self._clients.get(socket)
+        if client is None:
+            return
+        client["buffer"] += bytes(socket.readAll())
+        *lines, client["buffer"] = client["buffer"].split(b"\n")
+        for line in lines:
+            if line.strip():
+                self._handle(socket, client, line)
+    
+    def _send(self, socket, message):
+        if socket in self._clients:
+            socket.write(json.dumps(message, default=str).encode("utf-8") + b"\n")
+    
+    def _handle(self, socket, client, line):
+        try:
+            message = json.loads(line)
+        except (ValueError, RecursionError):
+            self._send(socket, {"jsonrpc": "2.0", "id": None,
+                                "error": {"code": self.PARSE_ERROR, "message": "Parse error"}})
+            return
+        if not isinstance(message, list):
+            self._call(client, message, lambda response: response is not None and self._send(socket, response))
+            return
+        if not message:
+            self._send(socket, {"jsonrpc": "2.0", "id": None,
+                                "error": {"code": self.INVALID_REQUEST, "message": "Empty batch"}})
+            return
+        
+        # A batch is answered in one line, in request order, once its last call is done
+        responses = [None] * len(message)
+        remaining = [len(message)]
+        
+        def respond(position, response):
+            responses[position] = response
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                answered = [response for response in responses if response is not None]
+                if answered:
+                    self._send(socket, answered)
+        
+        for position, request in enumerate(message):
+            self._call(client, request, lambda response, position=position: respond(position, response))
+    
+    def _call(self, client, request, respond):
+        """Run one request; respond gets its response, or None for a notification, exactly once"""
+        if (not isinstance(request, dict) or request.get("jsonrpc") != "2.0"
+                or not isinstance(request.get("method"), str)):
+            respond({"jsonrpc": "2.0", "id": None,
+                     "error": {"code": self.INVALID_REQUEST, "message": "Invalid request"}})
+            return
+        call = ControlCall(client, request.get("id"), "id" not in request, respond)
+        try:
+            handler = self._methods.get(request["method"])
+            if handler is None:
+                raise ControlError(self.METHOD_NOT_FOUND, f"Unknown method {request['method']}")
+            params = request.get("params", {})
+            try:
+                if isinstance(params, list):
+                    arguments = inspect.signature(handler).bind(call, *params)
+                elif isinstance(params, dict):
+                    arguments = inspect.signature(handler).bind(call, **params)
+                else:
+                    raise TypeError("params must be an array or an object")
+            except TypeError as e:
+                raise ControlError(self.INVALID_PARAMS, str(e))
+            for name, value in arguments.arguments.items():
+                if name in self.PARAMS and not self.PARAMS[name][1](value):
+                    raise ControlError(self.INVALID_PARAMS, f"{name} must be {self.PARAMS[name][0]}")
+            handler(*arguments.args, **arguments.kwargs)
+        except ControlError as error:
+            call.fail(error)
+        except Exception as e:
+            # An exception escaping a Qt slot would abort the browser, so it goes back to the client
+            call.fail(ControlError(self.INTERNAL_ERROR, f"{type(e).__name__}: {e}"))
+    
+    def _expire(self, call, timeout, state=None):
+        """Fail the call once timeout passes, and stop it waiting for state's page to load"""
+        timeout = self.timeout if timeout is None else timeout
+        QTimer.singleShot(int(timeout * 1000), lambda: self._timed_out(call, state))
+    
+    def _timed_out(self, call, state):
+        waiters = self._load_waiters.get(state, [])
+        if call in waiters:
+            waiters.remove(call)
+            if not waiters:
+                del self._load_waiters[state]
+        call.fail(ControlError(self.TIMEOUT, "Timed out"))
+    
+    def tab_id(self, state):
+        tab_id = self._ids.get(state)
+        if tab_id is None:
+            tab_id = self._ids[state] = self._next_id
+            self._states[tab_id] = state
+            self._next_id += 1
+        return tab_id
+    
+    def tab_state(self, tab_id):
+        """The open tab with this id, or the current tab for None"""
+        state = self.browser.current_state() if tab_id is None else self._states.get(tab_id)
+        if state is None or not self.browser.is_open(state):
+            raise ControlError(self.TAB_ERROR, f"No tab {tab_id}")
+        return state
+    
+    def tab_info(self, state):
+        view = state.view
+        return {"tab": self.tab_id(state), "index": self.browser.index_of(state), "url": state.url,
+                "title": state.title, "loading": state.loading, "private": state.private,
+                "pinned": state.pinned, "current": state is self.browser.current_state(),
+                "discarded": view is not None and self.browser.hibernator.is_discarded(view)}
+    
+    def _wait_for_load(self, call, state, timeout):
+        self._load_waiters.setdefault(state, []).append(call)
+        self._expire(call, timeout, state)
+    
+    def add_new_tab(self, call, url=None, private=False, wait=False, timeout=None):
+        """Open a tab and make it current; with wait, answer once its page has loaded"""
+        if private and not self.browser.config["profile"]["private_tabs"]:
+            raise ControlError(self.TAB_ERROR, "Private tabs are turned off")
+        view = self.browser.add_new_tab(url, private=private)
+        state = self.browser.state_for_view(view)
+        if wait:
+            self._wait_for_load(call, state, timeout)
+        else:
+            call.reply(self.tab_info(state))
+    
+    def navigate_to_url(self, call, text, tab=None, wait=False, timeout=None):
+        """Open an address, or search for text, as if typed into the URL bar of the tab"""
+        state = self.tab_state(tab)
+        url = self.browser.navigate_to_url(text, state)
+        if url is None:
+            raise ControlError(self.INVALID_PARAMS, "Nothing to open")
+        if wait:
+            self._wait_for_load(call, state, timeout)
+        else:
+            call.reply(dict(self.tab_info(state), url=url))
+    
+    def close_tab(self, call, tab=None):
+        """Close a tab; closing the last one closes the browser, as it does for the user"""
+        state = self.tab_state(tab)
+        tab_id = self.tab_id(state)
+        call.reply({"tab": tab_id, "closed": True})
+        self.browser.close_tab(self.browser.index_of(state))
+    
+    def select_tab(self, call, tab):
+        state = self.tab_state(tab)
+        self.browser.tabs.setCurrentIndex(self.browser.index_of(state))
+        call.reply(self.tab_info(state))
+    
+    def list_tabs(self, call):
+        call.reply([self.tab_info(self.browser.state_at(index)) for index in range(self.browser.tabs.count())])
+    
+    def evaluate(self, call, script, tab=None, timeout=None):
+        """Run JavaScript in a tab's page and answer with its result"""
+        state = self.tab_state(tab)
+        view = state.view
+        if view is None or self.browser.hibernator.is_discarded(view):
+            raise ControlError(self.TAB_ERROR, f"Tab {self.tab_id(state)} has no running page")
+        # A frozen page runs no scripts until it is woken
+        self.browser.hibernator.wake(view)
+        view.page().runJavaScript(script, call.reply)
+        self._expire(call, timeout)
+    
+    def subscribe(self, call, events=None):
+        """Send these tab events, or all of them, to the client as they happen"""
+        events = set(self.EVENTS if events is None else events)
+        unknown = events.difference(self.EVENTS)
+        if unknown:
+            raise ControlError(self.INVALID_PARAMS, f"Unknown events: {', '.join(sorted(unknown))}")
+        call.client["events"] |= events
+        call.reply(sorted(call.client["events"]))
+    
+    def unsubscribe(self, call, events=None):
+        call.client["events"] -= set(self.EVENTS if events is None else events)
+        call.reply(sorted(call.client["events"]))
+    
+    def _event(self, name, state, **fields):
+        sockets = [socket for socket, client in self._clients.items() if name in client["events"]]
+        if not sockets:
+            return
+        params = {"type": name, "tab": self.tab_id(state), "url": state.url, "title": state.title,
+                  "time": time.time(), **fields}
+        for socket in sockets:
+            self._send(socket, {"jsonrpc": "2.0", "method": "event", "params": params})
+    
+    def _load_finished(self, state, ok):
+        self._event("loadFinished", state, ok=ok)
+        waiters = self._load_waiters.pop(state, [])
+        if waiters:
+            info = dict(self.tab_info(state), ok=ok)
+            for call in waiters:
+                call.reply(info)
+    
+    def _tab_closed(self, state):
+        self._event("tabClosed", state)
+        for call in self._load_waiters.pop(state, []):
+            call.fail(ControlError(self.TAB_ERROR, f"Tab {self.tab_id(state)} was closed"))
+        tab_id = self._ids.pop(state, None)
+        self._states.pop(tab_id, None)
+    
+    def close(self):
+        # Answers still buffered, such as to the call that closed the last tab, go out first
+        for socket in list(self._clients):
+            socket.flush()
+        self.server.close()
 
-class ActionButton(QAction):
-    """Custom action button with better styling"""
-    def __init__(self, text, parent=None):
-        super().__init__(text, parent)
-        font = QFont()
-        font.setPointSize(13)
-        self.setFont(font)
+class TabState:
+    """What the browser tracks for one tab, so lookups never walk the widget tree"""
+    __slots__ = ("tab", "view", "id", "url", "title", "private", "pinned", "loading", "progress",
+                 "indicator", "index", "created", "last_active", "last_loaded", "live_page")
+    
+    def __init__(self, tab, url, title="", tab_id=None, private=False, pinned=False):
+        self.tab = tab
+        # Placeholder tabs have no web view until they are first shown
+        self.view = None
+        self.id = tab_id
+        self.url = url
+        self.title = title
+        self.private = private
+        self.pinned = pinned
+        self.loading = False
+        self.progress = 0
+        # Icon the tab bar currently shows for this tab
+        self.indicator = None
+        # Where the tab was last seen in the tab bar; checked before it is trusted
+        self.index = -1
+        self.created = time.time()
+        self.last_active = None
+        self.last_loaded = None
+        # Live page loading behind a snapshot, swapped in once it is ready
+        self.live_page = None
 
 class Browser(QMainWindow):
-    def __init__(self):
+    # Emitted once the window has been painted, and once its first tabs are open
+    firstPainted = pyqtSignal()
+    startupFinished = pyqtSignal()
+    # Emitted with a tab's TabState as it changes, for the control server
+    tabOpened = pyqtSignal(object)
+    tabClosed = pyqtSignal(object)
+    tabLoadStarted = pyqtSignal(object)
+    tabLoadFinished = pyqtSignal(object, bool)
+    tabUrlChanged = pyqtSignal(object)
+    tabTitleChanged = pyqtSignal(object)
+    
+    def __init__(self, config=None, urls=None):
         super().__init__()
         
         global BROWSER_ICON
         
-        # Set application style
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #ffffff;
-            }
-            QStatusBar {
-                background-color: #f8f9fa;
-                color: #64748b;
-                border-top: 1px solid #e2e8f0;
-                font-size: 12px;
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: #f1f5f9;
-                width: 10px;
-                margin: 0px;
-                border-radius: 5px;
-            }
-            QScrollBar::handle:vertical {
-                background: #cbd5e1;
-                min-height: 20px;
-                border-radius: 5px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background: #94a3b8;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar:horizontal {
-                border: none;
-                background: #f1f5f9;
-                height: 10px;
-                margin: 0px;
-                border-radius: 5px;
-            }
-            QScrollBar::handle:horizontal {
-                background: #cbd5e1;
-                min-width: 20px;
-                border-radius: 5px;
-            }
-            QScrollBar::handle:horizontal:hover {
-                background: #94a3b8;
-            }
-            QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
-                width: 0px;
-            }
-            QMenuBar {
-                background-color: #f8f9fa;
-                color: #1e293b;
-                border-bottom: 1px solid #e2e8f0;
-            }
-            QMenuBar::item {
-                background: transparent;
-                padding: 8px 12px;
-            }
-            QMenuBar::item:selected {
-                background: #e2e8f0;
-                border-radius: 4px;
-            }
-            QMenu {
-                background-color: #ffffff;
-                border: 1px solid #e2e8f0;
-                border-radius: 6px;
-                padding: 4px;
-            }
-            QMenu::item {
-                padding: 8px 30px 8px 15px;
-                border-radius: 4px;
-            }
-            QMenu::item:selected {
-                background-color: #f1f5f9;
-                color: #1e293b;
-            }
-            QMenu::separator {
-                height: 1px;
-                background-color: #e2e8f0;
-                margin: 6px 10px;
-            }
-        """)
+        self.config = config or load_config()
+        
+        # Style the whole application from the configured theme
+        self.theme = ThemeEngine(QApplication.instance(), self.config["appearance"]["theme"])
         
         # Set window attributes
         self.setWindowTitle(f"{BROWSER_NAME} - Developed by ILYAS DOUGHMI")
@@ -262,12 +4924,33 @@ class Browser(QMainWindow):
         new_tab_action.triggered.connect(lambda: self.add_new_tab())
         file_menu.addAction(new_tab_action)
         
+        # New private tab action
+        if self.config["profile"]["private_tabs"]:
+            private_tab_action = QAction("New Private Tab", self)
+            private_tab_action.setShortcut("Ctrl+Shift+N")
+            private_tab_action.triggered.connect(lambda: self.add_new_tab(private=True))
+            file_menu.addAction(private_tab_action)
+        
         # Close tab action
         close_tab_action = QAction("Close Tab", self)
         close_tab_action.setShortcut("Ctrl+W")
         close_tab_action.triggered.connect(lambda: self.close_tab(self.tabs.currentIndex()))
         file_menu.addAction(close_tab_action)
         
+        # Tab overview action
+        overview_action = QAction("Tab Overview", self)
+        overview_action.setShortcut("Ctrl+Shift+A")
+        overview_action.triggered.connect(self.show_tab_overview)
+        file_menu.addAction(overview_action)
+        
+        file_menu.addSeparator()
+        
+        # Downloads panel action
+        downloads_action = QAction("Downloads", self)
+        downloads_action.setShortcut("Ctrl+J")
+        downloads_action.triggered.connect(self.show_downloads)
+        file_menu.addAction(downloads_action)
+        
         file_menu.addSeparator()
         
         # Exit action
@@ -276,6 +4959,42 @@ class Browser(QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        # View menu
+        view_menu = menu_bar.addMenu("&View")
+        
+        # Dark theme action
+        self.dark_theme_action = QAction("Dark Theme", self)
+        self.dark_theme_action.setCheckable(True)
+        self.dark_theme_action.setChecked(self.theme.name == "dark")
+        self.dark_theme_action.setShortcut("Ctrl+Shift+L")
+        self.dark_theme_action.toggled.connect(lambda dark: self.theme.apply("dark" if dark else "light"))
+        self.theme.themeChanged.connect(self.theme_changed)
+        view_menu.addAction(self.dark_theme_action)
+        
+        # History menu
+        history_menu = menu_bar.addMenu("Hi&story")
+        
+        # Search page text action
+        search_pages_action = QAction("Search Visited Pages", self)
+        search_pages_action.setShortcut("Ctrl+Shift+F")
+        search_pages_action.triggered.connect(self.show_page_search)
+        history_menu.addAction(search_pages_action)
+        
+        # Developer menu
+        developer_menu = menu_bar.addMenu("&Developer")
+        
+        # Load performance panel action
+        load_metrics_action = QAction("Load Performance", self)
+        load_metrics_action.setShortcut("F12")
+        load_metrics_action.triggered.connect(self.show_load_metrics)
+        developer_menu.addAction(load_metrics_action)
+        
+        # Tab process and memory panel action
+        processes_action = QAction("Processes and Memory", self)
+        processes_action.setShortcut("Shift+F12")
+        processes_action.triggered.connect(self.show_processes)
+        developer_menu.addAction(processes_action)
+        
         # Help menu
         help_menu = menu_bar.addMenu("&Help")
         
@@ -287,36 +5006,74 @@ class Browser(QMainWindow):
         # Create modern tab widget
         self.tabs = TabBar()
         self.tabs.tabCloseRequested.connect(self.close_tab)
+        # Connected first so placeholder tabs get their view before anything else looks
+        self.tabs.currentChanged.connect(self.tab_changed)
+        self.tabs.tabBar().tabMoved.connect(self.tab_moved)
+        self.tabs.tabBar().setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tabs.tabBar().customContextMenuRequested.connect(self.show_tab_menu)
+        
+        # Every tab's state, looked up by its container widget or by its web view
+        self._tab_states = {}
+        self._view_states = {}
+        self._current_state = None
+        
+        # Loading indicators on the tabs are updated in batches, since every icon
+        # change lays the tab bar out again; a quick load never shows one at all
+        self._indicator_changes = set()
+        self._indicator_timer = QTimer(self)
+        self._indicator_timer.setSingleShot(True)
+        self._indicator_timer.setInterval(250)
+        self._indicator_timer.timeout.connect(self.update_tab_indicators)
+        
+        # Tab changes are journaled under a stable id per tab
+        self.session = SessionJournal(self.config["session"], self)
+        self._next_tab_id = max((tab["id"] for tab in self.session.state.tabs), default=-1) + 1
+        
+        # Idle tabs are frozen and discarded to save memory
+        self.hibernator = TabHibernator(self, self.config["hibernation"])
+        self.hibernator.discarded.connect(self.tab_discarded)
+        
+        # Background tabs are also discarded when the browser runs short of memory
+        self.memory_monitor = MemoryMonitor(self, self.config["memory"])
+        self._process_dialog = None
+        
+        # Profiles start QtWebEngine, so they are only created once the window is up
+        self.profiles = None
+        
+        # Downloads are fetched in parallel segments instead of by Chromium
+        self.downloads = DownloadManager(self.config["downloads"], self)
+        self.downloads.added.connect(lambda _: self.show_downloads())
+        self._downloads_dialog = None
+        
+        # Filter ad and tracker requests for every tab
+        self.content_blocker = ContentBlocker(self.config["content_blocker"], self)
+        
+        # Tells addresses typed in the URL bar from searches; its suffix list also tells the blocker
+        # which requests are third-party
+        self.classifier = UrlClassifier(self.config["search"], self)
+        self.classifier.suffixesLoaded.connect(self.content_blocker.set_public_suffixes)
         
         # Create navigation toolbar
         navbar = NavigationToolBar("Navigation")
         self.addToolBar(navbar)
         
-        # Create navigation action buttons with proper icons using SVG data
-        back_icon = QIcon(QPixmap.fromImage(QImage.fromData(QByteArray.fromBase64(
-            b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMjAgMTFINy44M2w1LjU5LTUuNTlMMTIgNGwtOCA4IDggOCAxLjQxLTEuNDFMNy44MyAxM0gyMHYtMnoiLz48L3N2Zz4='))))
-        back_btn = QAction(back_icon, "Back", self)
+        # Create navigation action buttons with proper icons
+        back_btn = QAction(self.theme.icon("back"), "Back", self)
         back_btn.setToolTip("Back")
-        back_btn.triggered.connect(lambda: self.current_browser().back())
+        back_btn.triggered.connect(self.go_back)
         navbar.addAction(back_btn)
         
-        forward_icon = QIcon(QPixmap.fromImage(QImage.fromData(QByteArray.fromBase64(
-            b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMTIgNGwtMS40MSAxLjQxTDE2LjE3IDExSDR2MmgxMi4xN2wtNS41OCA1LjU5TDEyIDIwbDgtOHoiLz48L3N2Zz4='))))
-        forward_btn = QAction(forward_icon, "Forward", self)
+        forward_btn = QAction(self.theme.icon("forward"), "Forward", self)
         forward_btn.setToolTip("Forward")
-        forward_btn.triggered.connect(lambda: self.current_browser().forward())
+        forward_btn.triggered.connect(self.go_forward)
         navbar.addAction(forward_btn)
         
-        reload_icon = QIcon(QPixmap.fromImage(QImage.fromData(QByteArray.fromBase64(
-            b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMTcuNjUgNi4zNUMxNi4yIDQuOSAxNC4yMSA0IDEyIDRjLTQuNDIgMC03Ljk5IDMuNTgtNy45OSA4czMuNTcgOCA3Ljk5IDhjMy43MyAwIDYuODQtMi41NSA3LjczLTZoLTIuMDhjLS44MiAyLjMzLTMuMDQgNC01LjY1IDQtMy4zMSAwLTYtMi42OS02LTZzMi42OS02IDYtNmMxLjY2IDAgMy4xNC42OSA0LjIyIDEuNzhMMTMgMTFoN1Y0bC0yLjM1IDIuMzV6Ii8+PC9zdmc+'))))
-        reload_btn = QAction(reload_icon, "Reload", self)
+        reload_btn = QAction(self.theme.icon("reload"), "Reload", self)
         reload_btn.setToolTip("Reload")
-        reload_btn.triggered.connect(lambda: self.current_browser().reload())
+        reload_btn.triggered.connect(self.reload_page)
         navbar.addAction(reload_btn)
         
-        home_icon = QIcon(QPixmap.fromImage(QImage.fromData(QByteArray.fromBase64(
-            b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMTAgMjB2LTZoNHY2aDV2LThoM0wxMiAzIDIgMTJoM3Y4eiIvPjwvc3ZnPg=='))))
-        home_btn = QAction(home_icon, "Home", self)
+        home_btn = QAction(self.theme.icon("home"), "Home", self)
         home_btn.setToolTip("Home")
         home_btn.triggered.connect(self.go_home)
         navbar.addAction(home_btn)
@@ -330,11 +5087,32 @@ class Browser(QMainWindow):
         self.url_bar = UrlBar()
         self.url_bar.returnPressed.connect(self.navigate_to_url)
         
-        # Add URL completer for better UX
-        self.url_model = QStandardItemModel()
+        # Suggest pages from history as the user types
+        self.history = HistoryStore(self.config["history"], self)
+        self.history.suggestionsReady.connect(self.show_suggestions)
+        
+        # Likely URL bar targets are connected to, or loaded, while the user types
+        self.predictor = NavigationPredictor(self, self.config["predictor"])
+        self.history.suggestionsReady.connect(self.predictor.suggested)
+        
+        self.page_index = PageIndex(self.config["page_index"], self)
+        
+        # Saved copies of marked and often visited pages, for instant and offline reopening
+        self.snapshots = SnapshotStore(self.config["snapshots"], self)
+        
+        # Page thumbnails for the tab overview, and the most visited sites for new tabs
+        self.thumbnails = ThumbnailCache(self, self.config["thumbnails"])
+        self.new_tab_page = NewTabPage(self, self.config["new_tab"])
+        
+        # Every page load is timed for the developer panel
+        self.load_metrics = LoadMetrics(self, self.config["load_metrics"])
+        self._load_metrics_dialog = None
+        self.url_model = QStringListModel()
         self.url_completer = QCompleter(self.url_model, self)
-        self.url_completer.setCompletionMode(QCompleter.InlineCompletion)
+        self.url_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.url_completer.activated[str].connect(lambda _: self.navigate_to_url())
         self.url_bar.setCompleter(self.url_completer)
+        self.url_bar.textEdited.connect(self.history.suggest)
         
         navbar.addWidget(self.url_bar)
         
@@ -343,13 +5121,15 @@ class Browser(QMainWindow):
         spacer2.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
         navbar.addWidget(spacer2)
         
-        newtab_icon = QIcon(QPixmap.fromImage(QImage.fromData(QByteArray.fromBase64(
-            b'PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48cGF0aCBmaWxsPSIjNTA1MDUwIiBkPSJNMTkgMTNoLTZ2NmgtMnYtNkg1di0yaDZWNWgydjZoNnYyeiIvPjwvc3ZnPg=='))))
-        newtab_btn = QAction(newtab_icon, "New Tab", self)
+        newtab_btn = QAction(self.theme.icon("newtab"), "New Tab", self)
         newtab_btn.setToolTip("New Tab")
-        newtab_btn.triggered.connect(self.add_new_tab)
+        newtab_btn.triggered.connect(lambda: self.add_new_tab())
         navbar.addAction(newtab_btn)
         
+        # Toolbar icons are drawn in the theme's colour
+        self._themed_icons = {back_btn: "back", forward_btn: "forward", reload_btn: "reload",
+                              home_btn: "home", newtab_btn: "newtab"}
+        
         # Modern progress bar
         self.progress_bar = ModernProgressBar()
         
@@ -363,100 +5143,579 @@ class Browser(QMainWindow):
         self.status_bar.setFixedHeight(24)
         self.setStatusBar(self.status_bar)
         
-        # Create first tab
-        self.add_new_tab()
+        # How many background tabs are frozen and the CPU time that has saved
+        self.freeze_status = QLabel()
+        self.freeze_status.setProperty("muted", True)
+        self.freeze_status.setContentsMargins(0, 0, 8, 0)
+        self.status_bar.addPermanentWidget(self.freeze_status)
+        self.hibernator.statsChanged.connect(self.update_freeze_status)
+        
+        # Scripts can drive the browser over a local socket when it is turned on
+        self.control = ControlServer(self, self.config["control"]) if self.config["control"]["enabled"] else None
+        
+        # Tabs are opened after the first paint so the window shows up without
+        # waiting for QtWebEngine; the timer covers windows that never get painted
+        self._startup_urls = urls or []
+        self._started = False
+        self.installEventFilter(self)
+        QTimer.singleShot(1000, self.finish_startup)
         
         self.show()
     
-    def add_new_tab(self, url=None):
+    def eventFilter(self, obj, event):
+        if obj is self and event.type() == QEvent.Paint and not self._started:
+            self.removeEventFilter(self)
+            self.firstPainted.emit()
+            QTimer.singleShot(0, self.finish_startup)
+        return super().eventFilter(obj, event)
+    
+    def finish_startup(self):
+        if self._started:
+            return
+        self._started = True
+        self.start_web_engine()
+        
+        # Reopen the last session, or start with a single home tab
+        restored = self.config["session"]["restore"] and self.restore_session()
+        for url in self._startup_urls:
+            self.add_new_tab(url)
+        if not (restored or self._startup_urls):
+            self.add_new_tab()
+        self.startupFinished.emit()
+    
+    def start_web_engine(self):
+        if self.profiles is not None:
+            return
+        
+        # Every tab shares one persistent profile; private tabs get an off-the-record one
+        self.profiles = ProfileManager(self.config["profile"], self)
+        self.profiles.add_url_request_interceptor(self.content_blocker)
+        self.profiles.add_url_request_interceptor(self.downloads.post_tracker)
+        self.profiles.set_download_handler(self.downloads.download_requested)
+        self.profiles.set_profile_watcher(self.downloads.watch_profile)
+        if self.snapshots.enabled:
+            self.profiles.profile.downloadRequested.connect(self.snapshots.download_requested)
+        self.profiles.install_url_scheme_handler(APP_SCHEME, self.new_tab_page)
+    
+    def add_new_tab(self, url=None, private=False):
         if url is None:
-            url = QUrl("https://ilyas-doughmi.vercel.app/")
+            url = QUrl(NEW_TAB_URL if self.config["new_tab"]["page"] else HOME_URL)
         elif isinstance(url, str):
-            if not url.startswith(("http://", "https://")):
-                url = "https://" + url
-            url = QUrl(url)
+            # Open addresses and search for anything else, as the URL bar does
+            url = QUrl(self.classifier.classify(url)[0])
+        
+        state = TabState(self.create_tab_container(), url.toString(), private=private)
+        self._tab_states[state.tab] = state
+        browser = self.create_web_view(state, url)
+        
+        # Add tab with loading title; private tabs are left out of the session
+        index = self.tabs.addTab(state.tab, "Loading...")
+        state.index = index
+        if private:
+            self.tabs.setTabToolTip(index, "Private tab")
+        else:
+            self.register_tab(state, index)
+        self.tabs.setCurrentIndex(index)
+        self.tabOpened.emit(state)
+        
+        # Set focus to the web view, or to the URL bar on the new tab page
+        if url.toString() == NEW_TAB_URL:
+            self.url_bar.setFocus()
+        else:
+            browser.setFocus()
+        
+        return browser
+    
+    def add_placeholder_tab(self, url, title=None, tab_id=None, pinned=False):
+        """Add a tab that only creates its web view once it is first selected"""
+        state = TabState(self.create_tab_container(), url, title or "", pinned=pinned)
+        self._tab_states[state.tab] = state
         
+        index = self.tabs.addTab(state.tab, title or url)
+        state.index = index
+        self.tabs.setTabToolTip(index, url)
+        if pinned:
+            self.queue_tab_indicator(state)
+        self.register_tab(state, index, tab_id)
+        self.tabOpened.emit(state)
+        return index
+    
+    def register_tab(self, state, index, tab_id=None):
+        # Tabs restored from the session are already in the journal under their id
+        if tab_id is None:
+            tab_id = self._next_tab_id
+            self.session.record("open", tab_id, after=self.journaled_tab_before(index), url=state.url,
+                                title=state.title)
+        state.id = tab_id
+        self._next_tab_id = max(self._next_tab_id, tab_id + 1)
+    
+    def create_tab_container(self):
         # Create container widget with zero margins
         tab = QWidget()
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
         tab.setLayout(layout)
-        
-        # Create browser
+        return tab
+    
+    def create_web_view(self, state, url):
+        # Create browser on the shared profile, or the off-the-record one for private tabs
+        self.start_web_engine()
         browser = QWebEngineView()
+        profile = self.profiles.private_profile() if state.private else self.profiles.profile
+        browser.setPage(QWebEnginePage(profile, browser))
+        state.view = browser
+        self._view_states[browser] = state
         
         # Set page zoom factor for better readability
         browser.setZoomFactor(1.0)
         
-        browser.setUrl(url)
-        layout.addWidget(browser)
+        self.load_url(state, url)
+        state.loading = True
+        state.tab.layout().addWidget(browser)
         
-        # Add tab with loading title
-        index = self.tabs.addTab(tab, "Loading...")
-        self.tabs.setCurrentIndex(index)
+        # Connect signals; each updates its own tab, whether or not it is the current one
+        browser.urlChanged.connect(lambda qurl, state=state: self.update_url(qurl, state))
+        browser.titleChanged.connect(lambda _, state=state: self.update_title(state))
+        browser.loadStarted.connect(lambda state=state: self.load_started(state))
+        browser.loadProgress.connect(lambda progress, state=state: self.update_progress(progress, state))
+        browser.loadFinished.connect(lambda ok, state=state: self.load_finished(state, ok))
+        browser.loadFinished.connect(lambda ok, browser=browser: self.record_history(browser, ok))
+        browser.loadFinished.connect(lambda ok, browser=browser: self.record_page_text(browser, ok))
+        browser.loadFinished.connect(lambda ok, browser=browser: self.record_snapshot(browser, ok))
+        self.hibernator.track(browser)
+        self.load_metrics.track(browser)
+        
+        return browser
+    
+    def tab_changed(self, index):
+        state = self.state_at(index)
+        if state is None:
+            return
+        self._current_state = state
+        state.last_active = time.monotonic()
+        
+        # Build the web view of a restored tab the first time it is shown
+        if state.view is None:
+            self.create_web_view(state, QUrl(state.url))
+        self.journal_tab(state, "select")
         
-        # Connect signals
-        browser.urlChanged.connect(lambda qurl, browser=browser: self.update_url(qurl, browser))
-        browser.loadProgress.connect(self.update_progress)
-        browser.loadFinished.connect(lambda _, browser=browser: self.update_title(browser))
+        self.show_url(state)
+        self.show_title(state)
+        self.show_progress(state)
+        if self.thumbnails.needs_capture(state.url):
+            self.thumbnails.schedule_capture()
+    
+    def restore_session(self):
+        session = self.session.load()
+        if session is None:
+            return False
         
-        # Set focus to the web view
-        browser.setFocus()
+        # Keep the first placeholder from being built when it becomes current
+        self.tabs.blockSignals(True)
+        for tab in session["tabs"]:
+            self.add_placeholder_tab(tab["url"], tab.get("title"), tab["id"], tab.get("pinned", False))
+        self.tabs.blockSignals(False)
         
-        return browser
+        current = session["current"]
+        if self.tabs.currentIndex() == current:
+            self.tabs.currentChanged.emit(current)
+        else:
+            self.tabs.setCurrentIndex(current)
+        return True
+    
+    def journal_tab(self, state, op, **fields):
+        if state is not None and state.id is not None:
+            self.session.record(op, state.id, **fields)
+    
+    def journaled_tab_before(self, index):
+        """Id of the nearest tab in front of index that is in the journal, or None.
+        
+        Tabs are placed by their neighbour rather than their index, since
+        private tabs in between are left out of the journal.
+        """
+        for before in range(index - 1, -1, -1):
+            state = self.state_at(before)
+            if state is not None and state.id is not None:
+                return state.id
+        return None
+    
+    def tab_moved(self, from_index, to_index):
+        self.journal_tab(self.state_at(to_index), "move", after=self.journaled_tab_before(to_index))
+    
+    def show_tab_menu(self, position):
+        state = self.state_at(self.tabs.tabBar().tabAt(position))
+        if state is None:
+            return
+        menu = QMenu(self)
+        pin_action = menu.addAction("Unpin Tab" if state.pinned else "Pin Tab")
+        pin_action.triggered.connect(lambda: self.toggle_pin(state))
+        if (self.snapshots.enabled and state.view is not None and not state.private
+                and state.url.startswith(("http://", "https://"))):
+            offline_action = menu.addAction("Keep Offline Copy")
+            offline_action.setCheckable(True)
+            offline_action.setChecked(self.snapshots.is_marked(state.url))
+            offline_action.toggled.connect(lambda marked: self.snapshots.mark(state.view, marked))
+        close_action = menu.addAction("Close Tab")
+        close_action.triggered.connect(lambda: self.close_tab(self.index_of(state)))
+        menu.exec_(self.tabs.tabBar().mapToGlobal(position))
+    
+    def toggle_pin(self, state):
+        state.pinned = not state.pinned
+        self.journal_tab(state, "pin", pinned=state.pinned)
+        self.queue_tab_indicator(state)
+        
+        # Pinned tabs are kept together at the start of the tab bar
+        pinned = sum(1 for other in self._tab_states.values() if other.pinned and other is not state)
+        index = self.index_of(state)
+        if index != pinned:
+            self.tabs.tabBar().moveTab(index, pinned)
+        
+        # Pinned tabs are never frozen; an unpinned background tab can be again
+        if not state.pinned and state.view is not None and state is not self._current_state:
+            self.hibernator.schedule_freeze(state.view)
+    
+    def is_pinned(self, browser):
+        state = self._view_states.get(browser)
+        return state is not None and state.pinned
+    
+    def update_freeze_status(self):
+        frozen = self.hibernator.frozen_count()
+        saved = self.hibernator.total_cpu_saved()
+        self.freeze_status.setText(f"{frozen} tabs frozen · {saved:.1f} s CPU saved"
+                                   if frozen or saved else "")
+    
+    def closeEvent(self, event):
+        self.session.close()
+        self.history.close()
+        self.page_index.close()
+        self.snapshots.close()
+        self.predictor.close()
+        self.thumbnails.close()
+        self.load_metrics.close()
+        self.memory_monitor.close()
+        self.downloads.close()
+        self.content_blocker.close()
+        self.classifier.close()
+        if self.control is not None:
+            self.control.close()
+        super().closeEvent(event)
+    
+    def state_at(self, index):
+        state = self._tab_states.get(self.tabs.widget(index))
+        if state is not None:
+            state.index = index
+        return state
+    
+    def index_of(self, state):
+        """Return the tab's position, rescanning the tab bar only after tabs have moved"""
+        if self.tabs.widget(state.index) is not state.tab:
+            for index in range(self.tabs.count()):
+                self._tab_states[self.tabs.widget(index)].index = index
+        return state.index
+    
+    def states(self):
+        """Every open tab's state, in no particular order"""
+        return list(self._tab_states.values())
+    
+    def state_for_view(self, view):
+        return self._view_states.get(view)
+    
+    def current_state(self):
+        return self._current_state
+    
+    def is_open(self, state):
+        return self._tab_states.get(state.tab) is state
     
     def current_browser(self):
-        return self.tabs.currentWidget().layout().itemAt(0).widget()
+        return self.browser_at(self.tabs.currentIndex())
+    
+    def browser_at(self, index):
+        state = self.state_at(index)
+        return state.view if state is not None else None
     
     def close_tab(self, index):
         if self.tabs.count() > 1:
+            state = self.state_at(index)
+            self.journal_tab(state, "close")
+            del self._tab_states[state.tab]
+            if state.view is not None:
+                del self._view_states[state.view]
+                self.hibernator.untrack(state.view)
+                self.load_metrics.untrack(state.view)
+            if self._current_state is state:
+                self._current_state = None
+            self._indicator_changes.discard(state)
             self.tabs.removeTab(index)
+            self.tabClosed.emit(state)
+            # Free the web view and its renderer instead of leaking it
+            state.tab.deleteLater()
         else:
             self.close()
     
-    def navigate_to_url(self):
-        url = self.url_bar.text()
+    def navigate_to_url(self, text=None, state=None):
+        """Open text typed into the URL bar, or given by a script, in the current or given tab.
+        
+        Returns the URL opened, or None when there was nothing to open.
+        """
+        typed = text is None
+        text = (self.url_bar.text() if typed else text).strip()
+        state = state or self._current_state
+        if state is None or not text:
+            return None
         
-        # If it's a search term, send to Google
-        if " " in url or not "." in url:
-            url = f"https://www.google.com/search?q={url}"
-        # Otherwise ensure it has http/https
-        elif not url.startswith(("http://", "https://")):
-            url = "https://" + url
+        # Open addresses and search for anything else; the history suggestions
+        # shown for typed text tell which single-word names are hosts
+        url, _ = self.classifier.classify(text, self.url_model.stringList() if typed else ())
+        if state.view is None:
+            # A restored tab that has not been shown yet
+            self.create_web_view(state, QUrl(url))
+            return url
         
-        qurl = QUrl(url)
-        self.current_browser().setUrl(qurl)
+        # Use the page the predictor has already loaded, if that is where the user went
+        prerendered = self.predictor.navigated(QUrl(url).toString()) if typed and not state.private else None
+        if prerendered is not None:
+            self.adopt_page(state, *prerendered)
+        else:
+            self.load_url(state, QUrl(url))
+        return url
+    
+    def load_url(self, state, url):
+        """Load a page, showing its snapshot first when the settings ask for that"""
+        if state.live_page is not None:
+            state.live_page.deleteLater()
+            state.live_page = None
+        if not (self.snapshots.serve_first and not state.private
+                and self.snapshots.lookup(url.toString())):
+            state.view.setUrl(url)
+            return
+        state.view.setUrl(self.snapshots.open(url.toString()))
         
-        # Add to URL model for auto-completion
-        self.url_model.insertRow(0)
-        self.url_model.setData(self.url_model.index(0, 0), url)
+        # The live page loads out of sight and replaces the snapshot once it is ready
+        page = QWebEnginePage(state.view.page().profile(), state.view)
+        page.loadFinished.connect(lambda ok: self.live_page_loaded(state, page, url.toString(), ok))
+        page.setUrl(url)
+        state.live_page = page
     
-    def update_url(self, url, browser=None):
-        if browser == self.current_browser():
-            self.url_bar.setText(url.toString())
-            self.url_bar.setCursorPosition(0)
+    def live_page_loaded(self, state, page, url, ok):
+        if state.live_page is not page:
+            return
+        state.live_page = None
+        # Keep the snapshot when offline, or when the user has already moved on
+        if not ok or self.snapshots.original_url(state.view.url()) != url:
+            page.deleteLater()
+            if not ok and state is self._current_state:
+                self.status_bar.showMessage("Could not load the page; showing the saved copy", 5000)
+            return
+        self.adopt_page(state, page)
     
-    def update_title(self, browser=None):
-        if browser == self.current_browser():
-            title = browser.page().title()
-            if title:
-                self.tabs.setTabText(self.tabs.currentIndex(), title)
-                self.setWindowTitle(f"{title} - {BROWSER_NAME}")
-            else:
-                self.tabs.setTabText(self.tabs.currentIndex(), "New Tab")
-                self.setWindowTitle(f"{BROWSER_NAME} - Developed by ILYAS DOUGHMI")
+    def adopt_page(self, state, page, loaded=True):
+        """Show a page that was loaded out of sight in place of the tab's own"""
+        if state.live_page is not None:
+            state.live_page.deleteLater()
+            state.live_page = None
+        old_page = state.view.page()
+        page.setParent(state.view)
+        state.view.setPage(page)
+        old_page.deleteLater()
+        self.update_url(page.url() if not page.url().isEmpty() else page.requestedUrl(), state)
+        if not loaded:
+            # The view reports the rest of the load itself
+            self.load_started(state)
+            self.update_title(state)
+            return
+        
+        # The swapped in page finished loading before it was shown, so record it now
+        self.load_finished(state, True)
+        self.record_history(state.view, True)
+        self.record_page_text(state.view, True)
+        self.record_snapshot(state.view, True)
+    
+    def show_suggestions(self, text, results):
+        # Drop answers for text the user has already typed past
+        if text != self.url_bar.text() or not self.url_bar.hasFocus():
+            return
+        self.url_model.setStringList([url for url, _ in results])
+        if results:
+            self.url_completer.complete()
+        else:
+            self.url_completer.popup().hide()
+    
+    def record_history(self, browser, ok):
+        url = browser.url()
+        if (ok and url.scheme() in ("http", "https", "file") and not self.is_private(browser)
+                and self.snapshots.original_url(url) is None):
+            self.history.add_visit(url.toString(), browser.title())
+    
+    def record_page_text(self, browser, ok):
+        if (ok and self.page_index.enabled and browser.url().scheme() in ("http", "https")
+                and not self.is_private(browser)):
+            self.page_index.index_page(browser)
+    
+    def record_snapshot(self, browser, ok):
+        if (ok and self.snapshots.enabled and browser.url().scheme() in ("http", "https")
+                and not self.is_private(browser)):
+            self.snapshots.page_loaded(browser)
+    
+    def is_private(self, browser):
+        return browser.page().profile().isOffTheRecord()
+    
+    def show_page_search(self):
+        PageSearchDialog(self).exec_()
+    
+    def show_load_metrics(self):
+        # One panel is kept around so it can stay open while browsing
+        if self._load_metrics_dialog is None:
+            self._load_metrics_dialog = LoadMetricsDialog(self)
+        self._load_metrics_dialog.show()
+        self._load_metrics_dialog.raise_()
+    
+    def show_downloads(self):
+        if self._downloads_dialog is None:
+            self._downloads_dialog = DownloadsDialog(self)
+        self._downloads_dialog.show()
+        self._downloads_dialog.raise_()
+    
+    def theme_changed(self, name):
+        self.dark_theme_action.setChecked(name == "dark")
+        for action, icon in self._themed_icons.items():
+            action.setIcon(self.theme.icon(icon))
+        # New tab pages are rendered in the theme's colours; discarded tabs pick them up when woken
+        for state in self._tab_states.values():
+            if (state.view is not None and state.url == NEW_TAB_URL
+                    and not self.hibernator.is_discarded(state.view)):
+                state.view.reload()
+    
+    def show_tab_overview(self):
+        overview = TabOverviewDialog(self)
+        overview.show()
+        overview.raise_()
+        return overview
     
-    def update_progress(self, progress):
-        self.progress_bar.setValue(progress)
-        if progress == 100:
+    def show_processes(self):
+        if self._process_dialog is None:
+            self._process_dialog = ProcessDialog(self)
+        self._process_dialog.show()
+        self._process_dialog.raise_()
+    
+    def tab_id_of(self, browser):
+        state = self._view_states.get(browser)
+        return state.id if state is not None else None
+    
+    def update_url(self, url, state):
+        # A tab showing a snapshot keeps the address of the page it was saved from
+        snapshot_url = self.snapshots.original_url(url)
+        if snapshot_url is not None and state is self._current_state:
+            saved = time.localtime(self.snapshots.lookup(snapshot_url)["saved"])
+            self.status_bar.showMessage(f"Showing the copy saved {time.strftime('%Y-%m-%d %H:%M', saved)}", 5000)
+        state.url = snapshot_url or url.toString()
+        self.journal_tab(state, "url", url=state.url)
+        self.tabUrlChanged.emit(state)
+        if state is self._current_state:
+            self.show_url(state)
+    
+    def show_url(self, state):
+        # The new tab page leaves the URL bar empty to type into
+        self.url_bar.setText(state.url if state.url != NEW_TAB_URL else "")
+        self.url_bar.setCursorPosition(0)
+    
+    def update_title(self, state):
+        title = state.view.page().title()
+        if title != state.title:
+            state.title = title
+            self.journal_tab(state, "title", title=title)
+            self.tabTitleChanged.emit(state)
+        # Setting a tab's text relays out the whole tab bar, so skip it when nothing changed
+        index = self.index_of(state)
+        if self.tabs.tabText(index) != (title or "New Tab"):
+            self.tabs.setTabText(index, title or "New Tab")
+        if state is self._current_state:
+            self.show_title(state)
+    
+    def show_title(self, state):
+        if state.title:
+            self.setWindowTitle(f"{state.title} - {BROWSER_NAME}")
+        else:
+            self.setWindowTitle(f"{BROWSER_NAME} - Developed by ILYAS DOUGHMI")
+    
+    def load_started(self, state):
+        state.loading = True
+        state.progress = 0
+        self.queue_tab_indicator(state)
+        self.tabLoadStarted.emit(state)
+    
+    def load_finished(self, state, ok):
+        # Fall back to the snapshot of a page that could not be loaded
+        if (not ok and self.snapshots.offline_fallback and not state.private
+                and self.snapshots.lookup(state.url) and state.view.url().toString() == state.url):
+            state.view.setUrl(self.snapshots.open(state.url))
+            return
+        state.loading = False
+        state.progress = 100
+        state.last_loaded = time.time()
+        self.update_title(state)
+        self.queue_tab_indicator(state)
+        self.tabLoadFinished.emit(state, ok)
+        if state is self._current_state:
+            self.show_progress(state)
+            if ok:
+                self.thumbnails.schedule_capture()
+    
+    def tab_discarded(self, view):
+        # A discarded page stops loading without reporting loadFinished
+        state = self._view_states.get(view)
+        if state is not None and state.loading:
+            state.loading = False
+            self.queue_tab_indicator(state)
+    
+    def update_progress(self, progress, state):
+        # Only the current tab drives the progress bar; other tabs just remember theirs
+        state.progress = progress
+        if state is self._current_state:
+            self.show_progress(state)
+    
+    def show_progress(self, state):
+        if state.loading and state.progress < 100:
+            if self.progress_bar.value() != state.progress:
+                self.progress_bar.setValue(state.progress)
+            if self.progress_bar.isHidden():
+                self.progress_bar.show()
+        elif not self.progress_bar.isHidden():
             # Hide progress bar when loading complete
             self.progress_bar.hide()
-        else:
-            self.progress_bar.show()
+    
+    def queue_tab_indicator(self, state):
+        self._indicator_changes.add(state)
+        if not self._indicator_timer.isActive():
+            self._indicator_timer.start()
+    
+    def update_tab_indicators(self):
+        changes, self._indicator_changes = self._indicator_changes, set()
+        for state in changes:
+            icon = "loading" if state.loading else "pin" if state.pinned else None
+            if icon != state.indicator:
+                state.indicator = icon
+                self.tabs.setTabIcon(self.index_of(state), load_icon(icon) if icon else QIcon())
+    
+    def go_back(self):
+        view = self.current_browser()
+        if view is not None:
+            view.back()
+    
+    def go_forward(self):
+        view = self.current_browser()
+        if view is not None:
+            view.forward()
+    
+    def reload_page(self):
+        view = self.current_browser()
+        if view is not None:
+            view.reload()
     
     def go_home(self):
-        self.current_browser().setUrl(QUrl("https://ilyas-doughmi.vercel.app/"))
+        view = self.current_browser()
+        if view is not None:
+            view.setUrl(QUrl(HOME_URL))
     
     def show_about(self):
         global BROWSER_ICON
@@ -507,17 +5766,475 @@ class Browser(QMainWindow):
         about_dialog.exec_()
 
 
+def benchmark_content_blocker(urls_path, list_paths, suffix_paths=PUBLIC_SUFFIX_PATHS):
+    """Replay recorded request URLs through the filter matcher and report timings.
+    
+    Each line of urls_path holds a request URL, optionally followed by the
+    first-party URL and the EasyList resource type, separated by whitespace.
+    """
+    import tempfile
+    
+    requests = []
+    with open(urls_path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if fields:
+                requests.append((fields[0], fields[1] if len(fields) > 1 else "",
+                                 fields[2] if len(fields) > 2 else "other"))
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_path = os.path.join(temp_dir, "filters.cache")
+        start = time.perf_counter()
+        load_filter_matcher(list_paths, cache_path)
+        compile_time = time.perf_counter() - start
+        start = time.perf_counter()
+        matcher = load_filter_matcher(list_paths, cache_path)
+        cache_time = time.perf_counter() - start
+        matcher.set_public_suffixes(load_public_suffixes(suffix_paths, os.path.join(temp_dir, "suffixes.cache")))
+    
+    # A first pass compiles the lazily built patterns, like a warmed up browser
+    for url, first_party, resource_type in requests:
+        matcher.should_block(url, first_party, resource_type)
+    
+    timings = []
+    blocked = 0
+    for url, first_party, resource_type in requests:
+        start = time.perf_counter_ns()
+        if matcher.should_block(url, first_party, resource_type):
+            blocked += 1
+        timings.append(time.perf_counter_ns() - start)
+    timings.sort()
+    
+    def percentile(fraction):
+        return timings[min(int(len(timings) * fraction), len(timings) - 1)] / 1000 if timings else 0
+    
+    print(f"Filter lists:     {len(list_paths)} ({matcher.rule_count} rules)")
+    print(f"Compile + cache:  {compile_time * 1000:.1f} ms")
+    print(f"Load from cache:  {cache_time * 1000:.1f} ms")
+    print(f"Requests:         {len(requests)} ({blocked} blocked)")
+    if timings:
+        print(f"Match time:       mean {sum(timings) / len(timings) / 1000:.2f} us, "
+              f"p50 {percentile(0.5):.2f} us, p99 {percentile(0.99):.2f} us, "
+              f"max {timings[-1] / 1000:.2f} us")
+    return 0
+
+def benchmark_url_classifier(inputs_path, settings):
+    """Classify typed URL bar inputs and report accuracy and timings.
+    
+    Each line of inputs_path holds the expected URL, or "search", the typed
+    text and optionally a page from history, separated by tabs; lines
+    starting with # are comments. The result is compared with that of the
+    rule the URL bar used before, which searched for any text with a space
+    or without a dot.
+    """
+    import tempfile
+    
+    inputs = []
+    with open(inputs_path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 2 and not fields[0].startswith("#"):
+                inputs.append((fields[0], fields[1], fields[2:3]))
+    
+    paths = [path for path in public_suffix_paths(settings) if os.path.exists(path)][:1]
+    classifier = UrlClassifier(settings, load=False)
+    compile_time = cache_time = 0
+    if paths:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "public_suffixes.cache")
+            start = time.perf_counter()
+            load_public_suffixes(paths, cache_path)
+            compile_time = time.perf_counter() - start
+            start = time.perf_counter()
+            classifier.suffixes = load_public_suffixes(paths, cache_path)
+            cache_time = time.perf_counter() - start
+    
+    def correct(expected, url, is_search):
+        return is_search if expected == "search" else url == expected
+    
+    def previous_rule(text):
+        if " " in text or "." not in text:
+            return text, True
+        return text if text.startswith(("http://", "https://")) else "https://" + text, False
+    
+    mistakes = []
+    previous_correct = 0
+    for expected, text, history_urls in inputs:
+        url, is_search = classifier.classify(text, history_urls)
+        if not correct(expected, url, is_search):
+            mistakes.append((text, expected, "search" if is_search else url))
+        if correct(expected, *previous_rule(text)):
+            previous_correct += 1
+    
+    timings = []
+    for expected, text, history_urls in inputs:
+        start = time.perf_counter_ns()
+        classifier.classify(text, history_urls)
+        timings.append(time.perf_counter_ns() - start)
+    timings.sort()
+    
+    def percentile(fraction):
+        return timings[min(int(len(timings) * fraction), len(timings) - 1)] / 1000 if timings else 0
+    
+    if paths:
+        print(f"Suffix list:      {paths[0]} ({classifier.suffixes.rule_count} rules)")
+        print(f"Compile + cache:  {compile_time * 1000:.1f} ms")
+        print(f"Load from cache:  {cache_time * 1000:.1f} ms")
+    else:
+        print("Suffix list:      none found, using Qt's")
+    print(f"Inputs:           {len(inputs)}")
+    if inputs:
+        print(f"Correct:          {len(inputs) - len(mistakes)} ({(len(inputs) - len(mistakes)) / len(inputs):.1%}), "
+              f"previous rule {previous_correct} ({previous_correct / len(inputs):.1%})")
+    for text, expected, got in mistakes:
+        print(f"  {text!r}: expected {expected}, got {got}")
+    if timings:
+        print(f"Classify time:    mean {sum(timings) / len(timings) / 1000:.2f} us, "
+              f"p50 {percentile(0.5):.2f} us, p99 {percentile(0.99):.2f} us, "
+              f"max {timings[-1] / 1000:.2f} us")
+    return 0
+
+def benchmark_startup(runs, url):
+    """Launch the browser repeatedly on the offscreen platform and report startup times.
+    
+    Each run starts a fresh interpreter with an empty data directory, so the
+    times include imports and QtWebEngine start-up as a user would see them.
+    """
+    import subprocess
+    import tempfile
+    
+    first_paint = []
+    interactive = []
+    for run in range(runs):
+        with tempfile.TemporaryDirectory() as home:
+            env = dict(os.environ, HOME=home, QT_QPA_PLATFORM="offscreen")
+            start = time.time()
+            try:
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), "--startup-probe", url],
+                                        env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        text=True, timeout=120).stdout
+            except subprocess.TimeoutExpired:
+                print(f"Run {run + 1}: timed out")
+                continue
+        
+        times = {}
+        for line in output.splitlines():
+            try:
+                times.update(json.loads(line))
+            except (ValueError, TypeError):
+                pass
+        if "first_paint" not in times or "interactive" not in times:
+            print(f"Run {run + 1}: browser exited before finishing startup")
+            continue
+        first_paint.append((times["first_paint"] - start) * 1000)
+        interactive.append((times["interactive"] - start) * 1000)
+        print(f"Run {run + 1}: first paint {first_paint[-1]:.0f} ms, interactive {interactive[-1]:.0f} ms"
+              f"{'' if times.get('ok', True) else ' (page failed to load)'}")
+    
+    if not first_paint:
+        return 1
+    print(f"Time to first paint:  median {statistics.median(first_paint):.0f} ms, "
+          f"min {min(first_paint):.0f} ms, max {max(first_paint):.0f} ms")
+    print(f"Time to interactive:  median {statistics.median(interactive):.0f} ms, "
+          f"min {min(interactive):.0f} ms, max {max(interactive):.0f} ms")
+    return 0
+
+def run_batch(app, urls_path, output_path=None, pool_size=4, timeout=30):
+    """Load every URL in urls_path without a window, writing one JSON result per line"""
+    with open(urls_path, "r", encoding="utf-8") as f:
+        urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    
+    output = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    loader = BatchLoader(urls, load_config(), pool_size, timeout)
+    failed = 0
+    
+    def write_result(result):
+        nonlocal failed
+        if not result["ok"]:
+            failed += 1
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+    
+    loader.resultReady.connect(write_result)
+    loader.finished.connect(app.quit)
+    start = time.perf_counter()
+    QTimer.singleShot(0, loader.start)
+    if urls:
+        app.exec_()
+    elapsed = time.perf_counter() - start
+    loader.close()
+    if output is not sys.stdout:
+        output.close()
+    
+    print(f"Loaded {len(urls)} URLs ({failed} failed) in {elapsed:.1f} s, "
+          f"{len(urls) / elapsed if elapsed else 0:.1f} pages/s with {pool_size} pages", file=sys.stderr)
+    return 1 if failed else 0
+
+def run_downloads(app, urls, directory=None):
+    """Download URLs without a window, printing one JSON result per file.
+    
+    URLs with an unfinished download in the download list resume it.
+    """
+    settings = dict(load_config()["downloads"])
+    if directory:
+        settings["directory"] = directory
+    manager = DownloadManager(settings)
+    start = time.perf_counter()
+    downloads = []
+    resumed_bytes = 0
+    for url in urls:
+        download = next((download for download in manager.downloads
+                         if download.url == url and download.status in ("paused", "failed")
+                         and os.path.dirname(download.path) == manager.directory), None)
+        if download is not None:
+            manager.start(download)
+            # Counted after starting, which throws away a partial file that has gone missing
+            resumed_bytes += download.received
+        else:
+            download = manager.add(url)
+        downloads.append(download)
+    
+    def check_finished():
+        if any(download.status in ("downloading", "verifying") or download.running
+               for download in downloads):
+            return
+        elapsed = time.perf_counter() - start
+        for download in downloads:
+            print(json.dumps({"url": download.url, "path": download.path, "status": download.status,
+                              "size": download.size, "parts": len(download.segments),
+                              "sha256": download.digest, "verified": bool(download.expected)
+                              and download.status == "completed", "error": download.error}), flush=True)
+        total = sum(download.received for download in downloads) - resumed_bytes
+        print(f"Downloaded {total / 1048576:.1f} MB in {elapsed:.1f} s, "
+              f"{total / 1048576 / elapsed if elapsed else 0:.1f} MB/s", file=sys.stderr)
+        app.quit()
+    
+    # Ctrl+C stops the downloads where they are, to be resumed next time
+    import signal
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    manager.changed.connect(check_finished)
+    app.exec_()
+    manager.close()
+    return 0 if all(download.status == "completed" for download in downloads) else 1
+
+def report_startup(browser):
+    """Print when the window is painted and its first page has loaded, then quit"""
+    def report(**fields):
+        print(json.dumps(fields), flush=True)
+    
+    def first_tab_opened():
+        view = browser.current_browser()
+        view.loadFinished.connect(lambda ok: (report(interactive=time.time(), ok=ok),
+                                              QApplication.quit()))
+    
+    browser.firstPainted.connect(lambda: report(first_paint=time.time()))
+    browser.startupFinished.connect(first_tab_opened)
+
+def benchmark_tabs(count):
+    """Open, switch between and close many tabs in a child browser and report the timings.
+    
+    The child runs on the offscreen platform with an empty data directory. Its
+    pages come from a local HTTP server in this process, which would otherwise
+    be starved by the child's event loop.
+    """
+    import http.server
+    import subprocess
+    import tempfile
+    
+    class PageHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = f"<html><head><title>Page {self.path}</title></head><body>{self.path}</body></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            self.wfile.write(body.encode())
+        
+        def log_message(self, *args):
+            pass
+    
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as home:
+            env = dict(os.environ, HOME=home, QT_QPA_PLATFORM="offscreen")
+            return subprocess.run([sys.executable, os.path.abspath(__file__), "--tabs-probe", str(count),
+                                   "--bench-url", f"http://127.0.0.1:{server.server_port}"],
+                                  env=env, stderr=subprocess.DEVNULL).returncode
+    finally:
+        server.shutdown()
+
+def run_tab_benchmark(app, count, base_url):
+    """The child side of --bench-tabs"""
+    import random
+    
+    config = load_config()
+    config["session"]["restore"] = False
+    browser = Browser(config, [f"{base_url}/0"])
+    timings = {}
+    rng = random.Random(0)
+    
+    def timed(name, action):
+        start = time.perf_counter()
+        result = action()
+        timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        return result
+    
+    def open_overview():
+        overview = browser.show_tab_overview()
+        overview.repaint()
+        return overview
+    
+    # Each step yields back to the event loop; QtWebEngine does not load pages
+    # from an event loop nested inside a slot
+    def steps():
+        for i in range(1, count + 1):
+            timed("open", lambda i=i: browser.add_new_tab(f"{base_url}/{i}"))
+            yield
+        
+        # Give the pages time to load, then check every live tab got its own title;
+        # tabs over the hibernation limit may be discarded before they finish
+        live = [state for state in browser.states()
+                if not browser.hibernator.is_discarded(state.view)]
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline and any(state.loading for state in live):
+            yield
+        titled = sum(browser.tabs.tabText(browser.index_of(state)) == f"Page /{browser.index_of(state)}"
+                     for state in live)
+        memory = browser.memory_monitor.sample()
+        
+        for _ in range(min(count * 2, 1000)):
+            timed("switch", lambda: browser.tabs.setCurrentIndex(rng.randrange(browser.tabs.count())))
+            yield
+        for state in browser.states():
+            if state.view is not None:
+                timed("title", lambda state=state: browser.update_title(state))
+        
+        # The overview must leave discarded tabs asleep; the first opening finds no
+        # thumbnails in memory and the later ones find what was read from disk
+        asleep = [state for state in browser.states()
+                  if state.view is not None and browser.hibernator.is_discarded(state.view)]
+        for _ in range(5):
+            timed("overview", open_overview).close()
+            yield
+        woken = sum(not browser.hibernator.is_discarded(state.view) for state in asleep)
+        
+        # A theme switch restyles each widget once and repaints the window once
+        def switch_theme(name):
+            browser.theme.apply(name)
+            browser.repaint()
+        
+        for name in ("dark", "light") * 2:
+            timed("theme", lambda name=name: switch_theme(name))
+            yield
+        while browser.tabs.count() > 1:
+            timed("close", lambda: browser.close_tab(rng.randrange(browser.tabs.count())))
+            yield
+        
+        print(f"Tabs:          {count + 1} ({titled} of {len(live)} live tabs titled from their own page)")
+        if memory is not None:
+            print(f"Memory:        {memory['total_mb']:.0f} MB in total, {memory['renderers_mb']:.0f} MB in "
+                  f"{memory['renderers']} renderers for {memory['live_tabs']} live tabs")
+        print(f"Hibernated:    {len(asleep)} discarded tabs, {woken} woken by the overview")
+        for name in ("open", "switch", "title", "overview", "theme", "close"):
+            values = sorted(timings.get(name, []))
+            if values:
+                print(f"{name.capitalize() + ':':<14} mean {sum(values) / len(values):.3f} ms, "
+                      f"p99 {values[min(int(len(values) * 0.99), len(values) - 1)]:.3f} ms, "
+                      f"max {values[-1]:.3f} ms ({len(values)} ops)")
+    
+    run = steps()
+    timer = QTimer()
+    timer.setInterval(1)
+    
+    def step():
+        if next(run, StopIteration) is StopIteration:
+            timer.stop()
+            browser.close()
+            app.quit()
+    
+    timer.timeout.connect(step)
+    browser.startupFinished.connect(timer.start)
+    app.exec_()
+    return 0
+
+def parse_args(argv):
+    """Split NexaWave's own options from the ones meant for Qt"""
+    parser = argparse.ArgumentParser(prog="browser.py", description=f"{BROWSER_NAME} web browser")
+    parser.add_argument("--bench-blocker", metavar="URLS",
+                        help="replay the request URLs in this file through the content blocker and exit")
+    parser.add_argument("--filter-list", action="append", default=[], metavar="PATH",
+                        help="filter list used by --bench-blocker (default: the configured lists)")
+    parser.add_argument("--bench-classifier", metavar="INPUTS",
+                        help="classify the typed URL bar inputs in this file, e.g. url_inputs.tsv, and exit")
+    parser.add_argument("--bench-startup", type=int, metavar="RUNS",
+                        help="launch the browser this many times offscreen, report startup times and exit")
+    parser.add_argument("--bench-url", default=HOME_URL, metavar="URL",
+                        help="page loaded by --bench-startup (default: the home page)")
+    parser.add_argument("--startup-probe", metavar="URL", help=argparse.SUPPRESS)
+    parser.add_argument("--bench-tabs", type=int, metavar="COUNT",
+                        help="open, switch between and close this many tabs offscreen, report timings and exit")
+    parser.add_argument("--tabs-probe", type=int, metavar="COUNT", help=argparse.SUPPRESS)
+    parser.add_argument("--control", action="store_true",
+                        help="accept automation commands on the control socket (see control.socket)")
+    parser.add_argument("--batch", metavar="URLS",
+                        help="load the URLs in this file without a window, print JSON results and exit")
+    parser.add_argument("--batch-output", metavar="PATH",
+                        help="file the --batch results are written to (default: standard output)")
+    parser.add_argument("--batch-pool", type=int, default=4, metavar="N",
+                        help="pages loading at the same time in --batch mode (default: 4)")
+    parser.add_argument("--batch-timeout", type=float, default=30, metavar="SECONDS",
+                        help="time allowed for each page in --batch mode (default: 30)")
+    parser.add_argument("--download", action="append", default=[], metavar="URL",
+                        help="download this URL without a window, resuming an earlier attempt, and exit")
+    parser.add_argument("--download-dir", metavar="PATH",
+                        help="directory --download saves to (default: the configured one)")
+    return parser.parse_known_args(argv[1:])
+
+
 if __name__ == "__main__":
+    args, qt_args = parse_args(sys.argv)
+    if args.bench_blocker:
+        list_paths = args.filter_list or filter_list_paths(load_config()["content_blocker"])
+        sys.exit(benchmark_content_blocker(args.bench_blocker, list_paths,
+                                           public_suffix_paths(load_config()["search"])))
+    if args.bench_classifier:
+        sys.exit(benchmark_url_classifier(args.bench_classifier, load_config()["search"]))
+    if args.bench_startup:
+        sys.exit(benchmark_startup(args.bench_startup, args.bench_url))
+    if args.bench_tabs:
+        sys.exit(benchmark_tabs(args.bench_tabs))
+    
+    # Batch and download modes never open a window, so they do not need a display
+    if args.batch or args.download:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    
+    # The browser's own pages need their URL scheme declared before QApplication exists
+    register_url_schemes()
+    
     # Set application-wide attributes for high DPI screens before creating QApplication
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
     
-    app = QApplication(sys.argv)
+    # QtWebEngine reads Chromium switches for the process model from the application's
+    # arguments, unless QTWEBENGINE_CHROMIUM_FLAGS is set, which then replaces them
+    config = load_config()
+    chromium_flags = chromium_arguments(config["processes"])
+    if chromium_flags and "QTWEBENGINE_CHROMIUM_FLAGS" in os.environ:
+        os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] += " " + " ".join(chromium_flags)
+        chromium_flags = []
+    app = QApplication(sys.argv[:1] + qt_args + chromium_flags)
     app.setApplicationName(BROWSER_NAME)
     app.setApplicationVersion(BROWSER_VERSION)
     app.setOrganizationName("ILYAS DOUGHMI")
     app.setOrganizationDomain("ilyas-doughmi.vercel.app")
     
+    if args.tabs_probe:
+        sys.exit(run_tab_benchmark(app, args.tabs_probe, args.bench_url))
+    if args.batch:
+        sys.exit(run_batch(app, args.batch, args.batch_output, args.batch_pool, args.batch_timeout))
+    if args.download:
+        sys.exit(run_downloads(app, args.download, args.download_dir))
+    
     # Now create the browser icon after QApplication is initialized
     if os.path.exists(LOGO_PATH):
         BROWSER_ICON = QIcon(LOGO_PATH)
@@ -533,19 +6250,13 @@ if __name__ == "__main__":
             icon_pixmap.save("favicon.ico")
             BROWSER_ICON = QIcon("favicon.ico")
     
-    # Set application palette for a cohesive look
-    palette = QPalette()
-    palette.setColor(QPalette.Window, QColor(255, 255, 255))
-    palette.setColor(QPalette.WindowText, QColor(30, 41, 59))  # Dark slate blue
-    palette.setColor(QPalette.Base, QColor(255, 255, 255))
-    palette.setColor(QPalette.AlternateBase, QColor(248, 250, 252))
-    palette.setColor(QPalette.Text, QColor(30, 41, 59))
-    palette.setColor(QPalette.Button, QColor(248, 250, 252))
-    palette.setColor(QPalette.ButtonText, QColor(30, 41, 59))
-    palette.setColor(QPalette.Link, QColor(59, 130, 246))  # Bright blue
-    palette.setColor(QPalette.Highlight, QColor(59, 130, 246))
-    palette.setColor(QPalette.HighlightedText, QColor(255, 255, 255))
-    app.setPalette(palette)
-    
-    browser = Browser()
+    if args.control:
+        config["control"]["enabled"] = True
+    if args.startup_probe:
+        # A single timed launch for --bench-startup, left out of the user's session
+        config["session"]["restore"] = False
+        browser = Browser(config, [args.startup_probe])
+        report_startup(browser)
+    else:
+        browser = Browser(config)
     sys.exit(app.exec_()) 
\ No newline at end of file
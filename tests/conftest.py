@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+# The tests need no display; QtWebEngine is imported with the browser but never started
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+
+@pytest.fixture(scope="session")
+def app():
+    return QApplication.instance() or QApplication([])
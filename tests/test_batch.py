@@ -0,0 +1,115 @@
+import http.server
+import threading
+import time
+
+import pytest
+from PyQt5.QtCore import QObject, QTimer, QUrl, pyqtSignal
+
+from browser import DEFAULT_CONFIG, BatchLoader
+
+
+class StatusHandler(http.server.BaseHTTPRequestHandler):
+    """Answers /missing with 404, redirects /moved to /ok, and anything else with 200"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/missing":
+            self.send_response(404)
+        elif self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/ok")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StatusHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+class FakePage(QObject):
+    """Stands in for a web page; it finishes loading shortly after, except for /hang"""
+    loadFinished = pyqtSignal(bool)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self._url = QUrl()
+        self.loads = 0
+
+    def setUrl(self, url):
+        self._url = url
+        self.loads += 1
+        if url.path() != "/hang":
+            QTimer.singleShot(20, lambda: self.loadFinished.emit(url.path() != "/missing"))
+
+    def url(self):
+        return self._url
+
+    def title(self):
+        return self._url.path()
+
+    def triggerAction(self, action):
+        pass
+
+
+class FakePageLoader(BatchLoader):
+    created = 0
+
+    def _create_page(self):
+        page = FakePage(self)
+        page.loadFinished.connect(lambda ok, page=page: self._load_finished(page, ok))
+        self._pages.append(page)
+        self.created += 1
+        return page
+
+
+def run(app, loader, timeout=10):
+    results = []
+    finished = []
+    loader.resultReady.connect(results.append)
+    loader.finished.connect(lambda: finished.append(True))
+    loader.start()
+    deadline = time.monotonic() + timeout
+    while not finished:
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents()
+        time.sleep(0.005)
+    loader.close()
+    return sorted(results, key=lambda result: result["index"])
+
+
+@pytest.fixture
+def config():
+    return dict(DEFAULT_CONFIG, content_blocker=dict(DEFAULT_CONFIG["content_blocker"], enabled=False))
+
+
+def test_every_url_is_loaded_through_a_bounded_pool(app, server, config):
+    paths = ["/ok", "/missing", "/moved", "/a", "/b", "/c", "/d"]
+    loader = FakePageLoader([server + path for path in paths], config, pool_size=2, timeout=10)
+    results = run(app, loader)
+    assert loader.created == 2
+    assert [result["url"] for result in results] == [server + path for path in paths]
+    assert [result["status"] for result in results] == [200, 404, 200, 200, 200, 200, 200]
+    assert [result["ok"] for result in results] == [True, False, True, True, True, True, True]
+    assert results[3]["title"] == "/a"
+    assert all(result["load_ms"] >= 0 for result in results)
+
+
+def test_a_page_that_never_loads_times_out_and_is_replaced(app, server, config):
+    loader = FakePageLoader([server + "/hang", server + "/ok"], config, pool_size=1, timeout=0.2)
+    results = run(app, loader)
+    assert results[0]["ok"] is False and results[0]["error"] == "timeout" and results[0]["load_ms"] is None
+    assert results[1]["ok"] is True and results[1]["status"] == 200
+    assert loader.created == 2
+
+
+def test_an_empty_list_finishes_at_once(app, config):
+    assert run(app, FakePageLoader([], config)) == []
@@ -0,0 +1,160 @@
+import json
+import time
+
+import pytest
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtWidgets import QStatusBar
+
+from browser import ControlServer, TabState
+
+
+class FakeBrowser(QObject):
+    """Just enough of Browser for the control server to dispatch calls"""
+    tabOpened = pyqtSignal(object)
+    tabClosed = pyqtSignal(object)
+    tabLoadStarted = pyqtSignal(object)
+    tabLoadFinished = pyqtSignal(object, bool)
+    tabUrlChanged = pyqtSignal(object)
+    tabTitleChanged = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.status_bar = QStatusBar()
+        self.config = {"profile": {"private_tabs": True}}
+        self.navigated = []
+        self.state = TabState(object(), "https://example.com/", "Example")
+
+    def navigate_to_url(self, text, state):
+        if text == "crash":
+            raise RuntimeError("boom")
+        self.navigated.append(text)
+        return "https://" + text
+
+    def current_state(self):
+        return self.state
+
+    def is_open(self, state):
+        return state is self.state
+
+    def index_of(self, state):
+        return 0
+
+
+class RecordingServer(ControlServer):
+    def __init__(self, *args, **kwargs):
+        self.sent = []
+        super().__init__(*args, **kwargs)
+
+    def _send(self, socket, message):
+        self.sent.append(message)
+
+
+@pytest.fixture
+def server(app, tmp_path):
+    browser = FakeBrowser()
+    return RecordingServer(browser, {"socket": str(tmp_path / "control.sock"), "timeout": 30})
+
+
+def call(server, request):
+    """The responses to one line sent by a client"""
+    client = {"buffer": b"", "events": set()}
+    server._handle(None, client, json.dumps(request).encode("utf-8"))
+    responses, server.sent = server.sent, []
+    return responses
+
+
+def error_code(response):
+    return response["error"]["code"]
+
+
+@pytest.mark.parametrize("method, params", [
+    ("subscribe", {"events": 5}),
+    ("subscribe", {"events": [1, 2]}),
+    ("unsubscribe", {"events": "loadFinished"}),
+    ("add_new_tab", {"url": 5}),
+    ("add_new_tab", {"url": ""}),
+    ("add_new_tab", {"private": "yes"}),
+    ("navigate_to_url", {"text": ["example.com"]}),
+    ("navigate_to_url", {"text": "example.com", "wait": True, "timeout": "x"}),
+    ("navigate_to_url", {"text": "example.com", "timeout": -1}),
+    ("navigate_to_url", {"text": "example.com", "timeout": 1e12}),
+    ("evaluate", {"script": "1 + 1", "timeout": "x"}),
+    ("evaluate", {"script": None}),
+    ("select_tab", {"tab": "1"}),
+    ("select_tab", {"tab": True}),
+    ("close_tab", [1.5]),
+])
+def test_wrong_param_types_are_invalid_params(server, method, params):
+    [response] = call(server, {"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+    assert response["id"] == 1
+    assert error_code(response) == ControlServer.INVALID_PARAMS
+    assert server.browser.navigated == []
+
+
+@pytest.mark.parametrize("request_", [
+    5,
+    "list_tabs",
+    {"id": 1, "method": "list_tabs"},
+    {"jsonrpc": "2.0", "id": 1, "method": 5},
+])
+def test_malformed_requests_are_invalid_requests(server, request_):
+    [response] = call(server, request_)
+    assert error_code(response) == ControlServer.INVALID_REQUEST
+
+
+def test_unknown_methods_and_missing_params(server):
+    [unknown] = call(server, {"jsonrpc": "2.0", "id": 1, "method": "shutdown"})
+    assert error_code(unknown) == ControlServer.METHOD_NOT_FOUND
+    [missing] = call(server, {"jsonrpc": "2.0", "id": 2, "method": "navigate_to_url", "params": {}})
+    assert error_code(missing) == ControlServer.INVALID_PARAMS
+    [extra] = call(server, {"jsonrpc": "2.0", "id": 3, "method": "list_tabs", "params": {"all": True}})
+    assert error_code(extra) == ControlServer.INVALID_PARAMS
+    [scalar] = call(server, {"jsonrpc": "2.0", "id": 4, "method": "list_tabs", "params": 7})
+    assert error_code(scalar) == ControlServer.INVALID_PARAMS
+
+
+def test_unparsable_lines(server):
+    client = {"buffer": b"", "events": set()}
+    server._handle(None, client, b'{"jsonrpc": "2.0", "id": 1,')
+    server._handle(None, client, b"[" * 100000 + b"]" * 100000)
+    assert [error_code(response) for response in server.sent] == [ControlServer.PARSE_ERROR] * 2
+    server.sent = []
+    assert [error_code(response) for response in call(server, [])] == [ControlServer.INVALID_REQUEST]
+
+
+def test_exceptions_in_methods_become_internal_errors(server):
+    [response] = call(server, {"jsonrpc": "2.0", "id": 1, "method": "navigate_to_url", "params": ["crash"]})
+    assert error_code(response) == ControlServer.INTERNAL_ERROR
+    assert "boom" in response["error"]["message"]
+
+
+def test_notifications_get_no_response(server):
+    assert call(server, {"jsonrpc": "2.0", "method": "subscribe", "params": {"events": 5}}) == []
+
+
+def test_batch_answers_every_call_in_order(server):
+    [responses] = call(server, [
+        {"jsonrpc": "2.0", "id": 1, "method": "navigate_to_url", "params": ["example.com"]},
+        {"jsonrpc": "2.0", "id": 2, "method": "subscribe", "params": {"events": 5}},
+        {"jsonrpc": "2.0", "method": "subscribe", "params": {"events": ["loadFinished"]}},
+        "not a request",
+        {"jsonrpc": "2.0", "id": 3, "method": "subscribe", "params": {"events": ["tabClosed"]}},
+    ])
+    assert responses[0] == {"jsonrpc": "2.0", "id": 1,
+                            "result": dict(server.tab_info(server.browser.state),
+                                           url="https://example.com")}
+    assert error_code(responses[1]) == ControlServer.INVALID_PARAMS
+    assert error_code(responses[2]) == ControlServer.INVALID_REQUEST
+    assert responses[3]["result"] == ["loadFinished", "tabClosed"]
+
+
+def test_timed_out_load_waits_are_dropped(app, server):
+    assert call(server, {"jsonrpc": "2.0", "id": 1, "method": "navigate_to_url",
+                         "params": {"text": "example.com", "wait": True, "timeout": 0}}) == []
+    assert list(server._load_waiters) == [server.browser.state]
+    deadline = time.monotonic() + 5
+    while not server.sent and time.monotonic() < deadline:
+        app.processEvents()
+    [response] = server.sent
+    assert error_code(response) == ControlServer.TIMEOUT
+    assert server._load_waiters == {}
@@ -0,0 +1,190 @@
+import base64
+import hashlib
+import http.server
+import os
+import random
+import re
+import threading
+import time
+
+import pytest
+from PyQt5.QtCore import QDateTime
+from PyQt5.QtNetwork import QNetworkCookie
+
+from browser import BandwidthLimiter, Download, DownloadManager, parse_digest
+
+SETTINGS = {"directory": "", "segments": 4, "min_segment_mb": 1, "checksum_files": False,
+            "max_rate_kbps": 0, "max_connections": 4}
+DATA = random.Random(1).randbytes(4 * 1024 * 1024)
+SHA256 = base64.b64encode(hashlib.sha256(DATA).digest()).decode()
+
+
+class FileHandler(http.server.BaseHTTPRequestHandler):
+    """Serves DATA at any path, in byte ranges unless the path has norange, and slowly if it has slow.
+
+    Paths with digest declare the SHA-256 of DATA, and paths with baddigest one of something else.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        start, end, status = 0, len(DATA), 200
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if match and "norange" not in self.path:
+            start, end, status = int(match.group(1)), int(match.group(2)) + 1, 206
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("ETag", '"1"')
+        if "baddigest" in self.path:
+            self.send_header("Repr-Digest", f"sha-256=:{base64.b64encode(bytes(32)).decode()}:")
+        elif "digest" in self.path:
+            self.send_header("Repr-Digest", f"sha-256=:{SHA256}:")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(DATA)}")
+        self.end_headers()
+        for offset in range(start, end, 64 * 1024):
+            self.wfile.write(DATA[offset:min(end, offset + 64 * 1024)])
+            if "slow" in self.path:
+                time.sleep(0.01)
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def manager(app, tmp_path):
+    return DownloadManager(dict(SETTINGS, directory=str(tmp_path)), path=str(tmp_path / "downloads.json"))
+
+
+def add_cookie(manager, name, value, domain, path="/", secure=False, expires=None, private=False):
+    cookie = QNetworkCookie(name.encode(), value.encode())
+    cookie.setDomain(domain)
+    cookie.setPath(path)
+    cookie.setSecure(secure)
+    if expires is not None:
+        cookie.setExpirationDate(QDateTime.fromSecsSinceEpoch(int(expires)))
+    manager._cookie_changed(manager._cookies.setdefault(private, {}), cookie, True)
+    return cookie
+
+
+def wait_until(condition, timeout=20):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_cookie_header_matches_domain_path_and_scheme(manager):
+    add_cookie(manager, "host", "1", "example.com")
+    add_cookie(manager, "domain", "2", ".example.com")
+    add_cookie(manager, "files", "3", "example.com", path="/files")
+    add_cookie(manager, "secure", "4", "example.com", secure=True)
+    add_cookie(manager, "expired", "5", "example.com", expires=time.time() - 60)
+    add_cookie(manager, "other", "6", "other.com")
+    add_cookie(manager, "private", "7", "example.com", private=True)
+
+    assert manager.cookie_header("https://example.com/files/a.zip") == "files=3; host=1; domain=2; secure=4"
+    assert manager.cookie_header("http://example.com/filesystem") == "host=1; domain=2"
+    assert manager.cookie_header("http://cdn.example.com/a.zip") == "domain=2"
+    assert manager.cookie_header("http://notexample.com/") == ""
+    assert manager.cookie_header("http://example.com/", private=True) == "private=7"
+
+
+def test_removed_cookies_are_not_sent(manager):
+    cookie = add_cookie(manager, "session", "abc", "example.com")
+    manager._cookie_changed(manager._cookies[False], cookie, False)
+    assert manager.cookie_header("https://example.com/") == ""
+
+
+def test_missing_or_short_part_file_is_not_intact(tmp_path):
+    download = Download(0, "http://example.com/a.bin", str(tmp_path / "a.bin"))
+    download.size = 100
+    download.segments = [[0, 40, 50], [50, 60, 100]]
+    assert not download.part_intact()
+    with open(download.part_path, "wb") as f:
+        f.truncate(50)
+    assert not download.part_intact()
+    with open(download.part_path, "wb") as f:
+        f.truncate(100)
+    assert download.part_intact()
+
+
+def test_resume_right_after_pause_waits_for_the_stopping_threads(manager, server):
+    download = manager.add(server + "/slow.bin")
+    wait_until(lambda: download.received > 0 and download.running == 4)
+    manager.pause(download)
+    manager.start(download)
+    assert download.status == "queued"
+    wait_until(lambda: download.status == "completed")
+    with open(download.path, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_unranged_resume_starts_the_file_over(manager, server, tmp_path):
+    download = Download(0, server + "/norange.bin", str(tmp_path / "norange.bin"))
+    download.status = "paused"
+    download.segments = [[0, len(DATA) + 100, -1]]
+    download.received = len(DATA) + 100
+    with open(download.part_path, "wb") as f:
+        f.write(b"x" * (len(DATA) + 100))
+    manager.downloads.append(download)
+    manager.start(download)
+    wait_until(lambda: download.status == "completed")
+    with open(download.path, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_parse_digest_reads_the_first_supported_algorithm():
+    sha512 = base64.b64encode(hashlib.sha512(b"data").digest()).decode()
+    md5 = base64.b64encode(hashlib.md5(b"data").digest()).decode()
+    assert parse_digest({"Repr-Digest": f"sha-256=:{SHA256}:"}) == ("sha256", hashlib.sha256(DATA).hexdigest())
+    assert parse_digest({"Digest": f"unixsum=30637, SHA-512={sha512}"}) == ("sha512", hashlib.sha512(b"data").hexdigest())
+    assert parse_digest({"Digest": f"sha-256=not*base64, md5={md5}"}) == ("md5", hashlib.md5(b"data").hexdigest())
+    assert parse_digest({}) is None
+
+
+def test_content_md5_only_counts_for_whole_responses():
+    headers = {"Content-MD5": base64.b64encode(hashlib.md5(b"data").digest()).decode()}
+    assert parse_digest(headers) == ("md5", hashlib.md5(b"data").hexdigest())
+    assert parse_digest(headers, partial=True) is None
+
+
+def test_bandwidth_limiter_waits_once_the_bucket_is_spent():
+    unlimited = BandwidthLimiter(0)
+    started = time.monotonic()
+    unlimited.consume(1 << 30)
+    assert time.monotonic() - started < 0.1
+
+    limiter = BandwidthLimiter(1024 * 1024)
+    started = time.monotonic()
+    limiter.consume(1024 * 1024)
+    assert time.monotonic() - started < 0.1
+    limiter.consume(256 * 1024)
+    assert 0.2 <= time.monotonic() - started < 1
+
+
+def test_segmented_download_is_verified_against_the_declared_digest(manager, server):
+    download = manager.add(server + "/digest.bin")
+    wait_until(lambda: download.status in ("completed", "failed"))
+    assert download.status == "completed"
+    assert len(download.segments) == 4
+    assert download.expected == ("sha256", hashlib.sha256(DATA).hexdigest())
+    assert download.digest == download.expected[1]
+    with open(download.path, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_download_that_does_not_match_its_digest_fails(manager, server):
+    download = manager.add(server + "/baddigest.bin")
+    wait_until(lambda: download.status in ("completed", "failed"))
+    assert download.status == "failed"
+    assert "checksum" in download.error
+    assert not os.path.exists(download.path)
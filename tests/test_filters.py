@@ -0,0 +1,111 @@
+import pytest
+
+from browser import (PUBLIC_SUFFIX_PATHS, FilterMatcher, PublicSuffixList, load_compiled,
+                     load_public_suffixes, registrable_domain)
+
+RULES = """\
+! Comment
+||ads.example.com^
+||tracker.net^$third-party
+/banner/*$image
+@@||ads.example.com/allowed/
+||cdn.co.uk/widget.js$third-party,domain=news.co.uk|~sport.news.co.uk
+example.com##.cosmetic
+"""
+
+
+def suffix_list(tmp_path):
+    path = tmp_path / "public_suffix_list.dat"
+    path.write_text("// ===BEGIN ICANN DOMAINS===\ncom\nuk\nco.uk\nau\ncom.au\n*.ck\n!www.ck\n"
+                    "// ===BEGIN PRIVATE DOMAINS===\ngithub.io\n")
+    return PublicSuffixList.compile([str(path)])
+
+
+@pytest.fixture(params=["trie", "qt"])
+def matcher(request, app, tmp_path):
+    path = tmp_path / "list.txt"
+    path.write_text(RULES)
+    matcher = FilterMatcher.compile([str(path)])
+    if request.param == "trie":
+        matcher.set_public_suffixes(suffix_list(tmp_path))
+    return matcher
+
+
+@pytest.mark.parametrize("host, expected", [
+    ("www.example.com", "example.com"),
+    ("example.com", "example.com"),
+    ("a.b.bbc.co.uk", "bbc.co.uk"),
+    ("co.uk", "co.uk"),
+    ("shop.example.com.au", "example.com.au"),
+    ("a.b.foo.ck", "b.foo.ck"),
+    ("www.ck", "www.ck"),
+    ("user.github.io", "github.io"),
+    ("192.168.0.1", "192.168.0.1"),
+    ("[::1]", "[::1]"),
+    ("localhost", "localhost"),
+])
+def test_registrable_domain_from_trie(tmp_path, host, expected):
+    assert registrable_domain(host, suffix_list(tmp_path)) == expected
+
+
+def test_registrable_domain_from_qt(app):
+    assert registrable_domain("a.b.bbc.co.uk") == "bbc.co.uk"
+    assert registrable_domain("shop.example.com.au") == "example.com.au"
+    assert registrable_domain("www.example.com") == "example.com"
+
+
+def test_host_rules(matcher):
+    assert matcher.should_block("https://ads.example.com/x.js", "https://site.com/", "script")
+    assert matcher.should_block("https://sub.ads.example.com/x.js", "https://site.com/", "script")
+    assert not matcher.should_block("https://ads.example.com/allowed/x.js", "https://site.com/", "script")
+    # Host rules never block the page itself
+    assert not matcher.should_block("https://ads.example.com/", "https://ads.example.com/", "document")
+
+
+def test_pattern_rules_and_types(matcher):
+    assert matcher.should_block("https://site.com/banner/1.png", "https://site.com/", "image")
+    assert not matcher.should_block("https://site.com/banner/1.js", "https://site.com/", "script")
+
+
+@pytest.mark.parametrize("url, first_party, blocked", [
+    ("https://tracker.net/p.gif", "https://site.com/", True),
+    ("https://tracker.net/p.gif", "https://www.tracker.net/", False),
+    # Different sites under the same country code suffix are third parties to each other
+    ("https://cdn.co.uk/widget.js", "https://news.co.uk/", True),
+    ("https://cdn.co.uk/widget.js", "https://www.news.co.uk/", True),
+    ("https://cdn.co.uk/widget.js", "https://sport.news.co.uk/", False),
+    ("https://cdn.co.uk/widget.js", "https://other.co.uk/", False),
+    ("https://cdn.co.uk/widget.js", "https://static.cdn.co.uk/", False),
+])
+def test_third_party_on_country_code_domains(matcher, url, first_party, blocked):
+    assert matcher.should_block(url, first_party, "script") == blocked
+
+
+def test_third_party_rule_on_same_site_under_cctld(tmp_path, app):
+    path = tmp_path / "list.txt"
+    path.write_text("||img.bbc.co.uk^$third-party\n")
+    matcher = FilterMatcher.compile([str(path)])
+    matcher.set_public_suffixes(suffix_list(tmp_path))
+    assert not matcher.should_block("https://img.bbc.co.uk/a.png", "https://www.bbc.co.uk/", "image")
+    assert matcher.should_block("https://img.bbc.co.uk/a.png", "https://www.itv.co.uk/", "image")
+
+
+def test_cached_matcher_keeps_rules_but_not_suffixes(tmp_path, app):
+    path = tmp_path / "list.txt"
+    path.write_text(RULES)
+    cache_path = str(tmp_path / "filters.cache")
+    compiled = load_compiled([str(path)], cache_path, FilterMatcher.compile)
+    compiled.set_public_suffixes(suffix_list(tmp_path))
+    cached = load_compiled([str(path)], cache_path, lambda paths: pytest.fail("recompiled"))
+    assert cached.rule_count == compiled.rule_count
+    assert cached.suffixes is None
+    assert cached.should_block("https://ads.example.com/x.js", "https://site.com/", "script")
+
+
+def test_registrable_domain_from_system_list(tmp_path):
+    suffixes = load_public_suffixes(PUBLIC_SUFFIX_PATHS[1:], str(tmp_path / "suffixes.cache"))
+    if suffixes is None:
+        pytest.skip("no system public suffix list")
+    assert registrable_domain("www.bbc.co.uk", suffixes) == "bbc.co.uk"
+    assert registrable_domain("a.b.example.com.au", suffixes) == "example.com.au"
+    assert registrable_domain("user.github.io", suffixes) == "github.io"
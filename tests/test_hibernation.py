@@ -0,0 +1,214 @@
+import pytest
+from PyQt5.QtCore import QObject, QPointF, QUrl, pyqtSignal
+from PyQt5.QtWebEngineWidgets import QWebEnginePage
+from PyQt5.QtWidgets import QTabWidget
+
+from browser import DEFAULT_CONFIG, MemoryMonitor, TabHibernator
+
+Active = QWebEnginePage.LifecycleState.Active
+Frozen = QWebEnginePage.LifecycleState.Frozen
+Discarded = QWebEnginePage.LifecycleState.Discarded
+
+
+class FakePage:
+    """Just the parts of a web page the hibernator looks at"""
+
+    def __init__(self, url):
+        self._url = QUrl(url)
+        self.state = Active
+        self.audible = False
+        self.scripts = []
+
+    def url(self):
+        return self._url
+
+    def setUrl(self, url):
+        self._url = url
+
+    def lifecycleState(self):
+        return self.state
+
+    def setLifecycleState(self, state):
+        self.state = state
+
+    def recentlyAudible(self):
+        return self.audible
+
+    def scrollPosition(self):
+        return QPointF(0, 250)
+
+    def renderProcessPid(self):
+        return 0
+
+    def runJavaScript(self, script):
+        self.scripts.append(script)
+
+
+class FakeView(QObject):
+    loadStarted = pyqtSignal()
+    loadFinished = pyqtSignal(bool)
+
+    def __init__(self, url):
+        super().__init__()
+        self._page = FakePage(url)
+
+    def page(self):
+        return self._page
+
+
+class FakeBrowser(QObject):
+    """Holds views by tab index; the hibernator is only told about selections"""
+
+    def __init__(self):
+        super().__init__()
+        self.tabs = QTabWidget()
+        self.views = []
+        self.pinned = set()
+
+    def browser_at(self, index):
+        return self.views[index] if 0 <= index < len(self.views) else None
+
+    def is_pinned(self, view):
+        return view in self.pinned
+
+
+@pytest.fixture
+def browser(app):
+    return FakeBrowser()
+
+
+def hibernator(browser, **settings):
+    return TabHibernator(browser, dict(DEFAULT_CONFIG["hibernation"], **settings))
+
+
+def open_tab(browser, hibernator, url, loaded=True):
+    view = FakeView(url)
+    browser.views.append(view)
+    hibernator.track(view)
+    if loaded:
+        view.loadFinished.emit(True)
+    return view
+
+
+def test_discarding_a_tab_is_announced(browser):
+    tabs = hibernator(browser)
+    discarded = []
+    tabs.discarded.connect(discarded.append)
+    first = open_tab(browser, tabs, "https://a.example/")
+    tabs.tab_selected(0)
+    second = open_tab(browser, tabs, "https://b.example/", loaded=False)
+    tabs.discard(second)
+    tabs.discard(first)
+    # The current tab is never discarded, and a tab is announced only once
+    tabs.discard(second)
+    assert discarded == [second]
+    assert second.page().state == Discarded
+
+
+def test_selecting_a_tab_discarded_mid_load_loads_it_again(browser):
+    tabs = hibernator(browser)
+    open_tab(browser, tabs, "https://a.example/")
+    view = open_tab(browser, tabs, "https://b.example/", loaded=False)
+    tabs.tab_selected(0)
+    tabs.discard(view)
+    view.page()._url = QUrl()
+    tabs.tab_selected(1)
+    assert view.page().state == Active
+    assert view.page().url() == QUrl("https://b.example/")
+    # The scroll position comes back once the page has loaded
+    view.loadFinished.emit(True)
+    assert view.page().scripts == ["window.scrollTo(0.0, 250.0);"]
+
+
+def test_only_idle_background_tabs_are_frozen(browser):
+    tabs = hibernator(browser)
+    current, pinned, audible, plain = (open_tab(browser, tabs, f"https://{name}.example/")
+                                       for name in ("current", "pinned", "audible", "plain"))
+    loading = open_tab(browser, tabs, "https://loading.example/", loaded=False)
+    tabs.tab_selected(0)
+    browser.pinned.add(pinned)
+    audible.page().audible = True
+    for view in browser.views:
+        tabs.schedule_freeze(view, delay=0)
+    tabs.freeze_due_tabs()
+    assert [view.page().state for view in browser.views] == [Active, Active, Active, Frozen, Active]
+    assert tabs.frozen_count() == 1
+    # Audible and loading tabs are looked at again later; pinned ones are not
+    assert set(tabs._freeze_due) == {audible, loading}
+
+
+def test_a_woken_tab_is_frozen_again_later(browser):
+    tabs = hibernator(browser)
+    open_tab(browser, tabs, "https://a.example/")
+    view = open_tab(browser, tabs, "https://b.example/")
+    tabs.tab_selected(0)
+    tabs.freeze(view)
+    tabs.wake(view)
+    assert view.page().state == Active
+    assert tabs.frozen_count() == 0
+    assert view in tabs._freeze_due
+    # Selecting the tab cancels the freeze
+    tabs.freeze(view)
+    tabs.tab_selected(1)
+    assert view.page().state == Active
+    assert view not in tabs._freeze_due
+
+
+def test_nothing_is_frozen_when_hibernation_is_off(browser):
+    tabs = hibernator(browser, enabled=False)
+    open_tab(browser, tabs, "https://a.example/")
+    open_tab(browser, tabs, "https://b.example/")
+    tabs.tab_selected(0)
+    tabs.freeze_due_tabs()
+    assert tabs.frozen_count() == 0
+
+
+def test_discard_candidates_are_background_tabs_least_recently_used_first(browser):
+    tabs = hibernator(browser)
+    views = [open_tab(browser, tabs, f"https://{i}.example/") for i in range(4)]
+    pinned, audible = (open_tab(browser, tabs, f"https://{name}.example/") for name in ("pinned", "audible"))
+    open_tab(browser, tabs, "", loaded=False)
+    browser.pinned.add(pinned)
+    audible.page().audible = True
+    # Visiting tab 1 and then tab 3 leaves tab 1 used more recently than 0 and 2
+    for index in (1, 3):
+        tabs.tab_selected(index)
+    tabs.discard(views[2])
+    assert tabs.discard_candidates() == [views[0], views[1]]
+
+
+def test_tabs_over_the_limit_are_discarded_oldest_first(browser):
+    tabs = hibernator(browser, max_live_tabs=2)
+    first = open_tab(browser, tabs, "https://a.example/")
+    tabs.tab_selected(0)
+    views = [open_tab(browser, tabs, f"https://{name}.example/") for name in ("b", "c", "d")]
+    assert [view.page().state for view in views] == [Discarded, Discarded, Active]
+    assert first.page().state == Active
+
+
+class FixedMemoryMonitor(MemoryMonitor):
+    """Reports a set total, and charges each tab what the test says"""
+
+    def __init__(self, browser, settings, total_mb, tab_mb):
+        super().__init__(browser, settings)
+        self.total_mb = total_mb
+        self.tab_mb = tab_mb
+
+    def sample(self):
+        self.tab_memory = {view: (1, mb * 1048576) for view, mb in self.tab_mb.items()}
+        return {"total_mb": self.total_mb, "discarded": 0}
+
+
+def test_memory_pressure_discards_until_the_excess_is_covered(browser):
+    browser.hibernator = tabs = hibernator(browser)
+    open_tab(browser, tabs, "https://current.example/")
+    tabs.tab_selected(0)
+    views = [open_tab(browser, tabs, f"https://{i}.example/") for i in range(4)]
+    settings = dict(DEFAULT_CONFIG["memory"], threshold_mb=1000, log=False)
+    monitor = FixedMemoryMonitor(browser, settings, 1250, dict(zip(views, (200, 40, 100, 300))))
+    samples = []
+    monitor.sampled.connect(samples.append)
+    monitor.check()
+    # The two oldest background tabs free 240 MB, the third covers the remaining 10 MB
+    assert [view.page().state for view in views] == [Discarded, Discarded, Discarded, Active]
+    assert samples[0]["discarded"] == 3
@@ -0,0 +1,66 @@
+import pytest
+
+from browser import HistoryDatabase
+
+
+@pytest.fixture
+def history(tmp_path):
+    database = HistoryDatabase(str(tmp_path / "history.db"))
+    yield database
+    database.connection.close()
+
+
+def test_prefix_matches_beyond_the_top_sites_are_ranked_by_frecency(history):
+    history.TOP_SITES = 0
+    # The most recently visited pages sort last alphabetically
+    for i in range(300):
+        history.add_visit(f"https://example.com/{i:03}", now=1000.0 + i * 60)
+    assert [url for url, _ in history.suggest("example.com/", limit=3)] == [
+        "https://example.com/299", "https://example.com/298", "https://example.com/297"]
+
+
+def test_recent_visits_outweigh_old_frequent_ones(history):
+    # With a 30 day half-life, three visits 100 days ago count for about 0.3 of one today
+    for _ in range(3):
+        history.add_visit("https://example.com/old", now=1000.0)
+    history.add_visit("https://example.com/new", now=1000.0 + 100 * 86400)
+    assert [url for url, _ in history.suggest("example.com/")] == [
+        "https://example.com/new", "https://example.com/old"]
+    history.add_visit("https://example.com/old", now=1000.0 + 100 * 86400)
+    assert [url for url, _ in history.suggest("example.com/")] == [
+        "https://example.com/old", "https://example.com/new"]
+    assert history.suggest("") == []
+
+
+def test_revisits_update_one_row(history):
+    history.add_visit("https://www.example.com/a", now=1000.0)
+    history.add_visit("https://www.example.com/a", "Page A", now=2000.0)
+    rows = history.connection.execute("SELECT stripped, title, visit_count, last_visit FROM history").fetchall()
+    assert rows == [("example.com/a", "Page A", 2, 2000.0)]
+    assert history.suggest("www.exa") == [("https://www.example.com/a", "Page A")]
+    assert history.suggest("http://example.com/") == [("https://www.example.com/a", "Page A")]
+
+
+def test_top_sites_follow_new_visits(history):
+    history.add_visit("https://a.example.com/", now=1000.0)
+    assert [site[1] for site in history.top_sites()] == ["https://a.example.com/"]
+    history.add_visit("https://b.example.com/", now=1000.0)
+    history.add_visit("https://b.example.com/", now=1000.0)
+    assert [site[1] for site in history.top_sites()] == ["https://b.example.com/", "https://a.example.com/"]
+
+
+def test_most_visited_only_lists_web_pages(history):
+    history.add_visit("nexawave://newtab/", now=1000.0)
+    history.add_visit("file:///tmp/a.html", now=1000.0)
+    history.add_visit("https://example.com/", "Example", now=1000.0)
+    assert history.most_visited() == [("https://example.com/", "Example")]
+
+
+def test_substring_matches_fill_the_suggestions(history):
+    if not history.has_trigrams:
+        pytest.skip("SQLite was built without the FTS5 trigram tokenizer")
+    history.add_visit("https://example.com/", "Example", now=1000.0)
+    history.add_visit("https://docs.python.org/tutorial", "The Python Tutorial", now=1000.0)
+    assert history.suggest("tutorial") == [("https://docs.python.org/tutorial", "The Python Tutorial")]
+    assert history.suggest("python tut") == [("https://docs.python.org/tutorial", "The Python Tutorial")]
+    assert history.suggest("ex") == [("https://example.com/", "Example")]
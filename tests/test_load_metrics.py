@@ -0,0 +1,74 @@
+import csv
+import json
+
+import pytest
+
+from browser import DEFAULT_CONFIG, LoadMetrics
+
+NAVIGATION = {"startTime": 20.0, "responseStart": 140.4, "domContentLoadedEventEnd": 300.5, "loadEventEnd": 0}
+
+
+def metrics(tmp_path, **settings):
+    return LoadMetrics(None, dict(DEFAULT_CONFIG["load_metrics"], **settings), path=str(tmp_path / "loads"))
+
+
+def record(url, load_ms, ok=True):
+    return {"time": 1.0, "tab": 1, "url": url, "ok": ok, "load_ms": load_ms}
+
+
+def test_page_timing_is_added_to_the_record(app, tmp_path):
+    loads = metrics(tmp_path)
+    recorded = []
+    loads.recorded.connect(recorded.append)
+    loads._timing_ready(record("https://a.example/", 500.0),
+                        {"navigation": NAVIGATION, "resources": 12, "bytes": 34567, "slowest": []}, False)
+    [result] = recorded
+    assert result["ttfb_ms"] == 120.4
+    assert result["dom_content_loaded_ms"] == 280.5
+    assert result["load_event_ms"] is None
+    assert (result["resources"], result["bytes"]) == (12, 34567)
+    assert list(loads.records) == [result]
+
+
+def test_pages_without_timing_still_record_the_load(app, tmp_path):
+    loads = metrics(tmp_path)
+    loads._timing_ready(record("https://a.example/", 500.0), None, False)
+    [result] = loads.records
+    assert (result["ttfb_ms"], result["resources"], result["bytes"]) == (None, 0, 0)
+
+
+def test_private_loads_are_kept_in_memory_but_not_logged(app, tmp_path):
+    loads = metrics(tmp_path)
+    loads._timing_ready(record("https://private.example/", 100.0), None, True)
+    loads._timing_ready(record("https://public.example/", 200.0), None, False)
+    loads.close()
+    assert len(loads.records) == 2
+    with open(loads.path, encoding="utf-8") as f:
+        assert [json.loads(line)["url"] for line in f] == ["https://public.example/"]
+
+
+def test_csv_log_has_one_header_and_is_rotated(app, tmp_path):
+    loads = metrics(tmp_path, format="csv", max_size_mb=0)
+    for i in range(3):
+        loads._timing_ready(record(f"https://example.com/{i}", 100.0), None, False)
+    loads.close()
+    assert loads.path.endswith(".csv")
+    with open(loads.path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["url"] for row in rows] == ["https://example.com/2"]
+    with open(loads.path + ".1", encoding="utf-8", newline="") as f:
+        assert [row["url"] for row in csv.DictReader(f)] == ["https://example.com/1"]
+
+
+def test_site_summary_gives_each_host_its_median_and_latest_change(app, tmp_path):
+    loads = metrics(tmp_path, keep=5)
+    for url, load_ms, ok in [("https://old.example/", 9000.0, True),
+                             ("https://a.example/1", 100.0, True), ("https://a.example/2", 300.0, True),
+                             ("https://a.example:8080/3", 200.0, True), ("https://b.example/", 50.0, True),
+                             ("https://b.example/", 10.0, False)]:
+        loads._timing_ready(record(url, load_ms, ok), None, True)
+    # Only the five most recent loads are kept, and failed loads are left out
+    assert loads.site_summary() == [("a.example", 3, 200.0, 200.0, 0.0), ("b.example", 1, 50.0, 50.0, 0.0)]
+    loads._timing_ready(record("https://b.example/", 150.0), None, True)
+    assert loads.site_summary() == [("a.example", 2, 250.0, 200.0, pytest.approx(-20.0)),
+                                    ("b.example", 2, 100.0, 150.0, pytest.approx(50.0))]
@@ -0,0 +1,58 @@
+import pytest
+
+from browser import PageIndexDatabase
+
+
+@pytest.fixture
+def index(tmp_path):
+    database = PageIndexDatabase(str(tmp_path / "pages.db"))
+    yield database
+    database.close()
+
+
+def urls(results):
+    return [url for url, _, _ in results]
+
+
+def test_search_matches_every_word_and_a_prefix_of_the_last(index):
+    index.add_page("https://a/", "Gardening", "Planting tomatoes in raised beds", now=1.0)
+    index.add_page("https://b/", "Cooking", "Tomatoes roasted with garlic", now=2.0)
+    assert sorted(urls(index.search("tomatoes"))) == ["https://a/", "https://b/"]
+    assert urls(index.search("tomatoes garl")) == ["https://b/"]
+    assert urls(index.search("gardening")) == ["https://a/"]
+    # Words are stemmed, so other forms of a word match
+    assert urls(index.search("plant")) == ["https://a/"]
+
+
+def test_query_syntax_is_taken_literally(index):
+    index.add_page("https://a/", "Title", "cats AND dogs", now=1.0)
+    assert urls(index.search('"cats" OR NEAR(')) == []
+    assert urls(index.search("cats AND")) == ["https://a/"]
+    assert index.search("  ...  ") == []
+
+
+def test_revisited_page_replaces_its_text(index):
+    index.add_page("https://a/", "Old", "first version", now=1.0)
+    index.add_page("https://a/", "New", "second version", now=2.0)
+    assert index.search("first") == []
+    assert [(url, title) for url, title, _ in index.search("second")] == [("https://a/", "New")]
+    assert index.total_size == len("New") + len("second version")
+
+
+def test_least_recently_visited_pages_are_evicted(tmp_path):
+    index = PageIndexDatabase(str(tmp_path / "pages.db"), max_size=100)
+    try:
+        for i in range(5):
+            index.add_page(f"https://{i}/", "", "word " * 8, now=float(i + 1))
+        assert sorted(urls(index.search("word"))) == ["https://3/", "https://4/"]
+        assert index.total_size == 80
+    finally:
+        index.close()
+
+
+def test_snippet_is_cut_around_the_first_match(index):
+    body = "x " * 100 + "the needle is here " + "y " * 100
+    snippet = index.snippet(body, ["needle"])
+    assert snippet.startswith("...") and snippet.endswith("...")
+    assert "the needle is here" in snippet
+    assert index.snippet("short text", ["short"]) == "short text"
@@ -0,0 +1,120 @@
+import pytest
+from PyQt5.QtCore import QObject
+from PyQt5.QtWidgets import QLineEdit, QTabWidget
+
+from browser import DEFAULT_CONFIG, NavigationPredictor, TabState
+
+RESULTS = [("https://news.example/", "News"), ("https://mail.example/", "Mail")]
+
+
+class FakeBrowser(QObject):
+    def __init__(self):
+        super().__init__()
+        self.tabs = QTabWidget()
+        self.url_bar = QLineEdit()
+        self.profiles = object()
+        self.state = TabState(None, "https://start.example/")
+
+    def current_state(self):
+        return self.state
+
+
+class RecordingPredictor(NavigationPredictor):
+    """Notes what it would look up or load instead of touching the network"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.actions = []
+
+    def preresolve(self, url):
+        self.actions.append(("preresolve", url))
+
+    def prerender(self, url):
+        self.actions.append(("prerender", url))
+
+
+@pytest.fixture
+def browser(app):
+    return FakeBrowser()
+
+
+def predictor(browser, tmp_path, **settings):
+    return RecordingPredictor(browser, dict(DEFAULT_CONFIG["predictor"], **settings),
+                              path=str(tmp_path / "predictor.json"))
+
+
+def type_and_open(browser, predictor, text, url, results=RESULTS):
+    browser.url_bar.setText(text)
+    predictor.suggested(text, results)
+    predictor.navigated(url)
+
+
+def test_confidence_follows_what_was_opened_for_the_text(browser, tmp_path):
+    predictions = predictor(browser, tmp_path)
+    assert predictions.confidence("ne", "https://news.example/") == 0.5
+    type_and_open(browser, predictions, "ne", "https://news.example/")
+    assert predictions.confidence("ne", "https://news.example/") == pytest.approx(2 / 3)
+    assert predictions.confidence("ne", "https://mail.example/") == pytest.approx(1 / 3)
+    assert predictions.confidence("n", "https://news.example/") == 0.5
+
+
+def test_suggestions_are_looked_up_then_prerendered_as_confidence_grows(browser, tmp_path):
+    predictions = predictor(browser, tmp_path)
+    for _ in range(3):
+        type_and_open(browser, predictions, "ne", "https://news.example/")
+    # Three hits make 0.8, the prerender threshold
+    assert predictions.actions == [("preresolve", "https://news.example/")] * 3
+    browser.url_bar.setText("NE ")
+    predictions.suggested("NE ", RESULTS)
+    assert predictions.actions[-1] == ("prerender", "https://news.example/")
+
+
+def test_nothing_is_predicted_for_short_stale_or_private_input(browser, tmp_path):
+    predictions = predictor(browser, tmp_path)
+    browser.url_bar.setText("n")
+    predictions.suggested("n", RESULTS)
+    # Suggestions that arrive after the user typed on are ignored
+    browser.url_bar.setText("new")
+    predictions.suggested("ne", RESULTS)
+    predictions.suggested("new", [])
+    browser.state.private = True
+    predictions.suggested("new", RESULTS)
+    assert predictions.actions == []
+    disabled = predictor(browser, tmp_path, enabled=False)
+    browser.state.private = False
+    disabled.suggested("new", RESULTS)
+    assert disabled.actions == []
+    assert disabled.navigated("https://news.example/") is None
+
+
+def test_switching_tabs_forgets_what_was_typed(browser, tmp_path):
+    predictions = predictor(browser, tmp_path)
+    browser.url_bar.setText("ne")
+    predictions.suggested("ne", RESULTS)
+    predictions.reset()
+    predictions.navigated("https://news.example/")
+    assert predictions.entries() == {}
+    assert predictions.stats()["navigations"] == 1
+
+
+def test_learned_pages_and_stats_survive_a_restart(browser, tmp_path):
+    predictions = predictor(browser, tmp_path)
+    type_and_open(browser, predictions, "ne", "https://news.example/")
+    stats = predictions.stats()
+    stats["navigations"] = 100
+    assert predictions.stats()["navigations"] == 1
+    predictions.close()
+
+    reloaded = predictor(browser, tmp_path)
+    assert reloaded.confidence("ne", "https://news.example/") == pytest.approx(2 / 3)
+    assert reloaded.stats() == predictions.stats()
+
+
+def test_only_the_most_recently_used_entries_are_saved(browser, tmp_path):
+    predictions = predictor(browser, tmp_path, max_entries=2)
+    for text in ["ma", "mai", "mail"]:
+        type_and_open(browser, predictions, text, "https://mail.example/", RESULTS[1:])
+    predictions.entries()["mai", "https://mail.example/"][2] = 0
+    predictions.close()
+    reloaded = predictor(browser, tmp_path)
+    assert set(reloaded.entries()) == {("ma", "https://mail.example/"), ("mail", "https://mail.example/")}
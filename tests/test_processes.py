@@ -0,0 +1,13 @@
+from browser import chromium_arguments
+
+
+def test_process_models_map_to_chromium_switches():
+    assert chromium_arguments({"model": "site-per-process", "renderer_limit": 0}) == []
+    assert chromium_arguments({"model": "process-per-site-instance", "renderer_limit": 0}) == [
+        "--process-per-site-instance"]
+    assert chromium_arguments({"model": "process-per-site", "renderer_limit": 4}) == [
+        "--process-per-site", "--renderer-process-limit=4"]
+
+
+def test_unknown_process_model_leaves_chromium_default():
+    assert chromium_arguments({"model": "bogus", "renderer_limit": 0}) == []
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+
+from browser import DEFAULT_CONFIG, InterceptorChain, ProfileManager
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return dict(DEFAULT_CONFIG["profile"], storage_path=str(tmp_path / "profile"))
+
+
+def test_persistent_profile_follows_the_settings(app, settings):
+    manager = ProfileManager(dict(settings, cache_type="memory", cache_size_mb=64, cookies="session"))
+    profile = manager.profile
+    assert not profile.isOffTheRecord()
+    assert profile.storageName() == "default"
+    assert profile.persistentStoragePath() == settings["storage_path"]
+    assert profile.cachePath() == os.path.join(settings["storage_path"], "cache")
+    assert profile.httpCacheType() == QWebEngineProfile.MemoryHttpCache
+    assert profile.httpCacheMaximumSize() == 64 * 1024 * 1024
+    assert profile.persistentCookiesPolicy() == QWebEngineProfile.NoPersistentCookies
+
+
+def test_unknown_settings_fall_back_to_disk_cache_and_persistent_cookies(app, settings):
+    manager = ProfileManager(dict(settings, cache_type="tape", cookies="sometimes"))
+    profile = manager.profile
+    assert profile.httpCacheType() == QWebEngineProfile.DiskHttpCache
+    assert profile.persistentCookiesPolicy() == QWebEngineProfile.AllowPersistentCookies
+
+
+def test_private_profile_is_created_once_and_gets_the_hooks(app, settings):
+    manager = ProfileManager(settings)
+    watched = []
+    manager.set_profile_watcher(watched.append)
+    assert watched == [manager.profile]
+    assert manager.profiles() == [manager.profile]
+
+    private = manager.private_profile()
+    assert private is manager.private_profile()
+    assert private.isOffTheRecord()
+    assert private.httpCacheType() == QWebEngineProfile.MemoryHttpCache
+    assert watched == [manager.profile, private]
+    assert manager.profiles() == [manager.profile, private]
+
+
+class Recorder:
+    def __init__(self, name, seen):
+        self.name = name
+        self.seen = seen
+
+    def interceptRequest(self, info):
+        self.seen.append((self.name, info))
+
+
+def test_interceptor_chain_runs_each_interceptor_in_turn(app):
+    seen = []
+    chain = InterceptorChain()
+    chain.interceptors += [Recorder("blocker", seen), Recorder("downloads", seen)]
+    chain.interceptRequest("request")
+    assert seen == [("blocker", "request"), ("downloads", "request")]
@@ -0,0 +1,155 @@
+import json
+
+import pytest
+
+from browser import SessionJournal, SessionState
+
+SETTINGS = {"flush_delay": 0, "compact_interval": 3600, "compact_every": 1000}
+
+
+def opened(tab_id, after, seq):
+    return {"op": "open", "id": tab_id, "after": after, "url": f"https://example.com/{tab_id}",
+            "title": "", "seq": seq}
+
+
+def order(state):
+    return [tab["id"] for tab in state.tabs]
+
+
+def test_records_place_tabs_after_their_neighbour():
+    state = SessionState()
+    for record in [opened(0, None, 1), opened(1, 0, 2), opened(2, 1, 3), opened(3, 0, 4),
+                   {"op": "move", "id": 2, "after": None, "seq": 5},
+                   {"op": "move", "id": 0, "after": 1, "seq": 6},
+                   {"op": "close", "id": 3, "seq": 7}]:
+        state.apply(record)
+    assert order(state) == [2, 1, 0]
+    assert state.seq == 7
+
+
+def test_private_tabs_in_between_do_not_shift_replay():
+    # The tab bar holds journaled tabs A and B with private tabs around them,
+    # as [P, A, P, P, B]; a new tab is opened at the end and B is moved first
+    bar = ["P", 0, "P", "P", 1]
+    state = SessionState()
+
+    def journaled_before(index):
+        return next((tab for tab in reversed(bar[:index]) if tab != "P"), None)
+
+    seq = 0
+    for index, tab in enumerate(bar):
+        if tab != "P":
+            seq += 1
+            state.apply(opened(tab, journaled_before(index), seq))
+    bar.append(2)
+    state.apply(opened(2, journaled_before(len(bar) - 1), seq + 1))
+    bar.insert(0, bar.pop(4))
+    state.apply({"op": "move", "id": 1, "after": journaled_before(0), "seq": seq + 2})
+    assert order(state) == [tab for tab in bar if tab != "P"] == [1, 0, 2]
+
+
+def test_old_index_records_still_replay():
+    state = SessionState()
+    for record in [{"op": "open", "id": 0, "index": 0, "url": "https://a/", "seq": 1},
+                   {"op": "open", "id": 1, "index": 7, "url": "https://b/", "seq": 2},
+                   {"op": "move", "id": 1, "index": 0, "seq": 3}]:
+        state.apply(record)
+    assert order(state) == [1, 0]
+
+
+def test_records_for_unknown_tabs_and_neighbours():
+    state = SessionState()
+    state.apply(opened(0, None, 1))
+    state.apply({"op": "url", "id": 5, "url": "https://missing/", "seq": 2})
+    state.apply(opened(1, 9, 3))
+    assert order(state) == [0, 1]
+    state.apply(opened(1, None, 4))
+    assert order(state) == [0, 1]
+
+
+def test_old_snapshots_are_numbered():
+    state = SessionState.from_dict({"tabs": [{"url": "https://a/"}, {"url": ""}, {"url": "https://b/"}],
+                                    "current": 1})
+    assert order(state) == [0, 1]
+    assert state.current_id == 1
+
+
+@pytest.fixture
+def session_path(tmp_path):
+    return str(tmp_path / "session.json")
+
+
+def write_journal(session_path, records, torn=False):
+    with open(session_path.replace(".json", ".journal"), "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        if torn:
+            f.write('{"op": "close", "id": 0, "se')
+
+
+def test_replay_skips_records_already_in_the_snapshot(app, session_path):
+    with open(session_path, "w", encoding="utf-8") as f:
+        json.dump({"tabs": [{"id": 0, "url": "https://a/"}], "current_id": 0, "seq": 2}, f)
+    write_journal(session_path, [opened(0, None, 1), opened(1, None, 2), opened(2, 0, 3),
+                                 {"op": "select", "id": 2, "seq": 4},
+                                 {"op": "title", "id": 2, "title": "Two", "seq": 5}], torn=True)
+    journal = SessionJournal(SETTINGS, snapshot_path=session_path)
+    try:
+        session = journal.load()
+        assert [tab["id"] for tab in session["tabs"]] == [0, 2]
+        assert session["current"] == 1
+        assert session["tabs"][1]["title"] == "Two"
+    finally:
+        journal.close()
+
+
+def test_compaction_on_close_writes_snapshot_and_empties_journal(app, session_path):
+    journal = SessionJournal(SETTINGS, snapshot_path=session_path)
+    journal.record("open", 0, after=None, url="https://a/", title="")
+    journal.record("open", 1, after=0, url="https://b/", title="")
+    journal.record("url", 1, url="https://b/1")
+    journal.record("url", 1, url="https://b/2")
+    journal.record("move", 1, after=None)
+    journal.record("select", 0)
+    journal.close()
+
+    with open(journal.journal_path, encoding="utf-8") as f:
+        assert f.read() == ""
+    with open(session_path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert [tab["id"] for tab in snapshot["tabs"]] == [1, 0]
+    assert snapshot["tabs"][0]["url"] == "https://b/2"
+    assert snapshot["current_id"] == 0
+
+    reopened = SessionJournal(SETTINGS, snapshot_path=session_path)
+    try:
+        assert reopened.load() == {"tabs": snapshot["tabs"], "current": 1}
+        assert reopened.state.seq == snapshot["seq"]
+    finally:
+        reopened.close()
+
+
+def test_restored_tabs_carry_what_their_placeholders_show(app, session_path):
+    # Restored tabs are built as placeholders from these fields, without loading a page
+    write_journal(session_path, [opened(0, None, 1), opened(1, 0, 2),
+                                 {"op": "title", "id": 1, "title": "One", "seq": 3},
+                                 {"op": "url", "id": 1, "url": "https://example.com/1?page=2", "seq": 4},
+                                 {"op": "pin", "id": 0, "pinned": True, "seq": 5},
+                                 {"op": "select", "id": 1, "seq": 6}])
+    journal = SessionJournal(SETTINGS, snapshot_path=session_path)
+    try:
+        session = journal.load()
+        assert session["tabs"] == [
+            {"id": 0, "url": "https://example.com/0", "title": "", "pinned": True},
+            {"id": 1, "url": "https://example.com/1?page=2", "title": "One"}]
+        assert session["current"] == 1
+    finally:
+        journal.close()
+
+
+def test_no_session_to_restore(app, session_path):
+    journal = SessionJournal(SETTINGS, snapshot_path=session_path)
+    try:
+        assert journal.load() is None
+    finally:
+        journal.close()
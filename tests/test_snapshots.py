@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from browser import SnapshotDatabase
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    db = SnapshotDatabase(str(tmp_path / "snapshots.sqlite"), str(tmp_path / "snapshots"), max_size=100)
+    yield db
+    db.close()
+
+
+def saved(tmp_path, size, name="saving-1.mhtml"):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def urls(snapshots):
+    return sorted(entry["url"] for entry in snapshots.entries())
+
+
+def test_add_moves_the_snapshot_into_place(snapshots, tmp_path):
+    entry, evicted = snapshots.add("https://a.example/", "A", saved(tmp_path, 30), now=1)
+    assert evicted == []
+    assert (entry["url"], entry["title"], entry["size"], entry["marked"]) == ("https://a.example/", "A", 30, False)
+    assert os.path.dirname(entry["path"]) == snapshots.directory
+    assert os.path.getsize(entry["path"]) == 30
+    assert not os.path.exists(tmp_path / "saving-1.mhtml")
+
+
+def test_saving_again_replaces_the_snapshot_and_keeps_its_mark(snapshots, tmp_path):
+    snapshots.add("https://a.example/", "A", saved(tmp_path, 30), now=1)
+    snapshots.mark("https://a.example/", True)
+    entry, _ = snapshots.add("https://a.example/", "A again", saved(tmp_path, 50), now=2)
+    assert (entry["title"], entry["size"], entry["marked"]) == ("A again", 50, True)
+    assert snapshots.total_size == 50
+    assert len(snapshots.entries()) == 1
+
+
+def test_eviction_drops_unmarked_least_recently_opened_snapshots_first(snapshots, tmp_path):
+    for i, url in enumerate(["https://marked.example/", "https://old.example/", "https://opened.example/"]):
+        snapshots.add(url, "", saved(tmp_path, 30), now=i + 1)
+    snapshots.mark("https://marked.example/", True)
+    snapshots.touch("https://old.example/", now=10)
+    snapshots.touch("https://opened.example/", now=20)
+    old_path = next(entry["path"] for entry in snapshots.entries() if entry["url"] == "https://old.example/")
+    _, evicted = snapshots.add("https://new.example/", "", saved(tmp_path, 30), now=30)
+    assert evicted == ["https://old.example/"]
+    assert not os.path.exists(old_path)
+    # The marked snapshot is only dropped once no unmarked one is left
+    _, evicted = snapshots.add("https://big.example/", "", saved(tmp_path, 80), now=40)
+    assert evicted == ["https://opened.example/", "https://new.example/", "https://marked.example/"]
+    assert urls(snapshots) == ["https://big.example/"]
+
+
+def test_snapshot_larger_than_the_store_is_not_kept(snapshots, tmp_path):
+    snapshots.add("https://a.example/", "", saved(tmp_path, 30), now=1)
+    entry, evicted = snapshots.add("https://huge.example/", "", saved(tmp_path, 150), now=2)
+    assert entry is None
+    assert evicted == ["https://a.example/", "https://huge.example/"]
+    assert snapshots.total_size == 0
+    assert os.listdir(snapshots.directory) == []
+
+
+def test_remove_frees_the_space(snapshots, tmp_path):
+    entry, _ = snapshots.add("https://a.example/", "", saved(tmp_path, 30), now=1)
+    snapshots.remove("https://a.example/")
+    snapshots.remove("https://never.example/")
+    assert snapshots.entries() == []
+    assert snapshots.total_size == 0
+    assert not os.path.exists(entry["path"])
+
+
+def test_visits_are_counted_per_url(snapshots):
+    for url in ["https://a.example/", "https://b.example/", "https://a.example/"]:
+        snapshots.record_visit(url)
+    assert snapshots.visits() == {"https://a.example/": 2, "https://b.example/": 1}
+
+
+def test_unfinished_snapshots_are_removed_on_open(tmp_path):
+    directory = tmp_path / "snapshots"
+    directory.mkdir()
+    (directory / "saving-3.mhtml").write_bytes(b"partial")
+    (directory / "kept.mhtml").write_bytes(b"done")
+    db = SnapshotDatabase(str(tmp_path / "snapshots.sqlite"), str(directory))
+    db.close()
+    assert os.listdir(directory) == ["kept.mhtml"]
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+from PyQt5.QtGui import QColor, QImage
+
+from browser import ThumbnailWorker, thumbnail_key
+
+
+@pytest.fixture
+def worker(app, tmp_path):
+    worker = ThumbnailWorker(str(tmp_path / "thumbnails"), 160, 100, 80, 1024 * 1024)
+    worker.images = {}
+    worker.ready.connect(worker.images.__setitem__)
+    return worker
+
+
+def page(width=800, height=600):
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor("#3b82f6"))
+    return image
+
+
+def test_thumbnails_are_stored_under_a_key_for_their_url(worker):
+    worker.store("https://a.example/", page())
+    path = worker.path("https://a.example/")
+    assert os.path.basename(path) == thumbnail_key("https://a.example/") + ".jpg"
+    assert thumbnail_key("https://a.example/") != thumbnail_key("https://b.example/")
+    assert os.listdir(worker.directory) == [os.path.basename(path)]
+    # Tall pages are cropped to the top instead of squeezed
+    worker.store("https://tall.example/", page(400, 4000))
+    for url in ["https://a.example/", "https://tall.example/"]:
+        assert worker.images[url].size() == QImage(worker.path(url)).size() == page(160, 100).size()
+
+
+def test_loading_a_missing_thumbnail_gives_a_null_image(worker):
+    worker.load("https://never.example/")
+    assert worker.images["https://never.example/"].isNull()
+
+
+def test_least_recently_used_thumbnails_are_evicted(worker):
+    urls = ["https://a.example/", "https://b.example/", "https://c.example/"]
+    for i, url in enumerate(urls):
+        worker.store(url, page())
+        os.utime(worker.path(url), (i + 1, i + 1))
+    size = os.path.getsize(worker.path(urls[0]))
+    # Loading a thumbnail counts as using it, so b is now the oldest
+    worker.load(urls[0])
+    worker.max_size = size * 3.5
+    worker.store("https://d.example/", page())
+    kept = ["https://a.example/", "https://c.example/", "https://d.example/"]
+    assert sorted(os.listdir(worker.directory)) == sorted(os.path.basename(worker.path(url)) for url in kept)
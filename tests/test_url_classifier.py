@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from browser import DEFAULT_CONFIG, PUBLIC_SUFFIX_PATHS, UrlClassifier, load_public_suffixes
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "url_inputs.tsv")
+
+
+def corpus():
+    cases = []
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 2 and not fields[0].startswith("#"):
+                cases.append(pytest.param(fields[0], fields[1], fields[2:3], id=fields[1]))
+    return cases
+
+
+@pytest.fixture(scope="module")
+def classifier(app, tmp_path_factory):
+    classifier = UrlClassifier(DEFAULT_CONFIG["search"], load=False)
+    classifier.suffixes = load_public_suffixes(PUBLIC_SUFFIX_PATHS[1:],
+                                               str(tmp_path_factory.mktemp("psl") / "suffixes.cache"))
+    return classifier
+
+
+@pytest.fixture(scope="module")
+def qt_classifier(app):
+    return UrlClassifier(DEFAULT_CONFIG["search"], load=False)
+
+
+def check(classifier, expected, text, history_urls):
+    # A search with a named engine is expected as its exact URL
+    url, is_search = classifier.classify(text, history_urls)
+    if expected == "search":
+        assert is_search, url
+    else:
+        assert url == expected
+
+
+@pytest.mark.parametrize("expected, text, history_urls", corpus())
+def test_corpus_with_suffix_list(classifier, expected, text, history_urls):
+    if classifier.suffixes is None:
+        pytest.skip("no system public suffix list")
+    check(classifier, expected, text, history_urls)
+
+
+@pytest.mark.parametrize("expected, text, history_urls", corpus())
+def test_corpus_with_qt_suffixes(qt_classifier, expected, text, history_urls):
+    if text == "github.io":
+        pytest.xfail("Qt's copy of the list includes the private section, where github.io is a suffix")
+    check(qt_classifier, expected, text, history_urls)
+
+
+def test_search_engines(classifier):
+    assert classifier.classify("duckduckgo qt widgets") == ("https://duckduckgo.com/?q=qt+widgets", True)
+    assert classifier.classify("?example.com") == ("https://www.google.com/search?q=example.com", True)
+    assert classifier.search_url("a&b", "bing") == "https://www.bing.com/search?q=a%26b"